@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import config
+import page_parser
+import text_pipeline
+from classifier import KeywordClassifier
+from corpus import iter_corpus
+from extraction import get_extractor
+
+logger = logging.getLogger(__name__)
+
+# Офлайн-прогон записанных страниц через тот же путь извлечения, что и в боте:
+#   python bench.py                    - отчёт и сравнение с базовой линией
+#   python bench.py --save-baseline    - сохранить текущие результаты как базовые
+#   python bench.py -m ozon --repeat 5
+
+STAGES = ("parse", "select", "clean", "id", "classify", "pick")
+
+
+def run_page(marketplace, html, classifier, timings):
+    # Те же вызовы, что page_parser.parse_page, но с замером каждого шага. Очистка и id
+    # меряются по отдельности, без кэша TextPipeline: это два шага его process()
+    extractor = get_extractor(marketplace)
+
+    start = time.perf_counter()
+    root = extractor.parse(html)
+    parsed = time.perf_counter()
+    texts = extractor.extract_tree(root) if root is not None else []
+    selected = time.perf_counter()
+    cleaned = [text_pipeline.clean_and_normalize(text, marketplace) for text in texts]
+    cleaned_at = time.perf_counter()
+    processed = [(clean_text, normalized, text_pipeline.product_id_for(normalized)) for clean_text, normalized in cleaned]
+    identified = time.perf_counter()
+    verdicts = classifier.classify_batch([clean_text for clean_text, _ in cleaned])
+    classified = time.perf_counter()
+    products = page_parser.pick_products(marketplace, processed, verdicts)
+    finished = time.perf_counter()
+
+    if timings is not None:
+        timings["parse"] += parsed - start
+        timings["select"] += selected - parsed
+        timings["clean"] += cleaned_at - selected
+        timings["id"] += identified - cleaned_at
+        timings["classify"] += classified - identified
+        timings["pick"] += finished - classified
+    return products, len(texts)
+
+
+def bench_marketplace(marketplace, pages, classifier, repeat):
+    timings = dict.fromkeys(STAGES, 0.0)
+    digest = hashlib.sha1()
+    candidates = 0
+    products = 0
+
+    start = time.perf_counter()
+    for iteration in range(repeat):
+        for meta, html in pages:
+            found, count = run_page(marketplace, html, classifier, timings)
+            if iteration == 0:
+                candidates += count
+                products += len(found)
+                digest.update(os.path.basename(meta['path']).encode('utf-8'))
+                digest.update(json.dumps(sorted(found.items()), ensure_ascii=False).encode('utf-8'))
+    elapsed = time.perf_counter() - start
+
+    # Память меряем отдельным проходом: tracemalloc сильно искажает время
+    tracemalloc.start()
+    for meta, html in pages:
+        run_page(marketplace, html, classifier, None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    runs = len(pages) * repeat
+    return {
+        'pages': len(pages),
+        'pages_per_sec': round(runs / elapsed, 2) if elapsed else 0.0,
+        'stage_ms': {stage: round(timings[stage] * 1000 / runs, 3) for stage in STAGES},
+        'peak_kb': round(peak / 1024, 1),
+        'candidates': candidates,
+        'products': products,
+        'output_sha1': digest.hexdigest(),
+    }
+
+
+def compare(results, baseline, speed_tolerance, memory_tolerance):
+    regressions = []
+    for marketplace, result in results.items():
+        base = baseline.get(marketplace)
+        if not base:
+            continue
+        if base['pages'] != result['pages']:
+            logger.info(f"{marketplace}: корпус изменился ({base['pages']} -> {result['pages']} страниц), сравнение неточное")
+            continue
+        if result['output_sha1'] != base['output_sha1']:
+            regressions.append(f"{marketplace}: результат извлечения отличается от базового "
+                               f"({base['products']} -> {result['products']} товаров)")
+        if result['pages_per_sec'] < base['pages_per_sec'] * (1 - speed_tolerance):
+            regressions.append(f"{marketplace}: скорость {base['pages_per_sec']} -> {result['pages_per_sec']} стр/с")
+        if result['peak_kb'] > base['peak_kb'] * (1 + memory_tolerance):
+            regressions.append(f"{marketplace}: пик памяти {base['peak_kb']} -> {result['peak_kb']} КБ")
+    return regressions
+
+
+def print_report(results):
+    header = f"{'маркетплейс':<12} {'стр':>5} {'стр/с':>9} " + " ".join(f"{s + ' мс':>12}" for s in STAGES)
+    print(header + f" {'пик КБ':>9} {'товаров':>8}")
+    for marketplace, result in results.items():
+        stages = " ".join(f"{result['stage_ms'][s]:>12.3f}" for s in STAGES)
+        print(
+            f"{marketplace:<12} {result['pages']:>5} {result['pages_per_sec']:>9.2f} {stages} "
+            f"{result['peak_kb']:>9.1f} {result['products']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк извлечения по записанным страницам")
+    parser.add_argument('--corpus', default=config.CORPUS_DIR)
+    parser.add_argument('-m', '--marketplace')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=None, help="по умолчанию <corpus>/baseline.json")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--speed-tolerance', type=float, default=0.15)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(message)s', level=logging.INFO)
+    baseline_path = args.baseline or os.path.join(args.corpus, 'baseline.json')
+
+    pages = {}
+    for meta, html in iter_corpus(args.corpus, args.marketplace):
+        pages.setdefault(meta['marketplace'], []).append((meta, html))
+    if not pages:
+        print(f"В корпусе {args.corpus} нет страниц. Запишите их с RECORD_CORPUS=1")
+        return 1
+
+    classifier = KeywordClassifier.from_file(config.KEYWORDS_FILE)
+    results = {
+        marketplace: bench_marketplace(marketplace, marketplace_pages, classifier, max(1, args.repeat))
+        for marketplace, marketplace_pages in pages.items()
+    }
+    print_report(results)
+
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Базовая линия сохранена: {baseline_path}")
+        return 0
+
+    try:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print("Базовой линии нет, сравнение пропущено (--save-baseline)")
+        return 0
+
+    regressions = compare(results, baseline, args.speed_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(f"РЕГРЕССИЯ: {regression}")
+    if not regressions:
+        print("Регрессий относительно базовой линии нет")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
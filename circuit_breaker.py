@@ -0,0 +1,90 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    # Предохранитель маркетплейса. closed - прогоны идут как обычно; после threshold
+    # неудач подряд (или сразу при капче) - open: браузеры для сайта не запускаются
+    # cooldown секунд. Затем half_open: пропускается один пробный прогон, успех
+    # закрывает предохранитель, неудача снова открывает его на удвоенную паузу
+
+    def __init__(self, name, threshold=3, cooldown=300, max_cooldown=3600):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.state = CLOSED
+        self.failures = 0
+        self.open_for = cooldown
+        self.opened_at = None
+        self.probing = False
+        self.last_error = None
+        self.trips = 0
+        self.empty = 0
+
+    def allow(self, now=None):
+        # True - можно запускать прогон; в half_open - только один одновременно
+        if self.state == CLOSED:
+            return True
+        now = time.time() if now is None else now
+        if self.state == OPEN:
+            if now - self.opened_at < self.open_for:
+                return False
+            self.state = HALF_OPEN
+            logger.info(f"{self.name}: пауза {self.open_for:.0f}с истекла, пробная проверка")
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def release(self):
+        # Пробный прогон не состоялся - следующий может попробовать снова
+        self.probing = False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"{self.name}: сайт снова доступен, предохранитель закрыт")
+        self.state = CLOSED
+        self.failures = 0
+        self.open_for = self.cooldown
+        self.probing = False
+
+    def record_empty(self):
+        # Сайт ответил, но у цели нет товаров - это не сбой сайта, но и не повод
+        # сбрасывать неудачи других целей того же маркетплейса
+        self.empty += 1
+        if self.state == CLOSED:
+            return
+        self.record_success()
+
+    def record_failure(self, reason, trip=False, now=None):
+        self.failures += 1
+        self.last_error = reason
+        self.probing = False
+        if self.state == HALF_OPEN:
+            self.open_for = min(self.max_cooldown, self.open_for * 2)
+            self.trip(now)
+        elif self.state == CLOSED and (trip or self.failures >= self.threshold):
+            self.trip(now)
+
+    def trip(self, now=None):
+        self.state = OPEN
+        self.opened_at = time.time() if now is None else now
+        self.trips += 1
+        logger.warning(
+            f"{self.name}: предохранитель открыт на {self.open_for:.0f}с "
+            f"(неудач подряд: {self.failures}, последняя: {self.last_error})"
+        )
+
+    def remaining(self, now=None):
+        if self.state != OPEN:
+            return 0.0
+        now = time.time() if now is None else now
+        return max(0.0, self.opened_at + self.open_for - now)
@@ -0,0 +1,87 @@
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Набор ключевых слов по умолчанию. Можно переопределить JSON-файлом
+# (см. config.KEYWORDS_FILE) с теми же ключами.
+DEFAULT_KEYWORDS = {
+    "min_length": 10,
+    "max_length": 200,
+    "require": ['мтс', 'mts'],
+    "include": [
+        'сим', 'sim', 'карт', 'тариф', 'tariff', 'телеком', 'связ',
+        'номер', 'mobile', 'плюс', 'plus', 'баланс', 'интернет', 'пакет',
+        'звонк', 'минут', 'гигабайт', 'гб', 'gb', 'трафик', 'риил', 'реал',
+        'больше', 'джуниор', 'мембрана', 'супер', 'ноутбук', 'устройств'
+    ],
+    "exclude": [
+        'сбер', 'sber', 'теле2', 'tele2', 'билайн', 'beeline', 'мегафон', 'megafon',
+        'тинькофф', 'tinkoff', 'яндекс', 'yandex', 'оплата', 'пополнен', 'доставк',
+        'отзыв', 'реценз', 'комментар', 'опрос', 'акция', 'скидк', 'распродаж',
+        'чехол', 'наушник', 'powerbank', 'зарядк', 'баллов', 'cashback', 'роутер',
+        'модем', 'рация', 'радио', 'каталог', 'интернет-магазин', 'ассортимент',
+        'вы найдете', 'в каталоге', 'пао мтс', ' кошелек'
+    ],
+}
+
+
+def compile_keywords(keywords):
+    # Одна регулярка на набор: альтернатива из экранированных подстрок,
+    # длинные варианты первыми, чтобы не зависеть от порядка в списке
+    if not keywords:
+        return None
+    ordered = sorted(set(keywords), key=len, reverse=True)
+    return re.compile('|'.join(re.escape(keyword) for keyword in ordered))
+
+
+class KeywordClassifier:
+    def __init__(self, keywords=None):
+        keywords = dict(DEFAULT_KEYWORDS, **(keywords or {}))
+        self.min_length = keywords["min_length"]
+        self.max_length = keywords["max_length"]
+        self.require = compile_keywords([k.lower() for k in keywords["require"]])
+        self.include = compile_keywords([k.lower() for k in keywords["include"]])
+        self.exclude = compile_keywords([k.lower() for k in keywords["exclude"]])
+
+    @classmethod
+    def from_file(cls, path):
+        if not path:
+            return cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                keywords = json.load(f)
+            logger.info(f"Ключевые слова загружены из {path}")
+            return cls(keywords)
+        except FileNotFoundError:
+            return cls()
+        except Exception as e:
+            logger.error(f"Ошибка загрузки ключевых слов из {path}: {e}")
+            return cls()
+
+    def is_valid(self, text):
+        if not text or len(text) < self.min_length or len(text) > self.max_length:
+            return False
+
+        text_lower = text.lower()
+
+        if self.require and not self.require.search(text_lower):
+            return False
+        if self.include and not self.include.search(text_lower):
+            return False
+        if self.exclude and self.exclude.search(text_lower):
+            return False
+        return True
+
+    def classify_batch(self, texts):
+        # Одинаковые строки на странице встречаются многократно - проверяем каждую один раз
+        verdicts = {}
+        results = []
+        for text in texts:
+            verdict = verdicts.get(text)
+            if verdict is None:
+                verdict = self.is_valid(text)
+                verdicts[text] = verdict
+            results.append(verdict)
+        return results
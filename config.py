@@ -0,0 +1,169 @@
+import os
+
+# Все параметры можно переопределить переменными окружения
+
+
+def env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def env_float(name, default):
+    return float(os.getenv(name, str(default)))
+
+
+def env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Пул браузеров
+DRIVER_POOL_SIZE = env_int('DRIVER_POOL_SIZE', 3)
+DRIVER_MAX_USES = env_int('DRIVER_MAX_USES', 50)
+DRIVER_ACQUIRE_TIMEOUT = env_float('DRIVER_ACQUIRE_TIMEOUT', 120)
+
+# Параллельный парсинг: сколько целей проверяется одновременно (общий пул воркеров
+# с очередью по маркетплейсам) и сколько потоков отдано под Selenium
+MAX_CONCURRENT_MARKETPLACES = env_int('MAX_CONCURRENT_MARKETPLACES', 3)
+SCRAPE_WORKERS = env_int('SCRAPE_WORKERS', MAX_CONCURRENT_MARKETPLACES)
+SELENIUM_WORKERS = env_int('SELENIUM_WORKERS', DRIVER_POOL_SIZE)
+
+USER_AGENT = os.getenv(
+    'USER_AGENT',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+)
+
+# Быстрый HTTP-путь (aiohttp). Базовые адреса можно направить на локальный стенд
+HTTP_FAST_PATH = env_bool('HTTP_FAST_PATH', True)
+HTTP_POOL_LIMIT = env_int('HTTP_POOL_LIMIT', 10)
+HTTP_TIMEOUT = env_float('HTTP_TIMEOUT', 20)
+YANDEX_BASE_URL = os.getenv('YANDEX_BASE_URL', 'https://market.yandex.ru')
+WILDBERRIES_API_URL = os.getenv('WILDBERRIES_API_URL', 'https://catalog.wb.ru')
+OZON_BASE_URL = os.getenv('OZON_BASE_URL', 'https://www.ozon.ru')
+
+# JSON с наборами ключевых слов (require/include/exclude), если файла нет - встроенные
+KEYWORDS_FILE = os.getenv('KEYWORDS_FILE', 'keywords.json')
+
+# Размер LRU-кэша очистки названий
+TEXT_CACHE_SIZE = env_int('TEXT_CACHE_SIZE', 10000)
+
+# Через сколько записей в журнале изменений переписывать снимок товаров
+JOURNAL_COMPACT_EVERY = env_int('JOURNAL_COMPACT_EVERY', 50)
+
+# Хранилище товаров: json (файлы + журнал) или sqlite (история и события)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'products.db')
+
+# Товары, которых не видно дольше PRODUCT_TTL_HOURS (там, где каталог читается не целиком
+# или обход был неполным), считаются пропавшими; в памяти на цель не больше PRODUCT_STATE_MAX
+PRODUCT_TTL_HOURS = env_float('PRODUCT_TTL_HOURS', 72)
+PRODUCT_STATE_MAX = env_int('PRODUCT_STATE_MAX', 20000)
+# Новый товар, название которого похоже на пропавший не меньше чем на IDENTITY_THRESHOLD
+# (коэффициент Дайса по триграммам, 0..1), считается переименованием; 1.01 - выключить
+IDENTITY_THRESHOLD = env_float('IDENTITY_THRESHOLD', 0.8)
+
+# Расписание: у каждого маркетплейса свой базовый интервал (секунды)
+MARKETPLACE_INTERVALS = {
+    "yandex": env_int('YANDEX_INTERVAL', 90),
+    "wildberries": env_int('WILDBERRIES_INTERVAL', 90),
+    "ozon": env_int('OZON_INTERVAL', 90),
+}
+SCHEDULE_MIN_INTERVAL = env_int('SCHEDULE_MIN_INTERVAL', 30)
+SCHEDULE_MAX_INTERVAL = env_int('SCHEDULE_MAX_INTERVAL', 1800)
+SCHEDULE_JITTER = env_float('SCHEDULE_JITTER', 0.2)
+# Сводка "Итоги проверки" в чат раз в SUMMARY_INTERVAL секунд (0 - не отправлять)
+SUMMARY_INTERVAL = env_int('SUMMARY_INTERVAL', 3600)
+
+# Готовность страницы: каталог считается загруженным, когда число карточек
+# не меняется READY_STABLE_WINDOW секунд (но не дольше READY_HARD_CAP)
+READY_STABLE_WINDOW = env_float('READY_STABLE_WINDOW', 1.5)
+READY_HARD_CAP = env_float('READY_HARD_CAP', 20)
+READY_POLL_INTERVAL = env_float('READY_POLL_INTERVAL', 0.25)
+# Запасной селектор готовности (body) принимается через столько секунд после загрузки
+READY_FALLBACK_AFTER = env_float('READY_FALLBACK_AFTER', 5)
+
+# Предохранитель маркетплейса: после BREAKER_THRESHOLD неудач подряд или капчи
+# сайт не проверяется BREAKER_COOLDOWN секунд, при повторных сбоях пауза удваивается
+BREAKER_THRESHOLD = env_int('BREAKER_THRESHOLD', 3)
+BREAKER_COOLDOWN = env_float('BREAKER_COOLDOWN', 300)
+BREAKER_MAX_COOLDOWN = env_float('BREAKER_MAX_COOLDOWN', 3600)
+
+# Обход всего каталога: число страниц берётся из пагинации первой страницы (не больше
+# CRAWL_MAX_PAGES), остальные грузятся параллельно во вкладках того же браузера.
+# CRAWL_TABS - сколько страниц сайта загружается одновременно во всех браузерах
+CRAWL_MAX_PAGES = env_int('CRAWL_MAX_PAGES', 20)
+CRAWL_TABS = {
+    "yandex": env_int('YANDEX_CRAWL_TABS', 3),
+    "wildberries": env_int('WILDBERRIES_CRAWL_TABS', 3),
+    "ozon": env_int('OZON_CRAWL_TABS', 2),
+}
+
+# Извлечение кандидатов прямо в странице (без передачи page_source)
+BROWSER_EXTRACTION = env_bool('BROWSER_EXTRACTION', True)
+# Сохранять полный HTML страниц для отладки: сжатые дампы без дублей в DUMP_DIR,
+# старые удаляются при превышении DUMP_MAX_MB или DUMP_MAX_FILES
+DEBUG_HTML_DUMP = env_bool('DEBUG_HTML_DUMP', False)
+DUMP_DIR = os.getenv('DUMP_DIR', 'html_dumps')
+DUMP_MAX_MB = env_int('DUMP_MAX_MB', 200)
+DUMP_MAX_FILES = env_int('DUMP_MAX_FILES', 500)
+
+# Блокировка картинок, шрифтов, медиа и счётчиков на уровне сети (CDP).
+# BLOCKLIST_FILE переопределяет списки по маркетплейсам: {"ozon": {"types": [...], "patterns": [...]}}
+RESOURCE_BLOCKING = env_bool('RESOURCE_BLOCKING', True)
+BLOCKLIST_FILE = os.getenv('BLOCKLIST_FILE', 'blocklist.json')
+
+# Уведомления: лимиты Telegram на один чат, окно склейки изменений в дайджест (секунды),
+# число повторов при сетевых ошибках и сколько названий перечислять в одном дайджесте
+NOTIFY_PER_SECOND = env_float('NOTIFY_PER_SECOND', 1.0)
+NOTIFY_PER_MINUTE = env_int('NOTIFY_PER_MINUTE', 20)
+NOTIFY_COALESCE_DELAY = env_float('NOTIFY_COALESCE_DELAY', 3.0)
+NOTIFY_MAX_RETRIES = env_int('NOTIFY_MAX_RETRIES', 5)
+NOTIFY_MAX_LISTED = env_int('NOTIFY_MAX_LISTED', 50)
+
+# /sp: товаров на странице и сколько готовых страниц держать в кэше
+SP_PAGE_SIZE = env_int('SP_PAGE_SIZE', 20)
+RENDER_CACHE_SIZE = env_int('RENDER_CACHE_SIZE', 256)
+
+# Запись загруженных страниц в корпус для офлайн-бенчмарка (python bench.py)
+RECORD_CORPUS = env_bool('RECORD_CORPUS', False)
+CORPUS_DIR = os.getenv('CORPUS_DIR', 'corpus')
+
+# Метрики в формате Prometheus на http://METRICS_HOST:METRICS_PORT/metrics (0 - выключено).
+# TRACE_FILE - файл JSON Lines с записью о каждом прогоне (пусто - не писать)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = env_int('METRICS_PORT', 9108)
+TRACE_FILE = os.getenv('TRACE_FILE', '')
+
+# Разбор HTML в пуле процессов (по числу ядер). PARSE_IN_PROCESS=1 - разбирать
+# в основном процессе, удобно для отладки
+PARSE_IN_PROCESS = env_bool('PARSE_IN_PROCESS', False)
+PARSE_WORKERS = env_int('PARSE_WORKERS', os.cpu_count() or 1)
+
+# Режим работы: standalone - всё в одном процессе; coordinator - бот, расписание и
+# хранилище, а страницы собирают процессы `python scrape_worker.py` через очередь
+# заданий в SQLite (JOB_QUEUE_PATH). Очередь - файл SQLite в режиме WAL, поэтому координатор
+# и воркеры должны работать на одной машине: по сетевой ФС (NFS, SMB) WAL не работает
+# и очередь блокируется или портится. Воркерам нужны те же TARGETS_FILE и файлы
+# ключевых слов. У координатора SCRAPE_WORKERS - сколько заданий одновременно в очереди,
+# его стоит поднять до суммарной ёмкости воркеров
+RUN_MODE = os.getenv('RUN_MODE', 'standalone')
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', 'jobs.db')
+# Аренда задания воркером: продлевается, пока он работает; не продлённое за
+# JOB_LEASE_SECONDS задание уходит другому воркеру, после JOB_MAX_ATTEMPTS попыток - провалено.
+# JOB_TIMEOUT - сколько координатор ждёт результат задания
+JOB_LEASE_SECONDS = env_float('JOB_LEASE_SECONDS', 120)
+JOB_MAX_ATTEMPTS = env_int('JOB_MAX_ATTEMPTS', 3)
+JOB_TIMEOUT = env_float('JOB_TIMEOUT', 900)
+JOB_POLL_INTERVAL = env_float('JOB_POLL_INTERVAL', 1.0)
+# Имя воркера в /stats (по умолчанию хост-pid) и сколько заданий он ведёт одновременно
+WORKER_NAME = os.getenv('WORKER_NAME', '')
+WORKER_CONCURRENCY = env_int('WORKER_CONCURRENCY', DRIVER_POOL_SIZE)
+
+# Цели отслеживания (магазины, профили ключевых слов, чаты) - см. targets.example.json.
+# Без файла отслеживаются магазины МТС на трёх маркетплейсах
+TARGETS_FILE = os.getenv('TARGETS_FILE', 'targets.json')
+# Токен бота и чат по умолчанию - из окружения либо bot_token/chat_id в TARGETS_FILE,
+# без них бот не запускается
+BOT_TOKEN = os.getenv('BOT_TOKEN', '')
+CHAT_ID = os.getenv('CHAT_ID', '')
@@ -0,0 +1,64 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class CorpusRecorder:
+    # Запись страниц для офлайн-прогона: <каталог>/<маркетплейс>/<время>_<хэш>.html
+    # и рядом .json с метаданными (url, источник, отпечаток, время загрузки)
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def record(self, marketplace, url, html, **meta):
+        try:
+            digest = hashlib.sha1(html.encode('utf-8')).hexdigest()[:12]
+            folder = os.path.join(self.directory, marketplace)
+            os.makedirs(folder, exist_ok=True)
+            name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{digest}"
+            path = os.path.join(folder, name + '.html')
+
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            meta.update({
+                'marketplace': marketplace,
+                'url': url,
+                'recorded_at': int(time.time()),
+                'size': len(html),
+                'sha1': digest,
+            })
+            with open(os.path.join(folder, name + '.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            logger.info(f"Страница записана в корпус: {path}")
+            return path
+        except Exception as e:
+            logger.error(f"Ошибка записи страницы в корпус: {e}")
+            return None
+
+
+def iter_corpus(directory, marketplace=None):
+    # (метаданные, HTML) по всем записанным страницам, в порядке записи
+    if not os.path.isdir(directory):
+        return
+    for key in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, key)
+        if not os.path.isdir(folder) or (marketplace and key != marketplace):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith('.html'):
+                continue
+            path = os.path.join(folder, filename)
+            meta = {'marketplace': key, 'url': None}
+            try:
+                with open(path[:-len('.html')] + '.json', 'r', encoding='utf-8') as f:
+                    meta.update(json.load(f))
+            except (FileNotFoundError, ValueError):
+                pass
+            meta['path'] = path
+            with open(path, 'r', encoding='utf-8') as f:
+                yield meta, f.read()
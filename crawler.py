@@ -0,0 +1,201 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Пагинация каталога: параметр номера страницы и элементы блока пагинации
+PAGINATION = {
+    "yandex": {
+        "param": "page",
+        "selectors": ['[data-auto="pagination-page"]', '[data-zone-name="pagination"] a'],
+    },
+    "wildberries": {
+        "param": "page",
+        "selectors": ['.pagination__item', '.pager-bottom a', '.pagination a'],
+    },
+    "ozon": {
+        "param": "page",
+        "selectors": ['[data-widget="megaPaginator"] a', '[data-widget="paginator"] a'],
+    },
+}
+
+# Находит в странице номер последней страницы каталога: по числам в блоке пагинации
+# и по ссылкам на тот же путь с параметром страницы
+DISCOVER_SCRIPT = """
+var param = arguments[0];
+var selectors = arguments[1];
+var max = 1;
+function fromHref(href) {
+    if (!href) {
+        return;
+    }
+    try {
+        var url = new URL(href, location.href);
+        if (url.pathname !== location.pathname) {
+            return;
+        }
+        var n = parseInt(url.searchParams.get(param), 10);
+        if (n > max) {
+            max = n;
+        }
+    } catch (e) {}
+}
+if (selectors.length) {
+    var items = document.querySelectorAll(selectors.join(', '));
+    for (var i = 0; i < items.length; i++) {
+        var n = parseInt((items[i].textContent || '').trim(), 10);
+        if (n > max && n < 10000) {
+            max = n;
+        }
+        fromHref(items[i].getAttribute('href'));
+    }
+}
+var links = document.querySelectorAll('a[href*="' + param + '="]');
+for (var j = 0; j < links.length; j++) {
+    fromHref(links[j].getAttribute('href'));
+}
+return max;
+"""
+
+OPEN_TAB_SCRIPT = "window.open('about:blank', '_blank');"
+NAVIGATE_SCRIPT = "window.location.href = arguments[0];"
+
+
+def page_url(url, marketplace, page):
+    # Адрес n-й страницы каталога; первая - исходный адрес как есть
+    if page <= 1:
+        return url
+    param = PAGINATION[marketplace]["param"]
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != param]
+    query.append((param, str(page)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+def last_page_in_html(html, marketplace):
+    # То же для HTTP-пути: максимальный номер страницы среди ссылок в HTML
+    param = re.escape(PAGINATION[marketplace]["param"])
+    numbers = [int(n) for n in re.findall(r'[?&](?:amp;)?' + param + r'=(\d+)', html or '')]
+    return max([1] + [n for n in numbers if n < 10000])
+
+
+class TabCrawler:
+    # Обход страниц каталога во вкладках одного браузера: вкладки грузятся параллельно,
+    # команды WebDriver идут по очереди. Число одновременно загружаемых страниц
+    # ограничено на сайт - общим лимитом для всех браузеров пула
+
+    def __init__(self, tabs, max_pages=20, slot_timeout=120):
+        self.max_pages = max_pages
+        self.slot_timeout = slot_timeout
+        self.slots = {marketplace: threading.BoundedSemaphore(max(1, n)) for marketplace, n in tabs.items()}
+        self.stats = {
+            'pages': 0,
+            'failed': 0,
+            'tabs_opened': 0,
+        }
+
+    @contextmanager
+    def slot(self, marketplace):
+        # Для загрузки первой страницы в основной вкладке
+        slots = self.slots[marketplace]
+        if not slots.acquire(timeout=self.slot_timeout):
+            raise TimeoutError(f"нет свободного слота загрузки {marketplace}")
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def discover(self, driver, marketplace):
+        # (последняя страница для обхода, обрезан ли каталог лимитом max_pages)
+        spec = PAGINATION[marketplace]
+        try:
+            last_page = driver.execute_script(DISCOVER_SCRIPT, spec["param"], spec["selectors"]) or 1
+        except Exception as e:
+            logger.error(f"Ошибка поиска пагинации {marketplace}: {e}")
+            last_page = 1
+        last_page = int(last_page)
+        if last_page > self.max_pages:
+            logger.warning(f"{marketplace}: в каталоге {last_page} страниц, обходим первые {self.max_pages}")
+        return min(last_page, self.max_pages), last_page > self.max_pages
+
+    def crawl(self, driver, marketplace, urls, prepare, process):
+        # prepare(driver) - настройка новой вкладки до навигации (блокировка ресурсов),
+        # process(driver, url, load_start) -> страница. Возвращает (страницы по порядку urls, число ошибок)
+        slots = self.slots[marketplace]
+        main_handle = driver.current_window_handle
+        queue = deque(enumerate(urls))
+        in_flight = deque()
+        results = {}
+        failed = 0
+
+        try:
+            while queue or in_flight:
+                # Пока есть свободные слоты сайта - открываем вкладки; если своих вкладок
+                # в работе нет, слот ждём, иначе сразу обрабатываем готовые
+                while queue and slots.acquire(blocking=not in_flight, timeout=self.slot_timeout if not in_flight else None):
+                    position, url = queue.popleft()
+                    try:
+                        in_flight.append((position, url, self.open_tab(driver, url, prepare, main_handle), time.monotonic()))
+                    except Exception as e:
+                        slots.release()
+                        failed += 1
+                        logger.error(f"Ошибка открытия вкладки {url}: {e}")
+                if not in_flight:
+                    if queue:
+                        logger.error(f"{marketplace}: нет свободного слота для вкладки, пропущено {len(queue)} страниц")
+                        failed += len(queue)
+                        queue.clear()
+                    break
+
+                position, url, handle, load_start = in_flight.popleft()
+                try:
+                    driver.switch_to.window(handle)
+                    results[position] = process(driver, url, load_start)
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Ошибка загрузки {url}: {e}")
+                finally:
+                    slots.release()
+                    self.close_tab(driver, handle, main_handle)
+        finally:
+            for _, _, handle, _ in in_flight:
+                slots.release()
+                self.close_tab(driver, handle, main_handle)
+
+        self.stats['pages'] += len(results)
+        self.stats['failed'] += failed
+        return [results[position] for position in sorted(results)], failed
+
+    def open_tab(self, driver, url, prepare, main_handle):
+        # Вкладка открывается пустой: блокировка ресурсов ставится до начала загрузки
+        handles = set(driver.window_handles)
+        driver.execute_script(OPEN_TAB_SCRIPT)
+        new_handles = [handle for handle in driver.window_handles if handle not in handles]
+        if not new_handles:
+            raise RuntimeError("вкладка не открылась")
+        handle = new_handles[0]
+        self.stats['tabs_opened'] += 1
+        try:
+            driver.switch_to.window(handle)
+            prepare(driver)
+            driver.execute_script(NAVIGATE_SCRIPT, url)
+        except Exception:
+            self.close_tab(driver, handle, main_handle)
+            raise
+        return handle
+
+    def close_tab(self, driver, handle, main_handle):
+        try:
+            driver.switch_to.window(handle)
+            driver.close()
+        except Exception as e:
+            logger.error(f"Ошибка закрытия вкладки: {e}")
+        try:
+            driver.switch_to.window(main_handle)
+        except Exception as e:
+            logger.error(f"Ошибка возврата на основную вкладку: {e}")
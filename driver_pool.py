@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class DriverPool:
+    # Держит "тёплые" браузеры между циклами проверки.
+    # Каждый маркетплейс получает браузер с очищенными cookies и хранилищем,
+    # браузер пересоздаётся после max_uses использований или при падении.
+
+    def __init__(self, factory, max_size=3, max_uses=50, acquire_timeout=120, metrics=None):
+        self.factory = factory
+        self.metrics = metrics
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = []
+        self._busy = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.stats = {
+            'created': 0,
+            'reused': 0,
+            'recycled': 0,
+            'crashed': 0,
+        }
+
+    @contextmanager
+    def session(self, context_name):
+        acquire_start = time.perf_counter()
+        pooled = self._acquire(context_name)
+        if self.metrics:
+            self.metrics.observe_stage('driver_acquire', context_name, time.perf_counter() - acquire_start)
+        if pooled is None:
+            yield None
+            return
+
+        pooled.uses += 1
+        logger.info(f"Браузер выдан для {context_name} (использований: {pooled.uses})")
+        try:
+            yield pooled.driver
+        finally:
+            self._release(pooled, context_name)
+
+    def _acquire(self, context_name):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Пул браузеров закрыт")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    self._busy += 1
+                    break
+                if self._busy < self.max_size:
+                    pooled = None
+                    self._busy += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Нет свободного браузера в пуле")
+                self._cond.wait(remaining)
+
+        if pooled is not None:
+            if self._is_healthy(pooled.driver):
+                self.stats['reused'] += 1
+                return pooled
+            logger.warning("Браузер из пула не отвечает, пересоздаём")
+            self.stats['crashed'] += 1
+            self._quit(pooled.driver)
+
+        start = time.perf_counter()
+        driver = self.factory()
+        if self.metrics:
+            self.metrics.observe_stage('driver_start', context_name, time.perf_counter() - start)
+        if driver is None:
+            self._free_slot()
+            return None
+        self.stats['created'] += 1
+        return PooledDriver(driver)
+
+    def _release(self, pooled, context_name):
+        keep = not self._closed
+
+        if keep and pooled.uses >= self.max_uses:
+            logger.info(f"Браузер отработал {pooled.uses} раз, пересоздаём")
+            self.stats['recycled'] += 1
+            keep = False
+
+        if keep and not self._reset_context(pooled.driver):
+            logger.warning(f"Браузер упал после {context_name}, убираем из пула")
+            self.stats['crashed'] += 1
+            keep = False
+
+        if not keep:
+            self._quit(pooled.driver)
+            self._free_slot()
+            return
+
+        with self._cond:
+            self._busy -= 1
+            if self._closed:
+                keep = False
+            else:
+                self._idle.append(pooled)
+            self._cond.notify()
+
+        if not keep:
+            self._quit(pooled.driver)
+
+    def _free_slot(self):
+        with self._cond:
+            self._busy -= 1
+            self._cond.notify()
+
+    def _is_healthy(self, driver):
+        try:
+            return driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    def _reset_context(self, driver):
+        # Изолируем маркетплейсы друг от друга: закрываем лишние вкладки,
+        # чистим cookies, localStorage/sessionStorage и кэш посещённого сайта
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+
+            parts = urlsplit(driver.current_url)
+            if parts.scheme in ('http', 'https'):
+                origin = f"{parts.scheme}://{parts.netloc}"
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                    'origin': origin,
+                    'storageTypes': 'all',
+                })
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.delete_all_cookies()
+            driver.get('about:blank')
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка очистки контекста браузера: {e}")
+            return False
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.error(f"Ошибка закрытия браузера: {e}")
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+
+        for pooled in idle:
+            self._quit(pooled.driver)
+        logger.info(f"Пул браузеров закрыт, статистика: {self.stats}")
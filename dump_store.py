@@ -0,0 +1,159 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from storage import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class DumpStore:
+    # Отладочные дампы HTML: имя файла - хэш содержимого (одинаковые страницы хранятся
+    # один раз), файлы сжаты gzip, старые удаляются по лимиту размера и количества.
+    # Запись идёт в отдельном потоке, вызывающий только кладёт страницу в очередь.
+    # index.json: список {ts, marketplace, url, hash} для поиска по маркетплейсу и времени
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, max_files=500, queue_size=100):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        # Повторы одной и той же страницы добавляют только записи в индекс - их тоже ограничиваем
+        self.max_entries = max_files * 20
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.entries = []
+        self.files = {}
+        self.load_index()
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.worker = threading.Thread(target=self.run, name='dump-writer', daemon=True)
+        self.worker.start()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get('entries', [])
+            self.files = data.get('files', {})
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            logger.error(f"Повреждён индекс дампов {self.index_path}: {e}")
+        # Файлы, пропавшие с диска, из индекса убираем
+        self.files = {h: size for h, size in self.files.items() if os.path.exists(self.path_for(h))}
+        self.entries = [entry for entry in self.entries if entry['hash'] in self.files]
+
+    def path_for(self, content_hash):
+        return os.path.join(self.directory, content_hash[:2], content_hash + '.html.gz')
+
+    def put(self, marketplace, url, html):
+        # Не блокирует: при переполненной очереди дамп пропускается
+        try:
+            self.queue.put_nowait((time.time(), marketplace, url, html))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                self.write(*item)
+                # Пачку из очереди пишем целиком, индекс сохраняем один раз
+                while True:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self.save_index()
+                        return
+                    self.write(*item)
+                self.save_index()
+            except Exception as e:
+                logger.error(f"Ошибка сохранения HTML: {e}")
+
+    def write(self, ts, marketplace, url, html):
+        data = html.encode('utf-8')
+        content_hash = hashlib.sha1(data).hexdigest()
+        with self.lock:
+            if content_hash not in self.files:
+                path = self.path_for(content_hash)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + '.tmp'
+                with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self.files[content_hash] = os.path.getsize(path)
+                logger.info(f"HTML сохранен: {path} ({len(data) / 1024:.0f} -> {self.files[content_hash] / 1024:.0f} КБ)")
+            self.entries.append({'ts': int(ts), 'marketplace': marketplace, 'url': url, 'hash': content_hash})
+            self.enforce_retention()
+
+    def enforce_retention(self):
+        # Кольцо: удаляем файлы, на которые дольше всего не было ссылок
+        if len(self.entries) > self.max_entries:
+            self.entries = self.entries[-self.max_entries:]
+            referenced = {entry['hash'] for entry in self.entries}
+            for content_hash in [h for h in self.files if h not in referenced]:
+                self.remove_file(content_hash)
+        total = sum(self.files.values())
+        if total <= self.max_bytes and len(self.files) <= self.max_files:
+            return
+        last_seen = {}
+        for position, entry in enumerate(self.entries):
+            last_seen[entry['hash']] = position
+        for content_hash in sorted(self.files, key=lambda h: last_seen.get(h, -1)):
+            if total <= self.max_bytes and len(self.files) <= self.max_files:
+                break
+            total -= self.remove_file(content_hash)
+        self.entries = [entry for entry in self.entries if entry['hash'] in self.files]
+
+    def remove_file(self, content_hash):
+        size = self.files.pop(content_hash)
+        try:
+            os.remove(self.path_for(content_hash))
+        except FileNotFoundError:
+            pass
+        return size
+
+    def save_index(self):
+        with self.lock:
+            snapshot = {'entries': list(self.entries), 'files': dict(self.files)}
+        atomic_write_json(self.index_path, snapshot)
+
+    def find(self, marketplace=None, since=None, until=None):
+        with self.lock:
+            return [
+                entry for entry in self.entries
+                if (marketplace is None or entry['marketplace'] == marketplace)
+                and (since is None or entry['ts'] >= since)
+                and (until is None or entry['ts'] <= until)
+            ]
+
+    def read(self, content_hash):
+        with gzip.open(self.path_for(content_hash), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def stats(self):
+        with self.lock:
+            return {
+                'files': len(self.files),
+                'bytes': sum(self.files.values()),
+                'entries': len(self.entries),
+                'dropped': self.dropped,
+            }
+
+    def close(self, timeout=10):
+        self.queue.put(None)
+        self.worker.join(timeout)
@@ -0,0 +1,348 @@
+import logging
+import re
+
+import lxml.html
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Декларативное описание того, где искать товары на странице каждого маркетплейса.
+# selectors - CSS-селекторы (теги, .class, #id, [attr], [attr="value"] и пробел-потомок),
+#   first_per_scope - брать только первое совпадение внутри каждого контейнера
+#   (аналог container.select_one(...)).
+# text_patterns - регулярные выражения по текстовым узлам вне script/style.
+MARKETPLACE_SPECS = {
+    "yandex": {
+        "selectors": [
+            {
+                "selector": '[data-autotest-id="product-snippet"] [data-autotest-id="product-title"]',
+                "first_per_scope": True,
+            },
+            '._6yVOX',
+            '.XqR4A',
+            '.cia-cs',
+            '.cia-vs',
+        ],
+        "text_patterns": [
+            r'мтс|mts|сим|sim|тариф|плюс|plus',
+        ],
+    },
+    "wildberries": {
+        "selectors": [
+            '.product-card__name',
+            '.goods-name',
+            '.card-product__name',
+            '.product-card .product-card__name',
+        ],
+        "text_patterns": [],
+    },
+    "ozon": {
+        "selectors": [
+            '.tile-root .tsBody500',
+            '.tile-root .tsHeadline500',
+            '.tile-root .tsBodyL',
+            '.tile-root .tsHeadlineL',
+            '[data-widget="searchResultsV2"] .tsBody500',
+            '[data-widget="searchResultsV2"] .tsHeadline500',
+            '.x2h .tsBody500',
+            '.x2h .tsHeadline500',
+            '.i9x6 .tsBody500',
+            '.i9x6 .tsHeadline500',
+            '.product-card .title',
+            '.product-card .name',
+        ],
+        "text_patterns": [
+            re.escape('сим-карта мтс'),
+            re.escape('sim-карта мтс'),
+            re.escape('мтс тариф'),
+            re.escape('мтс баланс'),
+        ],
+    },
+}
+
+SKIP_TEXT_PARENTS = frozenset(['script', 'style'])
+
+# То же извлечение, но внутри страницы: возвращает список текстов кандидатов вместо page_source.
+# Порядок кандидатов совпадает с ProductExtractor.extract
+BROWSER_EXTRACT_SCRIPT = """
+var rules = arguments[0];
+var patterns = arguments[1].map(function (p) { return new RegExp(p, 'i'); });
+var started = performance.now();
+
+function strippedText(element) {
+    var walker = document.createTreeWalker(element, NodeFilter.SHOW_TEXT);
+    var parts = [];
+    var node;
+    while ((node = walker.nextNode())) {
+        var parent = node.parentNode.nodeName;
+        if (parent === 'SCRIPT' || parent === 'STYLE') {
+            continue;
+        }
+        var text = node.nodeValue.trim();
+        if (text) {
+            parts.push(text);
+        }
+    }
+    return parts.join('');
+}
+
+var items = [];
+rules.forEach(function (rule) {
+    if (rule.inner) {
+        document.querySelectorAll(rule.scope).forEach(function (scope) {
+            var element = scope.querySelector(rule.inner);
+            if (element) {
+                items.push(strippedText(element));
+            }
+        });
+    } else {
+        document.querySelectorAll(rule.selector).forEach(function (element) {
+            items.push(strippedText(element));
+        });
+    }
+});
+
+if (patterns.length) {
+    var buckets = patterns.map(function () { return []; });
+    var walker = document.createTreeWalker(document.documentElement, NodeFilter.SHOW_TEXT | NodeFilter.SHOW_COMMENT);
+    var node;
+    while ((node = walker.nextNode())) {
+        var parent = node.parentNode ? node.parentNode.nodeName : '';
+        if (parent === 'SCRIPT' || parent === 'STYLE') {
+            continue;
+        }
+        for (var i = 0; i < patterns.length; i++) {
+            if (patterns[i].test(node.nodeValue)) {
+                buckets[i].push(node.nodeValue.trim());
+            }
+        }
+    }
+    buckets.forEach(function (bucket) { items = items.concat(bucket); });
+}
+
+return {items: items, ms: performance.now() - started};
+"""
+
+_SIMPLE_SELECTOR_RE = re.compile(
+    r'''(?P<tag>^[a-zA-Z][\w-]*|^\*)'''
+    r'''|\.(?P<cls>[\w-]+)'''
+    r'''|\#(?P<id>[\w-]+)'''
+    r'''|\[\s*(?P<attr>[\w-]+)\s*(?:=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[\w-]+))\s*)?\]'''
+)
+
+
+class CompoundSelector:
+    __slots__ = ('tag', 'classes', 'attrs')
+
+    def __init__(self, text):
+        self.tag = None
+        self.classes = []
+        self.attrs = []
+
+        position = 0
+        while position < len(text):
+            match = _SIMPLE_SELECTOR_RE.match(text, position)
+            if not match or match.end() == position:
+                raise ValueError(f"Неподдерживаемый селектор: {text}")
+            if match.group('tag'):
+                if match.group('tag') != '*':
+                    self.tag = match.group('tag').lower()
+            elif match.group('cls'):
+                self.classes.append(match.group('cls'))
+            elif match.group('id'):
+                self.attrs.append(('id', match.group('id')))
+            else:
+                value = match.group('dq')
+                if value is None:
+                    value = match.group('sq')
+                if value is None:
+                    value = match.group('bare')
+                self.attrs.append((match.group('attr').lower(), value))
+            position = match.end()
+
+    def matches(self, element, tag, classes):
+        if self.tag is not None and self.tag != tag:
+            return False
+        for cls in self.classes:
+            if cls not in classes:
+                return False
+        for name, value in self.attrs:
+            actual = element.get(name)
+            if actual is None or (value is not None and actual != value):
+                return False
+        return True
+
+
+class SelectorRule:
+    __slots__ = ('selector', 'parts', 'first_per_scope')
+
+    def __init__(self, selector, first_per_scope=False):
+        self.selector = selector
+        self.parts = [CompoundSelector(part) for part in selector.split()]
+        self.first_per_scope = first_per_scope
+
+
+def element_text(element):
+    # Аналог BeautifulSoup get_text(strip=True): без комментариев и содержимого script/style
+    parts = []
+    stack = [(element, False)]
+    while stack:
+        node, tail_only = stack.pop()
+        if not tail_only:
+            if node.text and node.tag not in SKIP_TEXT_PARENTS:
+                stripped = node.text.strip()
+                if stripped:
+                    parts.append(stripped)
+            children = list(node)
+            for child in reversed(children):
+                stack.append((child, True))
+                if isinstance(child.tag, str) and child.tag not in SKIP_TEXT_PARENTS:
+                    stack.append((child, False))
+        elif node is not element and node.tail:
+            stripped = node.tail.strip()
+            if stripped:
+                parts.append(stripped)
+    return ''.join(parts)
+
+
+class ProductExtractor:
+    # Скомпилированная спецификация: один проход lxml-дерева на страницу,
+    # кандидаты возвращаются в том же порядке, что и последовательные soup.select/find_all
+
+    def __init__(self, spec):
+        self.rules = []
+        for entry in spec.get("selectors", []):
+            if isinstance(entry, str):
+                self.rules.append(SelectorRule(entry))
+            else:
+                self.rules.append(SelectorRule(entry["selector"], entry.get("first_per_scope", False)))
+
+        self.text_patterns = [re.compile(pattern, re.I) for pattern in spec.get("text_patterns", [])]
+        self.text_prefilter = None
+        if self.text_patterns:
+            self.text_prefilter = re.compile('|'.join(f'(?:{p.pattern})' for p in self.text_patterns), re.I)
+
+    def browser_arguments(self):
+        # Аргументы для BROWSER_EXTRACT_SCRIPT
+        rules = []
+        for rule in self.rules:
+            if rule.first_per_scope and len(rule.parts) > 1:
+                scope, inner = rule.selector.split(None, 1)
+                rules.append({'scope': scope, 'inner': inner})
+            else:
+                rules.append({'selector': rule.selector})
+        patterns = [pattern.pattern for pattern in self.text_patterns]
+        return rules, patterns
+
+    def parse(self, html):
+        if not html or not html.strip():
+            return None
+        try:
+            return lxml.html.document_fromstring(html)
+        except (etree.ParserError, ValueError):
+            # Строка с XML-декларацией кодировки не принимается lxml как str
+            return lxml.html.document_fromstring(html.encode('utf-8'))
+
+    def extract(self, html):
+        root = self.parse(html)
+        if root is None:
+            return []
+        return self.extract_tree(root)
+
+    def extract_tree(self, root):
+        rules = self.rules
+        selector_hits = [[] for _ in rules]
+        text_hits = [[] for _ in self.text_patterns]
+        used_scopes = [set() for _ in rules]
+        texts_cache = {}
+
+        initial_progress = tuple(0 for _ in rules)
+        # Для first_per_scope - все открытые контейнеры, от внешнего к внутреннему
+        initial_scopes = tuple(() for _ in rules)
+        stack = [(root, initial_progress, initial_scopes)]
+
+        while stack:
+            element, progress, scopes = stack.pop()
+
+            if progress is None:
+                # Хвостовой текст после закрывающего тега элемента
+                self.match_text(element.tail, element.getparent(), text_hits)
+                continue
+
+            tag = element.tag
+            if not isinstance(tag, str):
+                # Комментарии: BeautifulSoup.find_all(string=...) их тоже видит
+                if tag is etree.Comment and element.text:
+                    self.match_text(element.text, element.getparent(), text_hits)
+                if element.tail:
+                    self.match_text(element.tail, element.getparent(), text_hits)
+                continue
+
+            classes = element.get('class', '').split()
+            child_progress = list(progress)
+            child_scopes = list(scopes)
+
+            for index, rule in enumerate(rules):
+                parts = rule.parts
+                last = len(parts) - 1
+                matched = progress[index]
+
+                if matched == last and parts[last].matches(element, tag, classes):
+                    if rule.first_per_scope:
+                        # Как container.select_one по каждому контейнеру: во вложенных
+                        # контейнерах один и тот же элемент - первый для каждого из них
+                        count = 0
+                        for scope in scopes[index]:
+                            if scope not in used_scopes[index]:
+                                used_scopes[index].add(scope)
+                                count += 1
+                    else:
+                        count = 1
+                    if count:
+                        # Ключ - сам элемент: держим ссылку, чтобы lxml не пересоздал прокси
+                        if element not in texts_cache:
+                            texts_cache[element] = element_text(element)
+                        selector_hits[index].extend([texts_cache[element]] * count)
+
+                if matched < last and parts[matched].matches(element, tag, classes):
+                    child_progress[index] = matched + 1
+                if rule.first_per_scope and last > 0 and parts[0].matches(element, tag, classes):
+                    child_scopes[index] = scopes[index] + (element,)
+
+            if element.text:
+                self.match_text(element.text, element, text_hits)
+
+            # Хвост элемента идёт после всего его поддерева, поэтому в стек он кладётся первым
+            if element.tail:
+                stack.append((element, None, None))
+            child_progress = tuple(child_progress)
+            child_scopes = tuple(child_scopes)
+            for child in reversed(element):
+                stack.append((child, child_progress, child_scopes))
+
+        candidates = []
+        for hits in selector_hits:
+            candidates.extend(hits)
+        for hits in text_hits:
+            candidates.extend(hits)
+        return candidates
+
+    def match_text(self, text, parent, text_hits):
+        if not self.text_prefilter or parent is None or parent.tag in SKIP_TEXT_PARENTS:
+            return
+        if not self.text_prefilter.search(text):
+            return
+        for index, pattern in enumerate(self.text_patterns):
+            if pattern.search(text):
+                text_hits[index].append(text.strip())
+
+
+_extractors = {}
+
+
+def get_extractor(marketplace):
+    extractor = _extractors.get(marketplace)
+    if extractor is None:
+        extractor = ProductExtractor(MARKETPLACE_SPECS[marketplace])
+        _extractors[marketplace] = extractor
+    return extractor
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+from urllib.parse import urljoin
+
+import aiohttp
+
+from crawler import last_page_in_html, page_url
+
+logger = logging.getLogger(__name__)
+
+
+class FetchResult:
+    # texts - готовые названия товаров (JSON API)
+    # pages - список (url, html) для разбора HTML-парсером маркетплейса
+    # page_count - сколько страниц каталога получено, failed - сколько не удалось,
+    # truncated - каталог длиннее max_pages и прочитан не до конца
+    def __init__(self, texts=None, pages=None, source='http', page_count=None, failed=0, truncated=False):
+        self.texts = texts or []
+        self.pages = pages or []
+        self.source = source
+        self.page_count = page_count if page_count is not None else len(self.pages) or int(bool(self.texts))
+        self.failed = failed
+        self.truncated = truncated
+
+    def __bool__(self):
+        return bool(self.texts or self.pages)
+
+
+class HttpSession:
+    # Одна ClientSession с keep-alive на все маркетплейсы
+
+    def __init__(self, user_agent, limit=10, limit_per_host=4, timeout=20):
+        self.user_agent = user_agent
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self._session = None
+
+    def get(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=120,
+                ttl_dns_cache=600
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={
+                    'User-Agent': self.user_agent,
+                    'Accept-Language': 'ru-RU,ru;q=0.9',
+                }
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class HttpBackend:
+    marketplace = None
+
+    def __init__(self, http, base_url):
+        self.http = http
+        self.base_url = base_url.rstrip('/') + '/'
+
+    def url(self, path):
+        return urljoin(self.base_url, path.lstrip('/'))
+
+    async def get_text(self, path, params=None):
+        async with self.http.get().get(self.url(path), params=params) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    async def get_json(self, path, params=None):
+        text = await self.get_text(path, params=params)
+        return json.loads(text)
+
+    async def fetch(self):
+        raise NotImplementedError
+
+
+class WildberriesHttpBackend(HttpBackend):
+    marketplace = "wildberries"
+
+    def __init__(self, http, base_url, seller_id, max_pages=20):
+        super().__init__(http, base_url)
+        self.seller_id = seller_id
+        self.max_pages = max_pages
+
+    async def fetch(self):
+        texts = []
+        page_count = 0
+        truncated = False
+        for page in range(1, self.max_pages + 1):
+            data = await self.get_json('/sellers/v2/catalog', params={
+                'appType': 1,
+                'curr': 'rub',
+                'dest': -1257786,
+                'sort': 'popular',
+                'supplier': self.seller_id,
+                'page': page,
+            })
+            products = (data.get('data') or {}).get('products') or data.get('products') or []
+            if not products:
+                break
+            page_count += 1
+            texts.extend(product['name'] for product in products if product.get('name'))
+            if len(products) < 100:
+                break
+        else:
+            # Последняя разрешённая страница полная - дальше могут быть ещё товары
+            truncated = True
+        return FetchResult(texts=texts, page_count=page_count, truncated=truncated)
+
+
+class OzonHttpBackend(HttpBackend):
+    marketplace = "ozon"
+
+    widget_prefixes = ('searchResultsV2', 'tileGridDesktop', 'tileGrid')
+
+    def __init__(self, http, base_url, seller_path, max_pages=20):
+        super().__init__(http, base_url)
+        self.seller_path = seller_path
+        self.max_pages = max_pages
+
+    async def fetch(self):
+        # Страницы каталога идут цепочкой: адрес следующей приходит в nextPage
+        texts = []
+        page_count = 0
+        path = self.seller_path
+        visited = set()
+        while path and path not in visited and page_count < self.max_pages:
+            visited.add(path)
+            data = await self.get_json('/api/entrypoint-api.bff/page/json/v2', params={
+                'url': path,
+            })
+            page_texts = []
+            for key, state in (data.get('widgetStates') or {}).items():
+                if not key.startswith(self.widget_prefixes):
+                    continue
+                if isinstance(state, str):
+                    try:
+                        state = json.loads(state)
+                    except ValueError:
+                        continue
+                self.collect_names(state, page_texts)
+            if not page_texts:
+                break
+            page_count += 1
+            texts.extend(page_texts)
+            path = data.get('nextPage')
+        truncated = bool(path) and path not in visited and page_count >= self.max_pages
+        return FetchResult(texts=texts, page_count=page_count, truncated=truncated)
+
+    def collect_names(self, node, texts):
+        # Название товара лежит в mainState: {"id": "name", "atom": {"textAtom": {"text": ...}}}
+        if isinstance(node, dict):
+            if node.get('id') == 'name':
+                text = ((node.get('atom') or {}).get('textAtom') or {}).get('text')
+                if text:
+                    texts.append(text)
+                    return
+            for value in node.values():
+                self.collect_names(value, texts)
+        elif isinstance(node, list):
+            for value in node:
+                self.collect_names(value, texts)
+
+
+class YandexHttpBackend(HttpBackend):
+    marketplace = "yandex"
+
+    def __init__(self, http, base_url, shop_path, max_pages=20):
+        super().__init__(http, base_url)
+        self.shop_path = shop_path
+        self.max_pages = max_pages
+
+    @staticmethod
+    def is_captcha(html):
+        return 'showcaptcha' in html or 'smart-captcha' in html
+
+    async def fetch(self):
+        # Первая страница даёт число страниц в пагинации, остальные запрашиваются
+        # параллельно (одновременных запросов к хосту не больше limit_per_host сессии)
+        html = await self.get_text(self.shop_path)
+        if self.is_captcha(html):
+            logger.info("Яндекс Маркет: HTTP-запрос получил капчу")
+            return FetchResult()
+        pages = [(self.url(self.shop_path), html)]
+
+        total_pages = last_page_in_html(html, self.marketplace)
+        last_page = min(total_pages, self.max_pages)
+        paths = [page_url(self.shop_path, self.marketplace, page) for page in range(2, last_page + 1)]
+        responses = await asyncio.gather(*[self.get_text(path) for path in paths], return_exceptions=True)
+        failed = 0
+        for path, response in zip(paths, responses):
+            if isinstance(response, Exception) or self.is_captcha(response):
+                failed += 1
+                logger.warning(f"Яндекс Маркет: страница {path} не получена по HTTP")
+                continue
+            pages.append((self.url(path), response))
+        return FetchResult(pages=pages, failed=failed, truncated=total_pages > self.max_pages)
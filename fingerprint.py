@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Собирает в браузере текст области со списком товаров: содержимое элементов
+# по селекторам спецификации и строки видимого текста, подходящие под текстовые правила.
+# Возвращается строка - её хэш и есть отпечаток страницы
+REGION_SCRIPT = """
+var selectors = arguments[0];
+var pattern = arguments[1] ? new RegExp(arguments[1], 'i') : null;
+var parts = [];
+for (var i = 0; i < selectors.length; i++) {
+    var nodes = document.querySelectorAll(selectors[i]);
+    for (var j = 0; j < nodes.length; j++) {
+        parts.push(nodes[j].textContent);
+    }
+}
+if (pattern && document.body) {
+    var lines = document.body.innerText.split('\\n');
+    for (var k = 0; k < lines.length; k++) {
+        if (pattern.test(lines[k])) {
+            parts.push(lines[k]);
+        }
+    }
+}
+return parts.join('\\n');
+"""
+
+SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+TAG_RE = re.compile(r'<[^>]+>')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint_text(text):
+    normalized = WHITESPACE_RE.sub(' ', text or '').strip()
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+
+
+def html_fingerprint(html):
+    # Видимый текст без разметки: атрибуты, nonce и токены в скриптах не влияют на отпечаток
+    text = SCRIPT_STYLE_RE.sub(' ', html or '')
+    text = COMMENT_RE.sub(' ', text)
+    text = TAG_RE.sub(' ', text)
+    return fingerprint_text(text)
+
+
+def texts_fingerprint(texts):
+    return fingerprint_text('\n'.join(texts))
+
+
+def combine(fingerprints):
+    return hashlib.md5('|'.join(fingerprints).encode('utf-8')).hexdigest()
+
+
+def region_arguments(spec):
+    selectors = []
+    for entry in spec.get("selectors", []):
+        selectors.append(entry if isinstance(entry, str) else entry["selector"])
+    patterns = spec.get("text_patterns", [])
+    pattern = '|'.join(f'(?:{p})' for p in patterns) if patterns else None
+    return selectors, pattern
+
+
+class FingerprintCache:
+    # Отпечатки страниц и результаты последней полной обработки по маркетплейсам.
+    # Сэкономленное время - разбор и отбор страниц, взятых из кэша по отпечатку
+
+    def __init__(self):
+        self.pages = {}
+        self.results = {}
+        self.skips = {}
+        self.time_saved = {}
+
+    def known(self, marketplace):
+        return {url: fp for (key, url), (fp, _, _) in self.pages.items() if key == marketplace}
+
+    def page_candidates(self, marketplace, url, fp):
+        cached = self.pages.get((marketplace, url))
+        if not cached or cached[0] != fp:
+            return None
+        _, candidates, elapsed = cached
+        self.time_saved[marketplace] = self.time_saved.get(marketplace, 0.0) + elapsed
+        return candidates
+
+    def store_page(self, marketplace, url, fp, candidates, elapsed):
+        self.pages[(marketplace, url)] = (fp, candidates, elapsed)
+
+    def check(self, marketplace, fp):
+        # Возвращает число товаров прошлого цикла, если область списка не изменилась
+        result = self.results.get(marketplace)
+        if not result or result[0] != fp:
+            return None
+        _, found = result
+        self.skips[marketplace] = self.skips.get(marketplace, 0) + 1
+        logger.info(
+            f"{marketplace}: страница не изменилась, обработка пропущена "
+            f"(пропусков: {self.skips[marketplace]}, сэкономлено на разборе {self.time_saved.get(marketplace, 0.0):.2f}с)"
+        )
+        return found
+
+    def commit(self, marketplace, fp, found):
+        self.results[marketplace] = (fp, found)
+
+    def stats(self):
+        return {
+            marketplace: {
+                'skips': self.skips.get(marketplace, 0),
+                'time_saved': round(self.time_saved.get(marketplace, 0.0), 2),
+            }
+            for marketplace in self.results
+        }
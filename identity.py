@@ -0,0 +1,114 @@
+import json
+import logging
+import math
+import time
+from collections import deque
+
+from storage import atomic_write_json
+from text_pipeline import normalize_name
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IdentityIndex:
+    # Похожесть названий товаров цели: инвертированный индекс триграмм -> id.
+    # Кандидат сравнивается только с товарами, у которых есть общие триграммы,
+    # а не со всем каталогом. Мера - коэффициент Дайса по множествам триграмм:
+    # смена числа гигабайт, перестановка слов или приписка акции его почти не меняют.
+    # Файл рядом с хранилищем товаров: {"names": {id: нормализованное}, "renames": [...]}
+
+    def __init__(self, path=None, threshold=0.8, max_renames=200):
+        self.path = path
+        self.threshold = threshold
+        self.names = {}
+        self.grams = {}
+        self.postings = {}
+        self.renames = deque(maxlen=max_renames)
+        self.dirty = False
+
+    def load(self, products):
+        # products - {id: название} из хранилища; индекс из файла сверяется с ним
+        stored = {}
+        if self.path:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                stored = data.get('names', {})
+                self.renames.extend(data.get('renames', []))
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                logger.error(f"Повреждён индекс похожести {self.path}: {e}")
+        for product_id, name in products.items():
+            self.add(product_id, name, stored.get(product_id))
+        self.dirty = set(stored) != set(products)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, product_id, name, normalized=None):
+        if product_id in self.names:
+            self.remove(product_id)
+        normalized = normalized if normalized is not None else normalize_name(name)
+        grams = trigrams(normalized)
+        self.names[product_id] = normalized
+        self.grams[product_id] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(product_id)
+        self.dirty = True
+
+    def remove(self, product_id):
+        if product_id not in self.names:
+            return
+        del self.names[product_id]
+        for gram in self.grams.pop(product_id):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(product_id)
+                if not posting:
+                    del self.postings[gram]
+        self.dirty = True
+
+    def candidates(self, name, allowed):
+        # [(похожесть, id)] по убыванию; allowed(id) отсекает товары, которые сравнивать нельзя.
+        # Префиксный фильтр: при Дайсе >= threshold общих триграмм не меньше
+        # threshold * |A| / (2 - threshold), значит хотя бы одна из самых редких
+        # |A| - min_common + 1 триграмм запроса у кандидата есть. Частые триграммы
+        # ("мтс", "сим") в поиск кандидатов не попадают
+        grams = trigrams(normalize_name(name))
+        if not grams or self.threshold > 1:
+            return []
+        min_common = max(1, math.ceil(self.threshold * len(grams) / (2 - self.threshold)))
+        rare = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))
+        found = set()
+        for gram in rare[:len(grams) - min_common + 1]:
+            found.update(self.postings.get(gram, ()))
+
+        matches = []
+        for product_id in found:
+            other = self.grams[product_id]
+            score = 2 * len(grams & other) / (len(grams) + len(other))
+            if score >= self.threshold and allowed(product_id):
+                matches.append((score, product_id))
+        matches.sort(reverse=True)
+        return matches
+
+    def record_rename(self, old_id, new_id, old_name, new_name):
+        self.renames.append([int(time.time()), old_id, new_id, old_name, new_name])
+        self.dirty = True
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return False
+        try:
+            atomic_write_json(self.path, {'names': self.names, 'renames': list(self.renames)})
+            self.dirty = False
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения индекса похожести {self.path}: {e}")
+            return False
@@ -0,0 +1,224 @@
+import json
+import logging
+import sqlite3
+import time
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+
+CREATE TABLE IF NOT EXISTS workers (
+    name TEXT PRIMARY KEY,
+    started REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    active INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    lost INTEGER NOT NULL DEFAULT 0,
+    busy_seconds REAL NOT NULL DEFAULT 0,
+    pages INTEGER NOT NULL DEFAULT 0,
+    products INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+WORKER_FIELDS = ('name', 'started', 'last_seen', 'active', 'done', 'failed', 'lost', 'busy_seconds', 'pages', 'products')
+
+
+class JobQueue:
+    # Очередь заданий на сбор товаров в SQLite: координатор кладёт задания и ждёт результат,
+    # воркеры берут их в аренду на lease секунд и продлевают аренду, пока работают.
+    # Задание с истёкшей арендой (воркер упал или завис) возвращается в очередь,
+    # после max_attempts попыток считается проваленным.
+    # Каждый вызов открывает своё соединение - методы можно звать из любых потоков и процессов
+    # одной машины. Файл очереди - на локальном диске: WAL не работает по сетевым ФС
+
+    def __init__(self, path, lease=300, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease
+        self.max_attempts = max_attempts
+        with closing(self.connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def enqueue(self, target_id, payload):
+        now = time.time()
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                'INSERT INTO jobs (target_id, payload, max_attempts, created, updated) VALUES (?, ?, ?, ?, ?)',
+                (target_id, json.dumps(payload, ensure_ascii=False), self.max_attempts, now, now)
+            )
+            return cursor.lastrowid
+
+    def reclaim(self, conn, now):
+        # Аренды, которые никто не продлил: задание снова в очередь или в проваленные
+        expired = conn.execute(
+            "SELECT id, worker, attempts, max_attempts FROM jobs WHERE status = 'leased' AND lease_expires < ?",
+            (now,)
+        ).fetchall()
+        for job_id, worker, attempts, max_attempts in expired:
+            if attempts >= max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, worker = NULL, updated = ? WHERE id = ?",
+                    (f"аренда истекла, попыток: {attempts}", now, job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'pending', worker = NULL, updated = ? WHERE id = ?",
+                    (now, job_id)
+                )
+            conn.execute(
+                'UPDATE workers SET lost = lost + 1, active = MAX(active - 1, 0) WHERE name = ?',
+                (worker,)
+            )
+            logger.warning(f"Задание {job_id}: аренда воркера {worker} истекла (попыток: {attempts})")
+        return len(expired)
+
+    def lease(self, worker):
+        # Самое старое задание в аренду воркеру: (id, цель, payload) или None
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.reclaim(conn, now)
+                row = conn.execute(
+                    "SELECT id, target_id, payload FROM jobs WHERE status = 'pending' ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, "
+                        "attempts = attempts + 1, updated = ? WHERE id = ?",
+                        (worker, now + self.lease_seconds, now, row[0])
+                    )
+                    conn.execute(
+                        'UPDATE workers SET active = active + 1, last_seen = ? WHERE name = ?',
+                        (now, worker)
+                    )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def heartbeat(self, job_id, worker):
+        # Продлевает аренду; False - задание уже не наше (аренда истекла и передана другому)
+        now = time.time()
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, job_id, worker)
+            )
+            conn.execute('UPDATE workers SET last_seen = ? WHERE name = ?', (now, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result, duration, pages=0, products=0):
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'done', result = ?, updated = ? "
+                    "WHERE id = ? AND worker = ? AND status = 'leased'",
+                    (json.dumps(result, ensure_ascii=False), now, job_id, worker)
+                )
+                accepted = cursor.rowcount == 1
+                if accepted:
+                    conn.execute(
+                        'UPDATE workers SET done = done + 1, active = MAX(active - 1, 0), busy_seconds = busy_seconds + ?, '
+                        'pages = pages + ?, products = products + ?, last_seen = ? WHERE name = ?',
+                        (duration, pages, products, now, worker)
+                    )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        if not accepted:
+            logger.warning(f"Задание {job_id}: результат воркера {worker} опоздал, аренда уже истекла")
+        return accepted
+
+    def fail(self, job_id, worker, error, duration, retry=True):
+        # retry - вернуть задание в очередь, если попытки ещё остались
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'leased'",
+                    (job_id, worker)
+                ).fetchone()
+                if row:
+                    status = 'pending' if retry and row[0] < row[1] else 'failed'
+                    conn.execute(
+                        'UPDATE jobs SET status = ?, error = ?, worker = NULL, updated = ? WHERE id = ?',
+                        (status, str(error)[:500], now, job_id)
+                    )
+                    conn.execute(
+                        'UPDATE workers SET failed = failed + 1, active = MAX(active - 1, 0), '
+                        'busy_seconds = busy_seconds + ?, last_seen = ? WHERE name = ?',
+                        (duration, now, worker)
+                    )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def result(self, job_id):
+        # (статус, результат, ошибка); статус None - задание пропало из очереди
+        with closing(self.connect()) as conn:
+            row = conn.execute('SELECT status, result, error FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row and row[0] == 'leased':
+                # Воркеров, которые заберут просроченные задания, может и не быть
+                conn.execute('BEGIN IMMEDIATE')
+                reclaimed = self.reclaim(conn, time.time())
+                conn.execute('COMMIT')
+                if reclaimed:
+                    row = conn.execute('SELECT status, result, error FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None, None, None
+        status, result, error = row
+        return status, json.loads(result) if result else None, error
+
+    def discard(self, job_id):
+        # Координатор забрал результат или перестал ждать
+        with closing(self.connect()) as conn:
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def register_worker(self, name):
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.execute(
+                'INSERT INTO workers (name, started, last_seen) VALUES (?, ?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET last_seen = excluded.last_seen, active = 0',
+                (name, now, now)
+            )
+
+    def worker_stats(self):
+        with closing(self.connect()) as conn:
+            rows = conn.execute(f"SELECT {', '.join(WORKER_FIELDS)} FROM workers ORDER BY name").fetchall()
+        return [dict(zip(WORKER_FIELDS, row)) for row in rows]
+
+    def depth(self):
+        with closing(self.connect()) as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
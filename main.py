@@ -2,24 +2,45 @@ import asyncio
 import logging
 import json
 import time
-import random
 from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
 from telegram import Bot
-from telegram.ext import Application, CommandHandler
+from telegram.error import BadRequest
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler
 import re
-from urllib.parse import quote
+from urllib.parse import urlsplit
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
 import os
-import hashlib
+from collections import deque
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import config
+from driver_pool import DriverPool
+from extraction import BROWSER_EXTRACT_SCRIPT, MARKETPLACE_SPECS, get_extractor
+import fingerprint
+from fingerprint import FingerprintCache
+from text_pipeline import TextPipeline
+from storage import create_storage
+from scheduler import AdaptiveScheduler, RunSkipped
+from readiness import BlockedPageError, detect_block_html, detect_block_page, probe_page, wait_for_catalog
+from circuit_breaker import CircuitBreaker
+from resource_blocking import ResourceBlocker
+from notifications import NotificationQueue
+import views
+from views import RenderCache
+from corpus import CorpusRecorder
+from dump_store import DumpStore
+from metrics import Metrics, start_metrics_server
+import page_parser
+from targets import MARKETPLACE_NAMES, TargetRegistry
+from workers import FairWorkQueue
+from crawler import TabCrawler, page_url
+from product_state import ProductState
+from identity import IdentityIndex
+from job_queue import JobQueue
+from fetch_backends import HttpSession, OzonHttpBackend, WildberriesHttpBackend, YandexHttpBackend
 
 # Настройка логирования
 logging.basicConfig(
@@ -28,604 +49,1015 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Общий конвейер для всех целей одного типа маркетплейса: чего ждать после загрузки
+# страницы (селекторы проверяются разом, запасной - только если основные не появились)
+# и копятся ли товары между прогонами (Ozon) или список заменяется целиком
+MARKETPLACE_PIPELINES = {
+    "yandex": {
+        "ready": ["body"],
+        "fallback": None,
+        "timeout": 20,
+        "accumulate": False,
+    },
+    "wildberries": {
+        "ready": [".product-card__name", ".card-product"],
+        "fallback": "body",
+        "timeout": 20,
+        "accumulate": False,
+    },
+    "ozon": {
+        "ready": ["body"],
+        "fallback": None,
+        "timeout": 15,
+        "accumulate": True,
+    },
+}
+
 class MarketplaceParser:
-    def __init__(self, bot_token, chat_id):
-        self.bot_token = bot_token
-        self.chat_id = chat_id
-        self.bot = Bot(token=bot_token)
-        
-        # Файлы для хранения данных
-        self.wildberries_file = 'wildberries_products.json'
-        self.yandex_file = 'yandex_products.json'
-        self.ozon_file = 'ozon_products.json'
-        
-        # Директория для дампов HTML
-        self.html_dump_dir = 'html_dumps'
-        if not os.path.exists(self.html_dump_dir):
-            os.makedirs(self.html_dump_dir)
-        
-        # Загрузка существующих данных
-        self.wildberries_products = self.load_products(self.wildberries_file)
-        self.yandex_products = self.load_products(self.yandex_file)
-        self.ozon_products = self.load_products(self.ozon_file)
+    def __init__(self, registry, worker=False):
+        # worker=True - процесс scrape_worker.py: только сбор товаров,
+        # без бота, хранилища, предохранителей и расписания
+        self.registry = registry
+        self.worker = worker
         
-        # Флаг первого запуска
-        self.first_run = {
-            "yandex": len(self.yandex_products) == 0,
-            "wildberries": len(self.wildberries_products) == 0,
-            "ozon": len(self.ozon_products) == 0
-        }
-
-    def normalize_product_name(self, text):
-        if not text:
-            return ""
-        text = text.lower()
-        text = re.sub(r'\s+', ' ', text).strip()
-        text = re.sub(r'[^\w\sа-яё]', '', text)
-        text = re.sub(r'\s+', ' ', text)
-        return text
-
-    def generate_product_id(self, text):
-        normalized = self.normalize_product_name(text)
-        return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:16]
-
-    def save_html_dump(self, html_content, filename):
-        try:
-            filepath = os.path.join(self.html_dump_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            logger.info(f"HTML сохранен: {filepath}")
-            return filepath
-        except Exception as e:
-            logger.error(f"Ошибка сохранения HTML: {e}")
-            return None
-
-    def load_products(self, filename):
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-
-    def save_products(self, filename, products):
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(products, f, ensure_ascii=False, indent=2)
-
-    async def send_notification(self, message):
-        try:
-            await self.bot.send_message(
-                chat_id=self.chat_id,
-                text=message,
-                parse_mode='HTML'
+        # Замеры этапов: /metrics, /perf и трассировка прогонов
+        self.metrics = Metrics(trace_file=None if worker else config.TRACE_FILE or None)
+        
+        if not worker:
+            self.init_state()
+        self.init_scraping()
+        
+        # Распределённый режим: страницы собирают процессы scrape_worker.py,
+        # координатор раздаёт им задания через общую очередь и обрабатывает результат
+        self.jobs = None
+        if config.RUN_MODE == 'coordinator' and not worker:
+            self.jobs = JobQueue(
+                config.JOB_QUEUE_PATH,
+                lease=config.JOB_LEASE_SECONDS,
+                max_attempts=config.JOB_MAX_ATTEMPTS
             )
-            logger.info(f"Notification sent: {message}")
-        except Exception as e:
-            logger.error(f"Error sending notification: {e}")
 
-    def clean_product_text(self, text, marketplace):
-        if not text:
-            return ""
-        
-        clean_text = text
+    def init_state(self):
+        registry = self.registry
+        self.bot_token = registry.bot_token
+        self.chat_id = registry.chat_id
+        self.bot = Bot(token=self.bot_token)
+        self.metrics.add_collector(self.metric_gauges)
         
-        if marketplace == "wildberries":
-            clean_text = re.sub(r'^[^A-Za-zА-Яа-я/]*', '', clean_text)
-            clean_text = re.sub(r'−\d+%\s*\d+\s*₽\s*\d+\s*₽\s*−\d+%', '', clean_text)
-            clean_text = re.sub(r'\d+\s*оценок?\s*\d*\s*После$', '', clean_text)
-            clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-            
-        elif marketplace == "ozon":
-            clean_text = re.sub(r'^мтс сим карта\s*-\s*купить на\s*', '', clean_text, flags=re.IGNORECASE)
-            clean_text = re.sub(r'^мтс тариф\s*-\s*купить на\s*', '', clean_text, flags=re.IGNORECASE)
-            clean_text = re.sub(r'\s*-\s*купить на$', '', clean_text, flags=re.IGNORECASE)
-            clean_text = re.sub(r'^купить на\s*', '', clean_text, flags=re.IGNORECASE)
-            
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+        # Очередь исходящих уведомлений с лимитами Telegram и повторами
+        self.notifier = NotificationQueue(
+            self.bot,
+            self.chat_id,
+            per_second=config.NOTIFY_PER_SECOND,
+            per_minute=config.NOTIFY_PER_MINUTE,
+            coalesce_delay=config.NOTIFY_COALESCE_DELAY,
+            max_retries=config.NOTIFY_MAX_RETRIES,
+            max_listed=config.NOTIFY_MAX_LISTED,
+            metrics=self.metrics
+        )
         
-        return clean_text
-
-    def is_valid_mts_product(self, text):
-        if not text or len(text) < 10 or len(text) > 200:
-            return False
+        # Файлы для хранения данных (JSON, по файлу на цель) либо общая база SQLite
+        self.product_files = {target.id: target.products_file for target in registry}
+        self.storage = create_storage(
+            config.STORAGE_BACKEND,
+            self.product_files,
+            config.SQLITE_PATH,
+            compact_every=config.JOURNAL_COMPACT_EVERY
+        )
         
-        text_lower = text.lower()
+        # Загрузка существующих данных: состояние с отметками последнего появления,
+        # давно не виденные товары вытесняются по PRODUCT_TTL_HOURS и PRODUCT_STATE_MAX.
+        # Индекс похожести названий лежит рядом с файлом товаров цели
+        self.products = {}
+        for target in registry:
+            identity = IdentityIndex(
+                os.path.splitext(target.products_file)[0] + '.identity.json',
+                threshold=config.IDENTITY_THRESHOLD
+            )
+            state = ProductState(
+                ttl=config.PRODUCT_TTL_HOURS * 3600,
+                max_size=config.PRODUCT_STATE_MAX,
+                identity=identity
+            )
+            state.load(self.load_products(target.id))
+            self.products[target.id] = state
         
-        if not any(keyword in text_lower for keyword in ['мтс', 'mts']):
-            return False
+        # Флаг первого запуска
+        self.first_run = {target_id: len(state) == 0 for target_id, state in self.products.items()}
         
-        product_keywords = [
-            'сим', 'sim', 'карт', 'тариф', 'tariff', 'телеком', 'связ', 
-            'номер', 'mobile', 'плюс', 'plus', 'баланс', 'интернет', 'пакет',
-            'звонк', 'минут', 'гигабайт', 'гб', 'gb', 'трафик', 'риил', 'реал',
-            'больше', 'джуниор', 'мембрана', 'супер', 'ноутбук', 'устройств'
-        ]
-        if not any(keyword in text_lower for keyword in product_keywords):
-            return False
+        # Итоги последнего обхода по целям: страниц, ошибок, товаров
+        self.crawl_stats = {}
         
-        strict_exclude_keywords = [
-            'сбер', 'sber', 'теле2', 'tele2', 'билайн', 'beeline', 'мегафон', 'megafon',
-            'тинькофф', 'tinkoff', 'яндекс', 'yandex', 'оплата', 'пополнен', 'доставк',
-            'отзыв', 'реценз', 'комментар', 'опрос', 'акция', 'скидк', 'распродаж',
-            'чехол', 'наушник', 'powerbank', 'зарядк', 'баллов', 'cashback', 'роутер',
-            'модем', 'рация', 'радио', 'каталог', 'интернет-магазин', 'ассортимент',
-            'вы найдете', 'в каталоге', 'пао мтс', ' кошелек'
-        ]
+        # Предохранители по маркетплейсам: сбоящий или заблокировавший нас сайт
+        # не получает новых браузеров, пока дешёвая проверка не покажет, что он ожил
+        self.breakers = {
+            marketplace: CircuitBreaker(
+                MARKETPLACE_NAMES[marketplace],
+                threshold=config.BREAKER_THRESHOLD,
+                cooldown=config.BREAKER_COOLDOWN,
+                max_cooldown=config.BREAKER_MAX_COOLDOWN
+            )
+            for marketplace in {target.marketplace for target in registry}
+        }
         
-        if any(exclude in text_lower for exclude in strict_exclude_keywords):
-            return False
+        # Прогоны всех целей идут через фиксированное число воркеров с очередью по маркетплейсам
+        self.work_queue = FairWorkQueue(config.SCRAPE_WORKERS)
+        self.target_locks = {target.id: asyncio.Lock() for target in registry}
+        self.changes_detected = {target.id: False for target in registry}
         
-        return True
+        # Версия состояния растёт при каждом изменении списка товаров;
+        # по ней инвалидируются готовые ответы /sp и /stats
+        self.state_versions = {target.id: 0 for target in registry}
+        self.render_cache = RenderCache(max_size=config.RENDER_CACHE_SIZE)
 
-    async def human_delay(self, min_sec=2, max_sec=5):
-        await asyncio.sleep(random.uniform(min_sec, max_sec))
-
-def setup_selenium_driver(self):
-    try:
-        chrome_options = Options()
+    def init_scraping(self):
+        # Всё для сбора страниц. Координатору распределённого режима браузеры не нужны,
+        # но пул и процессы разбора создаются лениво и без заданий ничего не занимают
+        registry = self.registry
+        
+        # Дампы HTML: сжатые, без дублей, с ограничением по размеру
+        self.html_dumps = DumpStore(
+            config.DUMP_DIR,
+            max_bytes=config.DUMP_MAX_MB * 1024 * 1024,
+            max_files=config.DUMP_MAX_FILES
+        )
         
-        # Обязательные опции для хостинга
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--remote-debugging-port=9222')
+        # Запись страниц для офлайн-бенчмарка (bench.py)
+        self.corpus = CorpusRecorder(config.CORPUS_DIR)
         
-        # Оптимизация производительности
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-plugins')
-        chrome_options.add_argument('--disable-images')
-        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        # Очистка названий с кэшем: одни и те же названия приходят каждый цикл
+        self.text_pipeline = TextPipeline(max_size=config.TEXT_CACHE_SIZE)
         
-        # Обход детекции
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
+        # Отпечатки страниц: неизменившийся каталог не разбирается повторно
+        self.fingerprints = FingerprintCache()
         
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        # Пул браузеров, живущих между циклами
+        self.driver_pool = DriverPool(
+            self.setup_selenium_driver,
+            max_size=config.DRIVER_POOL_SIZE,
+            max_uses=config.DRIVER_MAX_USES,
+            acquire_timeout=config.DRIVER_ACQUIRE_TIMEOUT,
+            metrics=self.metrics
+        )
         
-        # Используем системный Chrome
-        chrome_options.binary_location = '/usr/bin/google-chrome-stable'
+        # Обход остальных страниц каталога во вкладках с лимитом загрузок на сайт
+        self.crawler = TabCrawler(
+            config.CRAWL_TABS,
+            max_pages=config.CRAWL_MAX_PAGES,
+            slot_timeout=config.DRIVER_ACQUIRE_TIMEOUT
+        )
         
-        service = Service('/usr/local/bin/chromedriver')
-        driver = webdriver.Chrome(service=service, options=chrome_options)
+        # Списки блокировки сетевых запросов по маркетплейсам
+        self.resource_blocker = ResourceBlocker.from_file(config.BLOCKLIST_FILE)
         
-        return driver
-    except Exception as e:
-        logger.error(f"Ошибка настройки Selenium: {e}")
+        # Selenium блокирующий, поэтому работает в отдельных потоках
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.SELENIUM_WORKERS,
+            thread_name_prefix='selenium'
+        )
+        # Разбор HTML и отбор товаров - в пуле процессов, чтобы занять все ядра
+        self.parse_pool = self.create_parse_pool()
+        
+        self.page_load_times = {target.id: deque(maxlen=100) for target in registry}
+        
+        # Быстрый HTTP-путь, Selenium остаётся запасным вариантом
+        self.http = HttpSession(
+            config.USER_AGENT,
+            limit=config.HTTP_POOL_LIMIT,
+            timeout=config.HTTP_TIMEOUT
+        )
+        self.http_backends = {}
+        if config.HTTP_FAST_PATH:
+            for target in registry:
+                backend = self.create_http_backend(target)
+                if backend:
+                    self.http_backends[target.id] = backend
+
+    def create_http_backend(self, target):
+        path = urlsplit(target.url).path
+        max_pages = config.CRAWL_MAX_PAGES
+        if target.marketplace == "yandex":
+            return YandexHttpBackend(self.http, config.YANDEX_BASE_URL, path, max_pages=max_pages)
+        if target.marketplace == "wildberries":
+            match = re.search(r'/seller/(\d+)', target.url)
+            if match:
+                return WildberriesHttpBackend(self.http, config.WILDBERRIES_API_URL, match.group(1), max_pages=max_pages)
+            return None
+        if target.marketplace == "ozon":
+            return OzonHttpBackend(self.http, config.OZON_BASE_URL, path, max_pages=max_pages)
         return None
 
-    async def parse_yandex_market_selenium(self):
-        driver = None
+    async def close(self):
+        if not self.worker:
+            await self.work_queue.stop()
+            await self.notifier.stop()
+        await self.http.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.parse_pool:
+            self.parse_pool.shutdown(wait=False, cancel_futures=True)
+        self.driver_pool.close()
+        if not self.worker:
+            self.storage.close()
+        self.html_dumps.close()
+
+    def save_html_dump(self, marketplace, url, html_content):
+        # Запись в фоновом потоке, здесь только постановка в очередь
+        if not self.html_dumps.put(marketplace, url, html_content):
+            logger.warning(f"Очередь дампов переполнена, дамп {url} пропущен")
+
+    def load_products(self, target_id):
+        return self.storage.load(target_id)
+
+    def save_products(self, target, diff, seen):
+        # Пишется только дифф прогона и отметки о встреченных товарах
+        with self.metrics.timer("save", target.id):
+            saved = self.storage.apply(target.id, diff.upserts(), diff.deletions(), seen)
+            self.products[target.id].identity.save()
+        if saved:
+            logger.info(f"{target.name}: изменения сохранены")
+
+    async def send_notification(self, message, chat_id=None):
+        # Только ставит сообщение в очередь - отправка не задерживает парсинг
+        self.notifier.add_message(message, chat_id)
+
+    def setup_selenium_driver(self):
         try:
-            current_products = {}
-            
-            driver = self.setup_selenium_driver()
-            if not driver:
-                return False
-            
-            url = "https://market.yandex.ru/business--pao-mts/5336359"
+            chrome_options = Options()
+        
+            # Обязательные опции для хостинга
+            chrome_options.add_argument('--no-sandbox')
+            chrome_options.add_argument('--disable-dev-shm-usage')
+            chrome_options.add_argument('--headless')
+            chrome_options.add_argument('--disable-gpu')
+        
+            # Оптимизация производительности
+            chrome_options.add_argument('--disable-extensions')
+            chrome_options.add_argument('--disable-plugins')
             
+            # Картинки и прочие тяжёлые ресурсы режутся через CDP (см. block_resources),
+            # журнал производительности нужен для подсчёта заблокированных запросов
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        
+            # Обход детекции
+            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+            chrome_options.add_experimental_option('useAutomationExtension', False)
+        
+            chrome_options.add_argument(f'--user-agent={config.USER_AGENT}')
+        
+            # Используем системный Chrome
+            chrome_options.binary_location = '/usr/bin/google-chrome-stable'
+        
+            service = Service('/usr/local/bin/chromedriver')
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+        
+            return driver
+        except Exception as e:
+            logger.error(f"Ошибка настройки Selenium: {e}")
+            return None
+
+    def create_parse_pool(self):
+        if config.PARSE_IN_PROCESS:
+            return None
+        # forkserver: дочерние процессы не наследуют потоки Selenium и пулов
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        return ProcessPoolExecutor(
+            max_workers=config.PARSE_WORKERS,
+            mp_context=multiprocessing.get_context(method),
+            initializer=page_parser.init_worker,
+            initargs=(self.registry.classifiers, config.TEXT_CACHE_SIZE)
+        )
+
+    def accept_products(self, target, page_products, products):
+        for product_id, clean_text in page_products.items():
+            if product_id not in products:
+                logger.info(f"Найден товар {target.name}: {clean_text}")
+            products[product_id] = clean_text
+
+    def select_products(self, target, texts):
+        # Кандидаты уже извлечены (в браузере или из API) - остаётся дешёвый отбор на месте
+        with self.metrics.timer("classify", target.id):
+            return page_parser.select_products(
+                target.marketplace, texts, self.registry.classifier_for(target), self.text_pipeline
+            )
+
+    async def parse_html(self, target, html):
+        # HTML -> {product_id: название}: чистая CPU-работа, event loop её только ждёт
+        with self.metrics.timer("extract_html", target.id):
+            if self.parse_pool is None:
+                return page_parser.parse_page(
+                    target.marketplace, html, target.keywords, self.registry.classifier_for(target), self.text_pipeline
+                )
+            loop = asyncio.get_running_loop()
             try:
-                logger.info(f"Yandex Market: загрузка {url}")
-                driver.get(url)
-                
-                WebDriverWait(driver, 20).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
+                return await loop.run_in_executor(
+                    self.parse_pool, page_parser.parse_page, target.marketplace, html, target.keywords
                 )
-                
-                await asyncio.sleep(3)
-                
-                for i in range(2):
-                    driver.execute_script(f"window.scrollTo(0, {i * 600});")
-                    await asyncio.sleep(2)
-                
-                page_source = driver.page_source
-                soup = BeautifulSoup(page_source, 'html.parser')
-                
-                product_elements = soup.select('[data-autotest-id="product-snippet"]')
-                for product in product_elements:
-                    name_element = product.select_one('[data-autotest-id="product-title"]')
-                    if name_element:
-                        product_name = name_element.get_text(strip=True)
-                        clean_name = self.clean_product_text(product_name, "yandex")
-                        if clean_name and self.is_valid_mts_product(clean_name):
-                            product_id = self.generate_product_id(clean_name)
-                            current_products[product_id] = clean_name
-                            logger.info(f"Найден товар Яндекс: {clean_name}")
-                
-                class_selectors = ['._6yVOX', '.XqR4A', '.cia-cs', '.cia-vs']
-                for selector in class_selectors:
-                    elements = soup.select(selector)
-                    for element in elements:
-                        text = element.get_text(strip=True)
-                        clean_text = self.clean_product_text(text, "yandex")
-                        if clean_text and self.is_valid_mts_product(clean_text):
-                            product_id = self.generate_product_id(clean_text)
-                            current_products[product_id] = clean_text
-                
-                text_elements = soup.find_all(string=re.compile(r'мтс|mts|сим|sim|тариф|плюс|plus', re.I))
-                for element in text_elements:
-                    if element.parent and element.parent.name not in ['script', 'style']:
-                        text = element.strip()
-                        clean_text = self.clean_product_text(text, "yandex")
-                        if clean_text and self.is_valid_mts_product(clean_text):
-                            product_id = self.generate_product_id(clean_text)
-                            current_products[product_id] = clean_text
-                
-                await self.human_delay(1, 2)
-                
+            except BrokenProcessPool as e:
+                logger.error(f"Пул процессов разбора упал ({e}), пересоздаём")
+                self.parse_pool = self.create_parse_pool()
+                return page_parser.parse_page(
+                    target.marketplace, html, target.keywords, self.registry.classifier_for(target), self.text_pipeline
+                )
+
+    async def page_products(self, target, url, payload, fp):
+        # payload - HTML или уже извлечённые в браузере кандидаты. Возвращает
+        # (число кандидатов, товары страницы); страница с прежним отпечатком не разбирается заново
+        cached = self.fingerprints.page_candidates(target.id, url, fp)
+        if cached is not None:
+            return cached
+        # Время разбора запоминается вместе с результатом: столько экономит повторная страница
+        parse_start = time.perf_counter()
+        if isinstance(payload, list):
+            result = len(payload), self.select_products(target, payload)
+        else:
+            result = await self.parse_html(target, payload)
+        self.fingerprints.store_page(target.id, url, fp, result, time.perf_counter() - parse_start)
+        return result
+
+    async def fetch_products(self, target):
+        # Сначала быстрый HTTP-путь, Selenium - только если он упал или не дал товаров.
+        # Возвращает (товары по страницам, отпечаток всех страниц, итоги обхода) или None
+        # при ошибке. Страницы разбираются параллельно в пуле процессов
+        backend = self.http_backends.get(target.id)
+        if backend:
+            try:
+                with self.metrics.timer("http_fetch", target.id):
+                    result = await backend.fetch()
+                if result:
+                    logger.info(f"{target.name}: данные получены по HTTP")
+                    parsing = []
+                    fingerprints = []
+                    for url, html in result.pages:
+                        fp = fingerprint.html_fingerprint(html)
+                        if config.RECORD_CORPUS:
+                            await self.run_blocking(self.record_page, target, url, html, "http", fp)
+                        parsing.append(self.page_products(target, url, html, fp))
+                        fingerprints.append(fp)
+                    pages = list(await asyncio.gather(*parsing))
+                    if result.texts:
+                        pages.append((len(result.texts), self.select_products(target, result.texts)))
+                        fingerprints.append(fingerprint.texts_fingerprint(result.texts))
+                    # Кандидаты без единого товара - это оболочка или антибот-страница
+                    # со словами «МТС»/«Плюс» в шапке, а не пустой каталог
+                    if any(products for _, products in pages):
+                        crawl = {'pages': result.page_count, 'failed': result.failed, 'truncated': result.truncated}
+                        return [products for _, products in pages], fingerprint.combine(fingerprints), crawl
+                logger.info(f"{target.name}: HTTP не дал товаров, используем Selenium")
             except Exception as e:
-                logger.error(f"Ошибка Яндекс Маркет: {e}")
-                return False
-            
-            logger.info(f"Яндекс Маркет: найдено {len(current_products)} товаров")
-            
-            await self.check_changes(current_products, self.yandex_products, "Яндекс Маркет", "yandex")
-            self.yandex_products = current_products
-            self.save_products(self.yandex_file, current_products)
-            
-            return len(current_products) > 0
-            
-        except Exception as e:
-            logger.error(f"Ошибка парсинга Яндекс Маркет: {e}")
-            return False
-        finally:
-            if driver:
-                driver.quit()
+                logger.warning(f"{target.name}: HTTP недоступен ({e}), используем Selenium")
+        
+        loaded = await self.run_blocking(self.load_target_pages, target, self.fingerprints.known(target.id))
+        if loaded is None:
+            return None
+        loaded, failed, truncated = loaded
+        pages = await asyncio.gather(*[
+            self.page_products(target, url, payload, fp) for url, payload, fp in loaded
+        ])
+        crawl = {'pages': len(loaded), 'failed': failed, 'truncated': truncated}
+        return [products for _, products in pages], fingerprint.combine([fp for url, payload, fp in loaded]), crawl
 
-    async def parse_wildberries_selenium(self):
-        driver = None
+    async def fetch_remote(self, target):
+        # Распределённый режим: то же, что fetch_products, но страницы собирает
+        # любой свободный воркер. Задание, брошенное упавшим воркером, по истечении
+        # аренды достаётся другому; ждём не дольше JOB_TIMEOUT
+        job_id = await asyncio.to_thread(self.jobs.enqueue, target.id, {'target': target.id})
+        deadline = time.monotonic() + config.JOB_TIMEOUT
         try:
-            current_products = {}
-            
-            driver = self.setup_selenium_driver()
+            while True:
+                await asyncio.sleep(config.JOB_POLL_INTERVAL)
+                status, result, error = await asyncio.to_thread(self.jobs.result, job_id)
+                if status == 'done':
+                    break
+                if status == 'failed':
+                    logger.error(f"{target.name}: задание {job_id} провалено воркерами: {error}")
+                    return None
+                if status is None:
+                    logger.error(f"{target.name}: задание {job_id} пропало из очереди")
+                    return None
+                if time.monotonic() > deadline:
+                    logger.error(
+                        f"{target.name}: задание {job_id} не выполнено за {config.JOB_TIMEOUT:.0f}с "
+                        f"({'в работе' if status == 'leased' else 'нет свободных воркеров'})"
+                    )
+                    return None
+        finally:
+            await asyncio.to_thread(self.jobs.discard, job_id)
+        
+        if result['status'] == 'blocked':
+            raise BlockedPageError(result['error'])
+        if result['status'] != 'ok':
+            return None
+        return result['pages'], result['fingerprint'], result['crawl']
+
+    def block_resources(self, driver, marketplace):
+        if config.RESOURCE_BLOCKING:
+            self.resource_blocker.apply(driver, marketplace)
+
+    def wait_until_ready(self, driver, target, load_start):
+        # Вместо фиксированных пауз и прокрутки - ждём, пока число карточек перестанет расти
+        self.metrics.observe_stage("page_get", target.id, time.monotonic() - load_start)
+        selectors, _ = fingerprint.region_arguments(MARKETPLACE_SPECS[target.marketplace])
+        result = wait_for_catalog(
+            driver,
+            ', '.join(selectors),
+            stable_window=config.READY_STABLE_WINDOW,
+            hard_cap=config.READY_HARD_CAP,
+            poll_interval=config.READY_POLL_INTERVAL
+        )
+        self.metrics.observe_stage("ready_wait", target.id, result.elapsed)
+        if not result.count:
+            # Капча часто дорисовывается скриптом уже после появления body
+            reason = detect_block_page(driver)
+            if reason:
+                raise BlockedPageError(reason)
+        load_time = time.monotonic() - load_start
+        self.page_load_times[target.id].append(load_time)
+        logger.info(
+            f"{target.name}: страница готова за {load_time:.1f}с "
+            f"(карточек: {result.count}, ожидание {result.elapsed:.1f}с)"
+        )
+        return result
+
+    def capture_page(self, driver, target, url, known):
+        # Отпечаток области товаров считается в браузере; если он не изменился,
+        # со страницы больше ничего не забираем
+        selectors, pattern = fingerprint.region_arguments(MARKETPLACE_SPECS[target.marketplace])
+        with self.metrics.timer("fingerprint", target.id):
+            fp = fingerprint.fingerprint_text(driver.execute_script(fingerprint.REGION_SCRIPT, selectors, pattern))
+        if known.get(url) == fp:
+            return url, None, fp
+        
+        # Полный HTML тянем только для дампа, записи корпуса или если извлечение в браузере выключено
+        page_source = None
+        if config.DEBUG_HTML_DUMP or config.RECORD_CORPUS or not config.BROWSER_EXTRACTION:
+            with self.metrics.timer("page_source", target.id):
+                page_source = driver.page_source
+        if config.DEBUG_HTML_DUMP:
+            self.save_html_dump(target.id, url, page_source)
+        if config.RECORD_CORPUS:
+            self.record_page(target, url, page_source, "selenium", fp)
+        if not config.BROWSER_EXTRACTION:
+            return url, page_source, fp
+        
+        return url, self.extract_in_browser(driver, target), fp
+
+    def record_page(self, target, url, html, source, fp):
+        # В корпусе страницы лежат по типу маркетплейса - так их разбирает bench.py
+        return self.corpus.record(target.marketplace, url, html, source=source, fingerprint=fp, target=target.id)
+
+    def extract_in_browser(self, driver, target):
+        # Селекторы выполняются в странице, обратно приходит короткий JSON с кандидатами
+        with self.metrics.timer("extract_browser", target.id):
+            result = driver.execute_script(BROWSER_EXTRACT_SCRIPT, *get_extractor(target.marketplace).browser_arguments())
+        items = result['items']
+        size = len(json.dumps(items, ensure_ascii=False).encode('utf-8'))
+        logger.info(
+            f"{target.name}: в браузере извлечено {len(items)} кандидатов "
+            f"за {result['ms']:.0f}мс, передано {size / 1024:.1f} КБ"
+        )
+        return items
+
+    def wait_for_page(self, driver, pipeline):
+        # Один общий срок на все селекторы; капча или заглушка - BlockedPageError сразу
+        return probe_page(
+            driver,
+            pipeline["ready"],
+            fallback=pipeline["fallback"],
+            timeout=pipeline["timeout"],
+            fallback_after=config.READY_FALLBACK_AFTER,
+            poll_interval=config.READY_POLL_INTERVAL
+        )
+
+    def load_page(self, driver, target, url, load_start, known):
+        self.wait_for_page(driver, MARKETPLACE_PIPELINES[target.marketplace])
+        self.wait_until_ready(driver, target, load_start)
+        return self.capture_page(driver, target, url, known)
+
+    def load_target_pages(self, target, known):
+        # Блокирующая часть: выполняется в пуле потоков, а не в event loop.
+        # Первая страница каталога грузится в основной вкладке, по её пагинации
+        # остальные открываются во вкладках того же браузера.
+        # Возвращает (страницы, число незагруженных, обрезан ли каталог лимитом страниц) или None
+        pages = []
+        failed = 0
+        truncated = False
+        with self.driver_pool.session(target.id) as driver:
             if not driver:
-                return False
+                return None
+            if config.RESOURCE_BLOCKING:
+                self.resource_blocker.reset(driver)
             
-            url = "https://www.wildberries.ru/seller/2980#c494811627"
-            
-            try:
-                logger.info(f"Wildberries: загрузка {url}")
-                driver.get(url)
-                
+            for url in target.urls:
                 try:
-                    WebDriverWait(driver, 20).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, ".product-card__name"))
-                    )
-                except:
-                    try:
-                        WebDriverWait(driver, 20).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, ".card-product"))
-                        )
-                    except:
-                        WebDriverWait(driver, 20).until(
-                            EC.presence_of_element_located((By.TAG_NAME, "body"))
-                        )
-                
-                await asyncio.sleep(5)
-                
-                for i in range(4):
-                    driver.execute_script(f"window.scrollTo(0, {i * 800});")
-                    await asyncio.sleep(1)
-                
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                await asyncio.sleep(2)
-                
-                page_source = driver.page_source
-                
-                soup = BeautifulSoup(page_source, 'html.parser')
-                
-                product_selectors = [
-                    '.product-card__name',
-                    '.goods-name',
-                    '.card-product__name',
-                    '.product-card .product-card__name',
-                ]
-                
-                seen_products = set()
-                
-                for selector in product_selectors:
-                    elements = soup.select(selector)
-                    for element in elements:
-                        text = element.get_text(strip=True)
-                        clean_text = self.clean_product_text(text, "wildberries")
-                        
-                        if clean_text and self.is_valid_mts_product(clean_text):
-                            normalized = self.normalize_product_name(clean_text)
-                            if normalized not in seen_products:
-                                seen_products.add(normalized)
-                                product_id = self.generate_product_id(clean_text)
-                                current_products[product_id] = clean_text
-                                logger.info(f"Найден товар Wildberries: {clean_text}")
-                
-                await self.human_delay(1, 2)
+                    logger.info(f"{target.name}: загрузка {url}")
+                    with self.crawler.slot(target.marketplace):
+                        self.block_resources(driver, target.marketplace)
+                        load_start = time.monotonic()
+                        driver.get(url)
+                        pages.append(self.load_page(driver, target, url, load_start, known))
+                    
+                except BlockedPageError:
+                    # Дальше по сайту идти бессмысленно - решает предохранитель
+                    raise
+                except Exception as e:
+                    # Сколько страниц за этой, неизвестно - обход считается неполным
+                    logger.error(f"Ошибка {target.name} для {url}: {e}")
+                    failed += 1
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Ошибка Wildberries: {e}")
-                return False
-            
-            logger.info(f"Wildberries: найдено {len(current_products)} товаров")
-            
-            await self.check_changes(current_products, self.wildberries_products, "Wildberries", "wildberries")
-            self.wildberries_products = current_products
-            self.save_products(self.wildberries_file, current_products)
-            
-            return len(current_products) > 0
+                last_page, capped = self.crawler.discover(driver, target.marketplace)
+                truncated = truncated or capped
+                if last_page < 2:
+                    continue
+                logger.info(f"{target.name}: в каталоге {last_page} стр., загружаем остальные во вкладках")
+                with self.metrics.timer("crawl_tabs", target.id):
+                    crawled, tab_failures = self.crawler.crawl(
+                        driver,
+                        target.marketplace,
+                        [page_url(url, target.marketplace, page) for page in range(2, last_page + 1)],
+                        lambda tab: self.block_resources(tab, target.marketplace),
+                        lambda tab, page, load_start: self.load_page(tab, target, page, load_start, known)
+                    )
+                pages.extend(crawled)
+                failed += tab_failures
             
-        except Exception as e:
-            logger.error(f"Ошибка парсинга Wildberries: {e}")
-            return False
-        finally:
-            if driver:
-                driver.quit()
+            if config.RESOURCE_BLOCKING and pages:
+                self.resource_blocker.report(driver, target.marketplace, pages=len(pages))
+        
+        return (pages, failed, truncated) if pages else None
 
-    async def parse_ozon_selenium(self):
-        driver = None
+    async def parse_target(self, target):
+        # True - товары получены, None - сайт ответил, но товаров нет, False - ошибка
+        pipeline = MARKETPLACE_PIPELINES[target.marketplace]
         try:
             current_products = {}
             
-            driver = self.setup_selenium_driver()
-            if not driver:
+            if self.jobs:
+                fetched = await self.fetch_remote(target)
+            else:
+                fetched = await self.fetch_products(target)
+            if fetched is None:
                 return False
             
-            urls = [
-                "https://www.ozon.ru/seller/mts-55913/products/"
-            ]
+            pages, page_fingerprint, crawl = fetched
+            found = self.fingerprints.check(target.id, page_fingerprint)
+            if found is not None:
+                # Каталог не изменился, но его товары встречены: иначе они истекут по ttl,
+                # а в истории SQLite не будет этого появления
+                seen = [product_id for page in pages for product_id in page]
+                self.products[target.id].touch(seen)
+                self.storage.touch(target.id, seen)
+                return True if found else None
             
-            for url_index, url in enumerate(urls):
-                try:
-                    logger.info(f"Ozon: загрузка {url}")
-                    driver.get(url)
-                    
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "body"))
-                    )
-                    
-                    await asyncio.sleep(5)
-                    
-                    for i in range(3):
-                        driver.execute_script(f"window.scrollTo(0, {i * 600});")
-                        await asyncio.sleep(2)
-                    
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    await asyncio.sleep(2)
-                    
-                    page_source = driver.page_source
-                    
-                    soup = BeautifulSoup(page_source, 'html.parser')
-                    
-                    product_selectors = [
-                        '.tile-root .tsBody500',
-                        '.tile-root .tsHeadline500',
-                        '.tile-root .tsBodyL',
-                        '.tile-root .tsHeadlineL',
-                        '[data-widget="searchResultsV2"] .tsBody500',
-                        '[data-widget="searchResultsV2"] .tsHeadline500',
-                        '.x2h .tsBody500',
-                        '.x2h .tsHeadline500',
-                        '.i9x6 .tsBody500',
-                        '.i9x6 .tsHeadline500',
-                        '.product-card .title',
-                        '.product-card .name',
-                    ]
-                    
-                    seen_products = set()
-                    
-                    for selector in product_selectors:
-                        try:
-                            elements = soup.select(selector)
-                            for element in elements:
-                                text = element.get_text(strip=True)
-                                clean_text = self.clean_product_text(text, "ozon")
-                                if (clean_text and len(clean_text) > 15 and 
-                                    self.is_valid_mts_product(clean_text)):
-                                    normalized = self.normalize_product_name(clean_text)
-                                    if normalized not in seen_products:
-                                        seen_products.add(normalized)
-                                        product_id = self.generate_product_id(clean_text)
-                                        current_products[product_id] = clean_text
-                                        logger.info(f"Найден товар Ozon (селектор): {clean_text}")
-                        except Exception as e:
-                            logger.error(f"Ошибка в селекторе {selector}: {e}")
-                            continue
-                    
-                    keywords = ['сим-карта мтс', 'sim-карта мтс', 'мтс тариф', 'мтс баланс']
-                    for keyword in keywords:
-                        text_elements = soup.find_all(string=re.compile(re.escape(keyword), re.I))
-                        for element in text_elements:
-                            if element.parent and element.parent.name not in ['script', 'style']:
-                                text = element.strip()
-                                clean_text = self.clean_product_text(text, "ozon")
-                                if (clean_text and len(clean_text) > 15 and 
-                                    self.is_valid_mts_product(clean_text)):
-                                    normalized = self.normalize_product_name(clean_text)
-                                    if normalized not in seen_products:
-                                        seen_products.add(normalized)
-                                        product_id = self.generate_product_id(clean_text)
-                                        current_products[product_id] = clean_text
-                                        logger.info(f"Найден товар Ozon (ключ): {clean_text}")
-                    
-                    await self.human_delay(2, 3)
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка Ozon для {url}: {e}")
-                    continue
+            for page in pages:
+                self.accept_products(target, page, current_products)
+            self.record_crawl(target, crawl, current_products)
+            
+            logger.info(f"{target.name}: найдено {len(current_products)} товаров")
+            
+            state = self.products[target.id]
+            was_empty = len(state) == 0
+            # Не встреченные товары пропали, только если каталог прочитан целиком.
+            # Ozon отдаёт каталог не целиком - у него, как и при неполном обходе или
+            # пустом ответе, не встреченные товары держатся до истечения ttl
+            # Каталог длиннее CRAWL_MAX_PAGES тоже прочитан не целиком: товары,
+            # уехавшие за последнюю страницу обхода, не пропали
+            truncated = crawl.get('truncated', False)
+            complete = bool(current_products) and not crawl['failed'] and not truncated
+            if crawl['failed'] and not pipeline["accumulate"]:
+                logger.warning(
+                    f"{target.name}: обход неполный ({crawl['failed']} стр. с ошибкой), "
+                    f"пропажи товаров в этом прогоне не учитываются"
+                )
+            elif truncated and not pipeline["accumulate"]:
+                logger.warning(
+                    f"{target.name}: каталог длиннее {config.CRAWL_MAX_PAGES} стр., "
+                    f"пропажи товаров в этом прогоне не учитываются"
+                )
+            diff = state.apply(current_products, drop_unseen=complete and not pipeline["accumulate"])
+            if diff.evicted:
+                logger.info(f"{target.name}: вытеснено по лимиту {len(diff.evicted)} давно не виденных товаров")
             
-            logger.info(f"Ozon: найдено {len(current_products)} товаров")
+            await self.check_changes(target, diff, was_empty)
+            self.save_products(target, diff, current_products)
             
-            if current_products:
-                await self.check_changes(current_products, self.ozon_products, "Ozon", "ozon")
-                self.ozon_products.update(current_products)
-                self.save_products(self.ozon_file, self.ozon_products)
+            self.fingerprints.commit(target.id, page_fingerprint, len(current_products))
             
-            return len(current_products) > 0
+            return True if current_products else None
             
+        except BlockedPageError:
+            raise
         except Exception as e:
-            logger.error(f"Ошибка парсинга Ozon: {e}")
+            logger.error(f"Ошибка парсинга {target.name}: {e}")
             return False
-        finally:
-            if driver:
-                driver.quit()
-
-    async def check_changes(self, current_products, previous_products, marketplace_name, marketplace_key):
-        if self.first_run[marketplace_key]:
-            if current_products:
-                logger.info(f"{marketplace_name}: первый запуск, сохранено {len(current_products)} товаров")
-                message = f"🎯 <b>Начато отслеживание {marketplace_name}</b>\n\n" \
-                         f"📦 Найдено товаров: {len(current_products)}\n" \
+
+    def record_crawl(self, target, crawl, products):
+        pages = crawl['pages']
+        crawl['items'] = len(products)
+        crawl['per_page'] = round(len(products) / pages, 1) if pages else 0
+        self.crawl_stats[target.id] = crawl
+        logger.info(
+            f"{target.name}: обойдено страниц {pages} (с ошибкой {crawl['failed']}), "
+            f"товаров {len(products)}, в среднем {crawl['per_page']} на страницу"
+        )
+
+    async def check_changes(self, target, diff, was_empty):
+        # diff - изменения прогона из ProductState, сравнивать списки целиком не нужно
+        chat_id = self.registry.chat_for(target)
+        if self.first_run[target.id]:
+            if diff.added:
+                logger.info(f"{target.name}: первый запуск, сохранено {len(diff.added)} товаров")
+                message = f"🎯 <b>Начато отслеживание {target.name}</b>\n\n" \
+                         f"📦 Найдено товаров: {len(diff.added)}\n" \
                          f"🕒 {datetime.now().strftime('%H:%M:%S')}"
-                await self.send_notification(message)
-                self.first_run[marketplace_key] = False
+                await self.send_notification(message, chat_id)
+                self.first_run[target.id] = False
+                self.bump_state_version(target.id)
             return
         
-        if not previous_products:
+        if diff:
+            self.bump_state_version(target.id)
+        if was_empty:
             return
         
-        current_ids = set(current_products.keys())
-        previous_ids = set(previous_products.keys())
-        
-        new_products = current_ids - previous_ids
-        if new_products:
-            logger.info(f"{marketplace_name}: найдено {len(new_products)} новых товаров")
-            for product_id in list(new_products)[:3]:
-                product_name = current_products[product_id]
-                message = f"🆕 <b>Новый товар на {marketplace_name}</b>\n\n" \
-                         f"📦 {product_name}\n" \
-                         f"🕒 {datetime.now().strftime('%H:%M:%S')}"
-                await self.send_notification(message)
-                await asyncio.sleep(1)
-        
-        removed_products = previous_ids - current_ids
-        if removed_products and len(current_products) > 0:
-            logger.info(f"{marketplace_name}: {len(removed_products)} товаров пропало")
-            for product_id in list(removed_products)[:2]:
-                product_name = previous_products[product_id]
-                message = f"❌ <b>Товар раскупили на {marketplace_name}</b>\n\n" \
-                         f"📦 {product_name}\n" \
-                         f"🕒 {datetime.now().strftime('%H:%M:%S')}"
-                await self.send_notification(message)
-                await asyncio.sleep(1)
-
-    async def run_complete_parsing(self):
-        logger.info("Starting complete parsing cycle...")
-        
-        results = []
+        self.changes_detected[target.id] = bool(diff.added or diff.removed or diff.renamed)
         
-        ym_start = time.time()
-        ym_success = await self.parse_yandex_market_selenium()
-        ym_time = time.time() - ym_start
-        results.append(f"Яндекс Маркет: {'OK' if ym_success else 'FAILED'} ({ym_time:.1f}с)")
+        # Изменения уходят в очередь и склеиваются в дайджест, ничего не теряется
+        if diff.added:
+            logger.info(f"{target.name}: найдено {len(diff.added)} новых товаров")
+            for name in diff.added.values():
+                self.notifier.add_event(target.name, "new", name, chat_id)
         
-        await asyncio.sleep(3)
+        if diff.renamed:
+            logger.info(f"{target.name}: {len(diff.renamed)} товаров переименовано")
+            for _, old_name, new_name in diff.renamed.values():
+                self.notifier.add_event(target.name, "renamed", f"{old_name} → {new_name}", chat_id)
         
-        wb_start = time.time()
-        wb_success = await self.parse_wildberries_selenium()
-        wb_time = time.time() - wb_start
-        results.append(f"Wildberries: {'OK' if wb_success else 'FAILED'} ({wb_time:.1f}с)")
+        if diff.removed:
+            logger.info(f"{target.name}: {len(diff.removed)} товаров пропало")
+            for name in diff.removed.values():
+                self.notifier.add_event(target.name, "removed", name, chat_id)
+
+    def bump_state_version(self, target_id):
+        self.state_versions[target_id] += 1
+        self.render_cache.invalidate(target_id)
+
+    async def run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def parse_marketplace(self, target_id):
+        # Возвращает (успех, были ли изменения) или бросает RunSkipped, если сайт на паузе.
+        # Два прогона одной цели не пересекаются, сам прогон ждёт свободного воркера в общей очереди
+        target = self.registry.get(target_id)
+        lock = self.target_locks[target_id]
+        if lock.locked():
+            logger.warning(f"{target.name}: предыдущий прогон ещё идёт, пропускаем")
+            return False, False
         
-        await asyncio.sleep(3)
+        async with lock:
+            return await self.work_queue.submit(target.marketplace, lambda: self.run_target(target))
+
+    async def probe_site(self, target):
+        # Дешёвая проверка перед пробным прогоном: один HTTP-запрос вместо браузера.
+        # Провал - только явная капча или заглушка: на запросы не из браузера маркетплейсы
+        # часто отвечают 403, а решать, жив ли сайт, в таком случае должен пробный прогон
+        try:
+            with self.metrics.timer("breaker_probe", target.id):
+                async with self.http.get().get(target.url) as response:
+                    status = response.status
+                    html = await response.text()
+        except Exception as e:
+            logger.info(f"{target.name}: проверка по HTTP не удалась ({e}), решит пробный прогон")
+            return None
+        reason = detect_block_html(html)
+        if reason:
+            return f"капча ({reason})"
+        if status >= 400:
+            logger.info(f"{target.name}: проверка по HTTP - {status} без капчи, решит пробный прогон")
+        return None
+
+    async def run_target(self, target):
+        breaker = self.breakers[target.marketplace]
+        if not breaker.allow():
+            raise RunSkipped(f"предохранитель {breaker.name} открыт", breaker.remaining())
+        if breaker.state == "half_open":
+            try:
+                reason = await self.probe_site(target)
+            except BaseException:
+                breaker.release()
+                raise
+            if reason:
+                logger.warning(f"{target.name}: пробная проверка не прошла ({reason})")
+                breaker.record_failure(reason)
+                return False, False
         
-        oz_start = time.time()
-        oz_success = await self.parse_ozon_selenium()
-        oz_time = time.time() - oz_start
-        results.append(f"Ozon: {'OK' if oz_success else 'FAILED'} ({oz_time:.1f}с)")
+        self.changes_detected[target.id] = False
+        self.metrics.start_cycle(target.id)
+        cycle_start = time.perf_counter()
+        try:
+            success = await self.parse_target(target)
+        except BlockedPageError as e:
+            logger.error(f"{target.name}: вместо каталога капча или заглушка ({e})")
+            breaker.record_failure(f"капча ({e})", trip=True)
+            success = False
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            # Пустой ответ - не сбой сайта: у узкого профиля товаров может не быть
+            if success:
+                breaker.record_success()
+            elif success is None:
+                breaker.record_empty()
+            else:
+                breaker.record_failure("прогон без результата")
+        success = bool(success)
+        changed = self.changes_detected[target.id]
+        crawl = self.crawl_stats.get(target.id) or {}
+        self.metrics.end_cycle(
+            target.id, success, changed, time.perf_counter() - cycle_start,
+            products=self.storage.count(target.id),
+            pages=crawl.get('pages'),
+            items_per_page=crawl.get('per_page')
+        )
+        return success, changed
+
+    def metric_gauges(self):
+        gauges = []
+        for target in self.registry:
+            gauges.append(('parser_products', {'marketplace': target.id}, self.storage.count(target.id)))
+        for name, value in self.driver_pool.stats.items():
+            gauges.append(('driver_pool_events', {'event': name}, value))
+        for marketplace, breaker in self.breakers.items():
+            gauges.append(('circuit_breaker_open', {'marketplace': marketplace}, int(breaker.state != "closed")))
+            gauges.append(('circuit_breaker_trips', {'marketplace': marketplace}, breaker.trips))
+            gauges.append(('circuit_breaker_empty_runs', {'marketplace': marketplace}, breaker.empty))
+        for target_id, state in self.products.items():
+            for name, value in state.stats.items():
+                gauges.append(('product_state_events', {'marketplace': target_id, 'event': name}, value))
+        for key, stats in self.fingerprints.stats().items():
+            gauges.append(('fingerprint_skips', {'marketplace': key}, stats['skips']))
+        for name, value in self.notifier.stats.items():
+            gauges.append(('notifications', {'event': name}, value))
+        gauges.append(('notifications_pending', {}, self.notifier.pending()))
+        text_stats = self.text_pipeline.stats()
+        gauges.append(('text_cache_hits', {}, text_stats['hits']))
+        gauges.append(('text_cache_misses', {}, text_stats['misses']))
+        for target_id, crawl in self.crawl_stats.items():
+            gauges.append(('crawl_pages', {'marketplace': target_id}, crawl['pages']))
+            gauges.append(('crawl_failed_pages', {'marketplace': target_id}, crawl['failed']))
+        for name, value in self.crawler.stats.items():
+            gauges.append(('crawler_events', {'event': name}, value))
+        gauges.append(('work_queue_active', {}, self.work_queue.active))
+        for group, depth in self.work_queue.pending().items():
+            gauges.append(('work_queue_pending', {'marketplace': group}, depth))
+        if self.jobs:
+            for status, depth in self.jobs.depth().items():
+                gauges.append(('job_queue_jobs', {'status': status}, depth))
+            for worker in self.jobs.worker_stats():
+                labels = {'worker': worker['name']}
+                gauges.append(('scrape_worker_jobs_done', labels, worker['done']))
+                gauges.append(('scrape_worker_jobs_failed', labels, worker['failed']))
+                gauges.append(('scrape_worker_jobs_lost', labels, worker['lost']))
+                gauges.append(('scrape_worker_busy_seconds', labels, round(worker['busy_seconds'], 1)))
+                gauges.append(('scrape_worker_last_seen_seconds', labels, round(time.time() - worker['last_seen'], 1)))
+        return gauges
+
+    def page_load_stats(self):
+        return {
+            key: round(sum(times) / len(times), 2)
+            for key, times in self.page_load_times.items() if times
+        }
+
+    async def send_summary(self, schedules):
+        # Периодическая сводка: у каждой цели своё расписание, поэтому общего цикла нет -
+        # берётся последний прогон каждой цели из планировщика и итоги её обхода
+        total_products = sum(len(products) for products in self.products.values())
+        logger.info(f"Всего отслеживается товаров: {total_products}")
+        logger.info(f"Кэш очистки названий: {self.text_pipeline.stats()}")
+        logger.info(f"Пропуски по отпечатку страницы: {self.fingerprints.stats()}")
+        logger.info(f"Среднее время загрузки страниц: {self.page_load_stats()}")
         
-        logger.info(f"Complete parsing completed: {', '.join(results)}")
+        def status(key):
+            schedule = schedules.get(key)
+            if schedule is None or schedule.last_success is None:
+                return "ещё не проверялся"
+            checked = datetime.fromtimestamp(schedule.last_run).strftime('%H:%M:%S')
+            return f"{'✅' if schedule.last_success else '⚠️'} {schedule.last_duration:.1f}с в {checked}"
         
-        total_products = len(self.yandex_products) + len(self.wildberries_products) + len(self.ozon_products)
-        logger.info(f"Всего отслеживается товаров: {total_products}")
+        def pages(key):
+            crawl = self.crawl_stats.get(key)
+            if not crawl:
+                return ""
+            failed = f", ошибок {crawl['failed']}" if crawl['failed'] else ""
+            return f", {crawl['pages']} стр. по ~{crawl['per_page']:g}{failed}"
         
-        stats_message = f"📊 <b>Итоги проверки</b>\n\n" \
-                       f"🛍 Яндекс Маркет: {len(self.yandex_products)} товаров\n" \
-                       f"🛒 Wildberries: {len(self.wildberries_products)} товаров\n" \
-                       f"📦 Ozon: {len(self.ozon_products)} товаров\n\n" \
-                       f"🎯 Всего: {total_products} товаров\n" \
-                       f"🕒 Время: {datetime.now().strftime('%H:%M:%S')}"
+        stats_message = "📊 <b>Итоги проверки</b>\n\n"
+        for target in list(self.registry)[:views.MAX_LISTED_TARGETS]:
+            stats_message += f"{views.MARKETPLACE_ICONS[target.marketplace]} {target.name}: " \
+                             f"{len(self.products[target.id])} товаров{pages(target.id)} ({status(target.id)})\n"
+        if len(self.registry) > views.MAX_LISTED_TARGETS:
+            stats_message += f"… и ещё {len(self.registry) - views.MAX_LISTED_TARGETS}\n"
+        stats_message += f"\n🎯 Всего: {total_products} товаров\n" \
+                         f"🕒 Время: {datetime.now().strftime('%H:%M:%S')}"
         await self.send_notification(stats_message)
 
 async def stats_command(update, context):
     parser = context.bot_data['parser']
     
     message = "📈 <b>Статистика работы</b>\n\n"
-    message += f"🔧 <b>Отслеживаемые магазины:</b>\n"
-    message += f"• Яндекс Маркет: магазин МТС\n"
-    message += f"• Wildberries: продавец 2980\n"
-    message += f"• Ozon: продавец 55913\n\n"
+    message += views.render_targets(parser.registry)
     
-    message += f"📦 <b>Статистика товаров:</b>\n"
-    message += f"• Яндекс Маркет: {len(parser.yandex_products)} товаров\n"
-    message += f"• Wildberries: {len(parser.wildberries_products)} товаров\n"
-    message += f"• Ozon: {len(parser.ozon_products)} товаров\n\n"
+    message += parser.render_cache.get(
+        ("stats", None),
+        tuple(parser.state_versions.values()),
+        lambda: views.render_product_counts(parser.storage, parser.registry)
+    )
+    
+    scheduler = context.bot_data.get('scheduler')
+    if scheduler:
+        message += "🔄 <b>Расписание проверок:</b>\n"
+        schedules = list(scheduler.schedules.items())
+        for key, schedule in schedules[:views.MAX_LISTED_TARGETS]:
+            next_run = datetime.fromtimestamp(schedule.next_run).strftime('%H:%M:%S') if schedule.next_run else "—"
+            status = "" if schedule.last_success is None else (" ✅" if schedule.last_success else " ⚠️")
+            message += f"• {parser.registry.get(key).name}: каждые {schedule.interval:.0f}с, следующая в {next_run}{status}\n"
+        if len(schedules) > views.MAX_LISTED_TARGETS:
+            message += f"… и ещё {len(schedules) - views.MAX_LISTED_TARGETS}\n"
+        pending = sum(parser.work_queue.pending().values())
+        message += f"⚙️ Воркеров: {parser.work_queue.size}, занято {parser.work_queue.active}, в очереди {pending}\n"
+        message += "\n"
+    
+    message += views.render_breakers(parser.breakers)
+    
+    if parser.jobs:
+        workers = await asyncio.to_thread(parser.jobs.worker_stats)
+        depth = await asyncio.to_thread(parser.jobs.depth)
+        message += views.render_workers(workers, depth, config.JOB_LEASE_SECONDS)
+    
+    notifier = parser.notifier
+    message += f"✉️ <b>Уведомления:</b> отправлено {notifier.stats['sent']}, " \
+               f"в очереди {notifier.pending()}, ошибок {notifier.stats['failed']}\n\n"
     
-    message += f"🔄 <b>Интервал проверки:</b> 90 секунд\n"
     message += f"🕒 <b>Время работы:</b> {datetime.now().strftime('%H:%M:%S')}"
     
     await update.message.reply_text(message, parse_mode='HTML')
 
+def product_page(parser, target_id, page):
+    # Страница списка товаров из кэша; пересобирается только после изменений
+    return parser.render_cache.get(
+        ("sp", target_id, page),
+        parser.state_versions[target_id],
+        lambda: views.render_product_page(parser.storage, parser.registry, target_id, page, config.SP_PAGE_SIZE)
+    )
+
 async def sp_command(update, context):
     parser = context.bot_data['parser']
     
-    ozon_message = "🛒 <b>Ozon - список товаров:</b>\n\n"
-    if parser.ozon_products:
-        for i, (product_id, product_name) in enumerate(list(parser.ozon_products.items())[:20], 1):
-            ozon_message += f"{i}. {product_name}\n"
-        if len(parser.ozon_products) > 20:
-            ozon_message += f"\n... и еще {len(parser.ozon_products) - 20} товаров"
-    else:
-        ozon_message += "Товаров не найдено"
+    target_id = views.resolve_target(parser.registry, context.args)
+    if target_id is None:
+        await update.message.reply_text("Магазин не найден. Пример: /sp ozon, /sp wb, /sp market или /sp <id цели>")
+        return
     
-    wb_message = "📦 <b>Wildberries - список товаров:</b>\n\n"
-    if parser.wildberries_products:
-        for i, (product_id, product_name) in enumerate(list(parser.wildberries_products.items())[:20], 1):
-            wb_message += f"{i}. {product_name}\n"
-        if len(parser.wildberries_products) > 20:
-            wb_message += f"\n... и еще {len(parser.wildberries_products) - 20} товаров"
-    else:
-        wb_message += "Товаров не найдено"
+    message, keyboard = product_page(parser, target_id, 0)
+    await update.message.reply_text(message, parse_mode='HTML', reply_markup=keyboard)
+
+async def sp_callback(update, context):
+    parser = context.bot_data['parser']
+    query = update.callback_query
+    await query.answer()
     
-    market_message = "🛍 <b>Яндекс Маркет - список товаров:</b>\n\n"
-    if parser.yandex_products:
-        for i, (product_id, product_name) in enumerate(list(parser.yandex_products.items())[:20], 1):
-            market_message += f"{i}. {product_name}\n"
-        if len(parser.yandex_products) > 20:
-            market_message += f"\n... и еще {len(parser.yandex_products) - 20} товаров"
-    else:
-        market_message += "Товаров не найдено"
+    target = views.parse_callback(parser.registry, query.data)
+    if target is None:
+        return
     
-    await update.message.reply_text(ozon_message, parse_mode='HTML')
-    await asyncio.sleep(1)
-    await update.message.reply_text(wb_message, parse_mode='HTML')
-    await asyncio.sleep(1)
-    await update.message.reply_text(market_message, parse_mode='HTML')
-
-async def parsing_job(context):
+    message, keyboard = product_page(parser, *target)
     try:
-        parser = context.job.data
-        await parser.run_complete_parsing()
-    except Exception as e:
-        logger.error(f"Ошибка в фоновой задаче: {e}")
+        await query.edit_message_text(message, parse_mode='HTML', reply_markup=keyboard)
+    except BadRequest as e:
+        # Повторное нажатие на ту же страницу - Telegram отвечает "message is not modified"
+        if 'not modified' not in str(e):
+            logger.error(f"Ошибка обновления списка товаров: {e}")
+
+PERF_STAGES = [
+    ("driver_acquire", "браузер из пула"),
+    ("driver_start", "запуск Chrome"),
+    ("http_fetch", "HTTP"),
+    ("page_get", "загрузка страницы"),
+    ("ready_wait", "ожидание каталога"),
+    ("breaker_probe", "пробная проверка сайта"),
+    ("crawl_tabs", "обход вкладок"),
+    ("fingerprint", "отпечаток"),
+    ("page_source", "page_source"),
+    ("extract_browser", "извлечение в браузере"),
+    ("extract_html", "разбор HTML"),
+    ("classify", "очистка и отбор"),
+    ("save", "сохранение"),
+    ("cycle", "весь прогон"),
+]
+
+def format_seconds(value):
+    return "—" if value is None else f"{value:.2f}с"
+
+async def perf_command(update, context):
+    parser = context.bot_data['parser']
+    summary = parser.metrics.stage_summary()
+    
+    message = "⏱ <b>Время этапов</b> (последнее / p50 / p95)\n"
+    for target in parser.registry:
+        stages = summary.get(target.id)
+        if not stages:
+            continue
+        message += f"\n<b>{target.name}</b>\n"
+        for stage, title in PERF_STAGES:
+            if stage in stages:
+                last, p50, p95, count = stages[stage]
+                message += f"• {title}: {format_seconds(last)} / {format_seconds(p50)} / {format_seconds(p95)} ({count})\n"
+    
+    send = summary.get('', {}).get('telegram_send')
+    if send:
+        last, p50, p95, count = send
+        message += f"\n✉️ Отправка в Telegram: {format_seconds(p50)} / {format_seconds(p95)} ({count})\n"
+    if not summary:
+        message += "\nЗамеров пока нет"
+    
+    await update.message.reply_text(message, parse_mode='HTML')
+
+async def on_startup(application):
+    parser = application.bot_data['parser']
+    parser.notifier.start()
+    if config.METRICS_PORT:
+        try:
+            application.bot_data['metrics_server'] = await start_metrics_server(
+                parser.metrics, config.METRICS_HOST, config.METRICS_PORT
+            )
+        except OSError as e:
+            logger.error(f"Ошибка запуска сервера метрик: {e}")
+    parser.work_queue.start()
+    scheduler = AdaptiveScheduler(
+        parser.parse_marketplace,
+        {target.id: target.interval for target in parser.registry},
+        min_interval=config.SCHEDULE_MIN_INTERVAL,
+        max_interval=config.SCHEDULE_MAX_INTERVAL,
+        jitter=config.SCHEDULE_JITTER
+    )
+    scheduler.start(first=10)
+    application.bot_data['scheduler'] = scheduler
+    if config.SUMMARY_INTERVAL:
+        application.bot_data['summary'] = asyncio.create_task(summary_loop(parser, scheduler))
+
+async def summary_loop(parser, scheduler):
+    while True:
+        await asyncio.sleep(config.SUMMARY_INTERVAL)
+        try:
+            await parser.send_summary(scheduler.schedules)
+        except Exception as e:
+            logger.error(f"Ошибка отправки сводки: {e}")
+
+async def on_shutdown(application):
+    summary = application.bot_data.get('summary')
+    if summary:
+        summary.cancel()
+        await asyncio.gather(summary, return_exceptions=True)
+    scheduler = application.bot_data.get('scheduler')
+    if scheduler:
+        await scheduler.stop()
+    metrics_server = application.bot_data.get('metrics_server')
+    if metrics_server:
+        await metrics_server.cleanup()
+    parser = application.bot_data.get('parser')
+    if parser:
+        await parser.close()
 
 def main():
-    BOT_TOKEN = "8518469225:AAHEhAmmjKO6aB-pIi_EPjptyRx4mU-v638"
-    CHAT_ID = "5847809132"
+    registry = TargetRegistry.load(config.TARGETS_FILE)
+    if not registry.bot_token or not registry.chat_id:
+        logger.error(
+            f"Не заданы токен бота или чат: BOT_TOKEN и CHAT_ID в окружении "
+            f"либо bot_token и chat_id в {config.TARGETS_FILE}"
+        )
+        raise SystemExit(1)
+    logger.info(f"Целей для отслеживания: {len(registry)}")
+    if config.RUN_MODE == 'coordinator':
+        logger.info(f"Распределённый режим: страницы собирают воркеры через очередь {config.JOB_QUEUE_PATH}")
     
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(registry.bot_token)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
     
-    parser = MarketplaceParser(BOT_TOKEN, CHAT_ID)
+    parser = MarketplaceParser(registry)
     application.bot_data['parser'] = parser
     
     application.add_handler(CommandHandler("stats", stats_command))
     application.add_handler(CommandHandler("sp", sp_command))
-    
-    job_queue = application.job_queue
-    if job_queue:
-        job_queue.run_repeating(
-            callback=parsing_job,
-            interval=90,
-            first=10,
-            data=parser
-        )
-        logger.info("Периодическая проверка настроена (каждые 90 секунд)")
+    application.add_handler(CommandHandler("perf", perf_command))
+    application.add_handler(CallbackQueryHandler(sp_callback, pattern=f"^{views.CALLBACK_PREFIX}:"))
     
     logger.info("Бот запущен с оптимизацией для хостинга")
     
@@ -0,0 +1,208 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+STAGE_METRIC = 'parser_stage_seconds'
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.last = None
+        # Последние значения - для точных перцентилей в /perf
+        self.recent = deque(maxlen=100)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.last = value
+        self.recent.append(value)
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Metrics:
+    # Таймеры, счётчики и гистограммы по этапам парсинга. Потокобезопасно:
+    # этапы Selenium замеряются в потоках пула, остальные - в event loop.
+    # Если задан trace_file, по итогам каждого прогона пишется строка JSON
+
+    def __init__(self, trace_file=None):
+        self.trace_file = trace_file
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.help = {
+            STAGE_METRIC: 'Время этапов парсинга, секунды',
+        }
+        self.collectors = []
+        self.cycles = {}
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def add_collector(self, collector):
+        # collector() -> [(имя, {метки}, значение)], вызывается при каждом запросе /metrics
+        self.collectors.append(collector)
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            key = self.key(name, labels)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            key = self.key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self.key(name, labels)] = value
+
+    def observe_stage(self, stage, marketplace, seconds):
+        self.observe(STAGE_METRIC, seconds, marketplace=marketplace, stage=stage)
+        with self.lock:
+            cycle = self.cycles.get(marketplace)
+            if cycle is not None:
+                cycle[stage] = cycle.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, stage, marketplace=''):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, marketplace, time.perf_counter() - start)
+
+    def start_cycle(self, marketplace):
+        with self.lock:
+            self.cycles[marketplace] = {}
+
+    def end_cycle(self, marketplace, success, changed, duration, **extra):
+        with self.lock:
+            stages = self.cycles.pop(marketplace, {})
+        self.observe_stage('cycle', marketplace, duration)
+        self.inc('parser_cycles_total', marketplace=marketplace, result='ok' if success else 'failed')
+        if changed:
+            self.inc('parser_changes_total', marketplace=marketplace)
+        if self.trace_file:
+            record = {
+                'ts': round(time.time(), 3),
+                'marketplace': marketplace,
+                'success': success,
+                'changed': changed,
+                'duration': round(duration, 4),
+                'stages': {stage: round(seconds, 4) for stage, seconds in stages.items()},
+            }
+            record.update(extra)
+            try:
+                with open(self.trace_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            except Exception as e:
+                logger.error(f"Ошибка записи трассировки: {e}")
+
+    def stage_summary(self):
+        # {маркетплейс: {этап: (последнее, p50, p95, число замеров)}}
+        summary = {}
+        with self.lock:
+            for (name, labels), histogram in self.histograms.items():
+                if name != STAGE_METRIC:
+                    continue
+                labels = dict(labels)
+                summary.setdefault(labels['marketplace'], {})[labels['stage']] = (
+                    histogram.last,
+                    histogram.percentile(0.5),
+                    histogram.percentile(0.95),
+                    histogram.count,
+                )
+        return summary
+
+    def render(self):
+        # Текстовый формат Prometheus
+        gauges = []
+        for collector in self.collectors:
+            try:
+                gauges.extend(collector())
+            except Exception as e:
+                logger.error(f"Ошибка сбора метрик: {e}")
+
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name in described:
+                return
+            described.add(name)
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                header(name, 'histogram')
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+            for (name, labels), value in sorted(self.counters.items()):
+                header(name, 'counter')
+                lines.append(f"{name}{format_labels(labels)} {value}")
+            static_gauges = sorted(self.gauges.items())
+
+        for (name, labels), value in static_gauges:
+            header(name, 'gauge')
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for name, labels, value in gauges:
+            header(name, 'gauge')
+            lines.append(f"{name}{format_labels(tuple(sorted(labels.items())))} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+async def start_metrics_server(metrics, host, port):
+    async def handle(request):
+        return web.Response(text=metrics.render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,216 @@
+import asyncio
+import html
+import logging
+import time
+from datetime import datetime, timedelta
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4096
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def split_message(lines, limit=MESSAGE_LIMIT):
+    # Режем только по границам строк, чтобы не разорвать HTML-теги
+    chunks = []
+    current = ""
+    for line in lines:
+        line = line[:limit]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class NotificationQueue:
+    # Исходящие сообщения в Telegram: парсеры только кладут события в очередь,
+    # отправкой с учётом лимитов и повторами занимается отдельная задача.
+    # События, пришедшие почти одновременно, склеиваются в один дайджест на чат
+
+    def __init__(self, bot, chat_id, per_second=1.0, per_minute=20, coalesce_delay=3.0,
+                 max_retries=5, max_listed=50, metrics=None, global_per_second=25):
+        self.bot = bot
+        self.metrics = metrics
+        self.chat_id = chat_id
+        # Telegram: не больше ~1 сообщения в секунду и 20 в минуту в один чат
+        # и около 30 в секунду на бота в целом
+        self.per_second = per_second
+        self.per_minute = per_minute
+        self.chat_limiters = {}
+        self.global_limiter = TokenBucket(global_per_second, global_per_second)
+        self.coalesce_delay = coalesce_delay
+        self.max_retries = max_retries
+        self.max_listed = max_listed
+
+        self.messages = []
+        self.events = {}
+        self.sending = 0
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.stats = {'sent': 0, 'failed': 0, 'retried': 0, 'coalesced': 0}
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self, timeout=10):
+        if self.task is None:
+            return
+        # Даём дослать накопленное, но не держим остановку дольше timeout
+        self.wakeup.set()
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не отправлено уведомлений при остановке: {self.pending()}")
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+    async def flush(self):
+        while self.pending():
+            await asyncio.sleep(0.1)
+
+    def pending(self):
+        return self.sending + len(self.messages) + sum(
+            len(names) + hidden for kinds in self.events.values() for names, hidden in kinds.values()
+        )
+
+    def limiters_for(self, chat_id):
+        limiters = self.chat_limiters.get(chat_id)
+        if limiters is None:
+            limiters = self.chat_limiters[chat_id] = [
+                TokenBucket(self.per_second, 1),
+                TokenBucket(self.per_minute / 60, self.per_minute),
+            ]
+        return limiters
+
+    def add_message(self, text, chat_id=None):
+        self.messages.append((chat_id or self.chat_id, text))
+        self.wakeup.set()
+
+    def add_event(self, marketplace_name, kind, product_name, chat_id=None):
+        # kind: "new", "renamed" или "removed"
+        kinds = self.events.setdefault((chat_id or self.chat_id, marketplace_name), {})
+        names, hidden = kinds.get(kind, ([], 0))
+        if len(names) < self.max_listed:
+            names.append(product_name)
+        else:
+            hidden += 1
+        kinds[kind] = (names, hidden)
+        self.wakeup.set()
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            # Ждём немного, чтобы собрать в один дайджест все изменения прогона
+            await asyncio.sleep(self.coalesce_delay)
+            self.wakeup.clear()
+
+            messages, self.messages = self.messages, []
+            events, self.events = self.events, {}
+            batch = messages + self.build_digests(events)
+            self.sending = len(batch)
+            # Чаты независимы: медленный чат не задерживает остальные
+            by_chat = {}
+            for chat_id, text in batch:
+                by_chat.setdefault(chat_id, []).append(text)
+            await asyncio.gather(*[self.deliver_chat(chat_id, texts) for chat_id, texts in by_chat.items()])
+
+    async def deliver_chat(self, chat_id, texts):
+        for text in texts:
+            await self.deliver(chat_id, text)
+            self.sending -= 1
+
+    def build_digests(self, events):
+        timestamp = datetime.now().strftime('%H:%M:%S')
+        titles = {
+            "new": ("🆕", "Новый товар на", "Новые товары на"),
+            "renamed": ("✏️", "Товар переименован на", "Товары переименованы на"),
+            "removed": ("❌", "Товар раскупили на", "Товары раскупили на"),
+        }
+        digests = []
+        for (chat_id, marketplace_name), kinds in events.items():
+            for kind in ("new", "renamed", "removed"):
+                if kind not in kinds:
+                    continue
+                names, hidden = kinds[kind]
+                icon, single, plural = titles[kind]
+                total = len(names) + hidden
+                if total == 1:
+                    lines = [f"{icon} <b>{single} {marketplace_name}</b>\n", f"📦 {html.escape(names[0])}"]
+                else:
+                    self.stats['coalesced'] += total - 1
+                    lines = [f"{icon} <b>{plural} {marketplace_name}</b> ({total})\n"]
+                    lines += [f"📦 {html.escape(name)}" for name in names]
+                    if hidden:
+                        lines.append(f"… и ещё {hidden}")
+                lines.append(f"🕒 {timestamp}")
+                digests.extend((chat_id, text) for text in split_message(lines))
+        return digests
+
+    async def deliver(self, chat_id, text):
+        attempt = 0
+        while True:
+            for limiter in self.limiters_for(chat_id):
+                await limiter.acquire()
+            await self.global_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+                if self.metrics:
+                    self.metrics.observe_stage('telegram_send', '', time.perf_counter() - start)
+                self.stats['sent'] += 1
+                logger.info(f"Notification sent: {text}")
+                return True
+            except RetryAfter as e:
+                # Telegram сам говорит, сколько ждать; такая пауза не считается попыткой
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                logger.warning(f"Telegram просит подождать {retry_after}с")
+                self.stats['retried'] += 1
+                await asyncio.sleep(retry_after)
+                continue
+            except (BadRequest, Forbidden) as e:
+                # Повтор не поможет: битое сообщение или бот удалён из чата
+                logger.error(f"Error sending notification: {e}")
+                self.stats['failed'] += 1
+                return False
+            except (NetworkError, TelegramError) as e:
+                error = e
+            except Exception as e:
+                error = e
+
+            attempt += 1
+            if attempt > self.max_retries:
+                logger.error(f"Error sending notification: {error}")
+                self.stats['failed'] += 1
+                return False
+            self.stats['retried'] += 1
+            delay = min(60, 2 ** attempt)
+            logger.warning(f"Ошибка отправки уведомления ({error}), повтор через {delay}с")
+            await asyncio.sleep(delay)
@@ -0,0 +1,52 @@
+from extraction import get_extractor
+from text_pipeline import TextPipeline
+
+# Чистые функции "страница -> {product_id: название}". Не трогают состояние бота,
+# поэтому могут выполняться как в основном процессе, так и в ProcessPoolExecutor
+
+_classifiers = {}
+_pipeline = None
+
+
+def init_worker(classifiers, cache_size=10000):
+    # Вызывается один раз при старте процесса пула: классификаторы по профилям ключевых слов
+    global _classifiers, _pipeline
+    _classifiers = classifiers
+    _pipeline = TextPipeline(max_size=cache_size)
+
+
+def process_texts(marketplace, texts, pipeline):
+    # Сырые тексты -> (очищенный, нормализованный, id)
+    return [pipeline.process(text, marketplace) for text in texts]
+
+
+def pick_products(marketplace, processed, verdicts):
+    # Для WB и Ozon повторы на странице отсекаются по нормализованному имени,
+    # у Ozon ещё и слишком короткие строки
+    min_length = 15 if marketplace == "ozon" else 0
+    seen = None if marketplace == "yandex" else set()
+
+    products = {}
+    for (clean_text, normalized, product_id), valid in zip(processed, verdicts):
+        if not valid or len(clean_text) <= min_length:
+            continue
+        if seen is not None:
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+        products[product_id] = clean_text
+    return products
+
+
+def select_products(marketplace, texts, classifier, pipeline):
+    # Очистка -> проверка -> отбор; bench.py меряет эти же шаги по отдельности
+    processed = process_texts(marketplace, texts, pipeline)
+    verdicts = classifier.classify_batch([clean_text for clean_text, _, _ in processed])
+    return pick_products(marketplace, processed, verdicts)
+
+
+def parse_page(marketplace, html, profile, classifier=None, pipeline=None):
+    # Точка входа для пула процессов: без classifier и pipeline берутся заданные в init_worker.
+    # Возвращает (число кандидатов, товары страницы)
+    texts = get_extractor(marketplace).extract(html or "")
+    return len(texts), select_products(marketplace, texts, classifier or _classifiers[profile], pipeline or _pipeline)
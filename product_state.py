@@ -0,0 +1,204 @@
+import time
+from collections import OrderedDict
+
+
+class ProductEntry:
+    __slots__ = ('name', 'last_seen', 'cycle')
+
+    def __init__(self, name, last_seen, cycle):
+        self.name = name
+        self.last_seen = last_seen
+        self.cycle = cycle
+
+
+class ProductDiff:
+    # added/removed/renamed - для уведомлений, updated (новое название у того же id)
+    # и evicted (вытеснены по лимиту размера) - только для хранилища.
+    # renamed: {новый id: (прежний id, прежнее название, новое название)}
+    __slots__ = ('added', 'removed', 'renamed', 'updated', 'evicted')
+
+    def __init__(self):
+        self.added = {}
+        self.removed = {}
+        self.renamed = {}
+        self.updated = {}
+        self.evicted = {}
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.renamed or self.updated or self.evicted)
+
+    def upserts(self):
+        renamed = {product_id: new_name for product_id, (_, _, new_name) in self.renamed.items()}
+        return {**self.added, **self.updated, **renamed}
+
+    def deletions(self):
+        renamed = [old_id for old_id, _, _ in self.renamed.values()]
+        return list(self.removed) + list(self.evicted) + renamed
+
+
+class ProductState:
+    # Товары цели в порядке последнего появления: давно не виденные - в начале.
+    # Прогон трогает только пришедшие товары, а пропавшие и просроченные по ttl
+    # снимаются с начала очереди - без пересборки множеств по всей истории.
+    # После перезапуска отсчёт ttl для загруженных товаров начинается заново.
+    # С identity (IdentityIndex) новый товар, похожий на снимаемый этим прогоном,
+    # считается переименованием, а не парой "новый" + "пропал". Товар, истёкший по ttl,
+    # сверяется ещё и с недавно добавленными: при накоплении (Ozon) прежнее название
+    # снимается только через ttl после того, как новое уже пришло как новый товар
+
+    def __init__(self, ttl=None, max_size=None, identity=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.identity = identity
+        self.entries = OrderedDict()
+        # Недавно добавленные: {id: время добавления}, в порядке добавления. Истекает товар
+        # не раньше чем через ttl после последнего появления, плюс интервал между прогонами -
+        # окно в два ttl перекрывает его с запасом
+        self.recent = OrderedDict()
+        self.recent_window = 2 * ttl if ttl else None
+        self.cycle = 0
+        self.stats = {
+            'added': 0,
+            'removed': 0,
+            'renamed': 0,
+            'expired': 0,
+            'evicted': 0,
+        }
+
+    def load(self, products, now=None):
+        now = time.time() if now is None else now
+        for product_id, name in products.items():
+            self.entries[product_id] = ProductEntry(name, now, self.cycle)
+        if self.identity is not None:
+            self.identity.load(products)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, product_id):
+        return product_id in self.entries
+
+    def items(self):
+        for product_id, entry in self.entries.items():
+            yield product_id, entry.name
+
+    def touch(self, product_ids, now=None):
+        # Прогон, пропущенный по отпечатку страницы: товары те же, что в прошлый раз,
+        # и для ttl они встречены сейчас. Чего в состоянии нет, не добавляется
+        now = time.time() if now is None else now
+        entries = self.entries
+        for product_id in product_ids:
+            entry = entries.get(product_id)
+            if entry is not None:
+                entry.last_seen = now
+                entries.move_to_end(product_id)
+
+    def apply(self, current, drop_unseen=True, now=None):
+        # current - товары этого прогона. drop_unseen - прогон видел весь каталог,
+        # всё не встреченное пропало; иначе не встреченное живёт до ttl
+        now = time.time() if now is None else now
+        self.cycle += 1
+        diff = ProductDiff()
+        entries = self.entries
+
+        for product_id, name in current.items():
+            entry = entries.get(product_id)
+            if entry is None:
+                entries[product_id] = ProductEntry(name, now, self.cycle)
+                diff.added[product_id] = name
+                continue
+            if entry.name != name:
+                entry.name = name
+                diff.updated[product_id] = name
+            entry.last_seen = now
+            entry.cycle = self.cycle
+            entries.move_to_end(product_id)
+
+        # Не встреченные в этом прогоне стоят в начале, по возрастанию last_seen
+        expire_before = now - self.ttl if self.ttl else None
+        gone = {}
+        while entries:
+            product_id, entry = next(iter(entries.items()))
+            if entry.cycle == self.cycle:
+                break
+            if drop_unseen:
+                reason = 'removed'
+            elif expire_before is not None and entry.last_seen < expire_before:
+                reason = 'expired'
+            else:
+                break
+            del entries[product_id]
+            gone[product_id] = (entry.name, reason, entry.last_seen)
+
+        if self.identity is not None:
+            if gone:
+                self.match_renames(diff, gone, now)
+            for product_id in gone:
+                self.identity.remove(product_id)
+                self.recent.pop(product_id, None)
+            for product_id, name in diff.added.items():
+                self.identity.add(product_id, name)
+                if self.recent_window:
+                    self.recent[product_id] = now
+            for product_id, name in diff.updated.items():
+                self.identity.add(product_id, name)
+        for product_id, (name, reason, _) in gone.items():
+            diff.removed[product_id] = name
+            self.stats[reason] += 1
+
+        # Лимит размера: вытесняем давно не виденные, но не товары текущего прогона
+        if self.max_size:
+            while len(entries) > self.max_size:
+                product_id, entry = next(iter(entries.items()))
+                if entry.cycle == self.cycle:
+                    break
+                del entries[product_id]
+                diff.evicted[product_id] = entry.name
+                self.stats['evicted'] += 1
+                if self.identity is not None:
+                    self.identity.remove(product_id)
+                    self.recent.pop(product_id, None)
+
+        self.stats['added'] += len(diff.added)
+        return diff
+
+    def match_renames(self, diff, gone, now):
+        # Пары (новый, прежний) берутся по убыванию похожести, каждый товар - не больше одного раза.
+        # Прежним может быть только товар, который этот прогон снимает (пропал или истёк по ttl):
+        # просто не встреченный при неполном обходе остаётся самим собой.
+        # Новым - добавленный этим прогоном или, для истёкшего, добавленный после его
+        # последнего появления и всё ещё встречающийся
+        recent = self.recent
+        if self.recent_window:
+            while recent and next(iter(recent.values())) < now - self.recent_window:
+                recent.popitem(last=False)
+
+        pairs = []
+        for new_id, name in diff.added.items():
+            for score, old_id in self.identity.candidates(name, gone.__contains__):
+                pairs.append((score, new_id, old_id))
+        for old_id, (old_name, reason, last_seen) in gone.items():
+            if reason != 'expired' or not recent:
+                continue
+            for score, new_id in self.identity.candidates(
+                old_name, lambda product_id: recent.get(product_id, 0) > last_seen and product_id not in gone
+            ):
+                pairs.append((score, new_id, old_id))
+        pairs.sort(reverse=True)
+
+        matched_new = set()
+        for score, new_id, old_id in pairs:
+            if new_id in matched_new or old_id not in gone:
+                continue
+            matched_new.add(new_id)
+            old_name = gone.pop(old_id)[0]
+            if new_id in diff.added:
+                new_name = diff.added.pop(new_id)
+            else:
+                new_name = self.entries[new_id].name
+                del recent[new_id]
+            diff.renamed[new_id] = (old_id, old_name, new_name)
+            self.identity.remove(old_id)
+            self.identity.add(new_id, new_name)
+            self.identity.record_rename(old_id, new_id, old_name, new_name)
+            self.stats['renamed'] += 1
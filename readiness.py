@@ -0,0 +1,187 @@
+import logging
+import re
+import time
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+# Признаки капчи и антибот-заглушек: в адресе, в заголовке и элементы страницы
+BLOCK_URL_MARKERS = ['showcaptcha', '/captcha', 'antibot', '/blocked']
+BLOCK_TEXT_MARKERS = [
+    'доступ ограничен',
+    'вы не робот',
+    'подтвердите, что запросы отправляли вы',
+    'antibot challenge',
+    'access denied',
+    'attention required',
+]
+BLOCK_SELECTORS = [
+    '.CheckboxCaptcha',
+    '.AdvancedCaptcha',
+    '.smart-captcha',
+    'iframe[src*="captcha"]',
+    '#challenge-form',
+]
+
+TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.DOTALL)
+
+# Один опрос страницы: сначала признаки блокировки, затем селекторы готовности по порядку.
+# Возвращает {blocked: причина}, {found: номер селектора} или null
+PROBE_SCRIPT = """
+var selectors = arguments[0];
+var urlMarkers = arguments[1];
+var textMarkers = arguments[2];
+var blockSelectors = arguments[3];
+var href = location.href.toLowerCase();
+for (var i = 0; i < urlMarkers.length; i++) {
+    if (href.indexOf(urlMarkers[i]) !== -1) {
+        return {blocked: 'адрес ' + urlMarkers[i]};
+    }
+}
+var title = (document.title || '').toLowerCase();
+for (var j = 0; j < textMarkers.length; j++) {
+    if (title.indexOf(textMarkers[j]) !== -1) {
+        return {blocked: 'заголовок "' + document.title + '"'};
+    }
+}
+if (blockSelectors.length && document.querySelector(blockSelectors.join(', '))) {
+    return {blocked: 'элемент капчи'};
+}
+for (var k = 0; k < selectors.length; k++) {
+    if (document.querySelector(selectors[k])) {
+        return {found: k};
+    }
+}
+return null;
+"""
+
+
+class BlockedPageError(Exception):
+    # Вместо каталога пришла капча или антибот-заглушка
+    pass
+
+
+def probe_page(driver, selectors, fallback=None, timeout=20.0, fallback_after=5.0, poll_interval=0.25):
+    # Все селекторы готовности проверяются на каждом опросе разом, срок ожидания один.
+    # Запасной селектор (обычно body) принимается, только если основные не появились
+    # за fallback_after секунд. Капча прерывает ожидание сразу. Возвращает найденный селектор
+    start = time.monotonic()
+
+    def ready(driver):
+        candidates = list(selectors)
+        if fallback and time.monotonic() - start >= fallback_after:
+            candidates.append(fallback)
+        state = driver.execute_script(PROBE_SCRIPT, candidates, BLOCK_URL_MARKERS, BLOCK_TEXT_MARKERS, BLOCK_SELECTORS)
+        if not state:
+            return None
+        if 'blocked' in state:
+            raise BlockedPageError(state['blocked'])
+        return candidates[state['found']]
+
+    return WebDriverWait(driver, timeout, poll_frequency=poll_interval).until(
+        ready, f"за {timeout:.0f}с не появился ни один из селекторов {selectors}"
+    )
+
+
+def detect_block_page(driver):
+    # Проверка без ожидания: причина блокировки или None
+    state = driver.execute_script(PROBE_SCRIPT, [], BLOCK_URL_MARKERS, BLOCK_TEXT_MARKERS, BLOCK_SELECTORS)
+    return state['blocked'] if state else None
+
+
+def detect_block_html(html):
+    # То же для ответа, полученного по HTTP: заголовок страницы и ссылки на капчу
+    text = (html or '').lower()
+    match = TITLE_RE.search(text)
+    title = match.group(1) if match else ''
+    for marker in BLOCK_TEXT_MARKERS:
+        if marker in title:
+            return marker
+    for marker in ('showcaptcha', 'smart-captcha'):
+        if marker in text:
+            return marker
+    return None
+
+# Ставит в странице MutationObserver, который пересчитывает карточки товаров
+# и запоминает момент последнего изменения их количества
+OBSERVER_SCRIPT = """
+var selector = arguments[0];
+var state = window.__catalogReadiness;
+if (state && state.observer) {
+    state.observer.disconnect();
+}
+state = {count: document.querySelectorAll(selector).length, changedAt: performance.now()};
+state.observer = new MutationObserver(function () {
+    var count = document.querySelectorAll(selector).length;
+    if (count !== state.count) {
+        state.count = count;
+        state.changedAt = performance.now();
+    }
+});
+state.observer.observe(document.documentElement, {childList: true, subtree: true});
+window.__catalogReadiness = state;
+"""
+
+# Докручивает страницу вниз (подгрузка ленивых карточек) и возвращает состояние наблюдателя
+POLL_SCRIPT = """
+var state = window.__catalogReadiness;
+window.scrollTo(0, document.body ? document.body.scrollHeight : 0);
+if (!state) {
+    return null;
+}
+return {count: state.count, idle: (performance.now() - state.changedAt) / 1000};
+"""
+
+STOP_SCRIPT = """
+var state = window.__catalogReadiness;
+if (state && state.observer) {
+    state.observer.disconnect();
+}
+window.__catalogReadiness = null;
+"""
+
+
+class ReadinessResult:
+    def __init__(self, count, elapsed, timed_out):
+        self.count = count
+        self.elapsed = elapsed
+        self.timed_out = timed_out
+
+
+def wait_for_catalog(driver, card_selector, stable_window=1.5, hard_cap=20.0, poll_interval=0.25):
+    # Крутим страницу, пока число карточек растёт; выходим, как только оно
+    # не менялось stable_window секунд, но не позже hard_cap
+    start = time.monotonic()
+    driver.execute_script(OBSERVER_SCRIPT, card_selector)
+
+    count = 0
+    timed_out = False
+    try:
+        while True:
+            state = driver.execute_script(POLL_SCRIPT)
+            if state is None:
+                # Страница перезагрузилась и наблюдатель потерян - ставим заново
+                driver.execute_script(OBSERVER_SCRIPT, card_selector)
+                state = {'count': 0, 'idle': 0}
+
+            count = state['count']
+            elapsed = time.monotonic() - start
+            # Пустой список ждём дольше: карточки могут ещё не начать появляться
+            window = stable_window if count else stable_window * 2
+            if state['idle'] >= window:
+                break
+            if elapsed >= hard_cap:
+                timed_out = True
+                break
+            time.sleep(poll_interval)
+    finally:
+        try:
+            driver.execute_script(STOP_SCRIPT)
+        except Exception:
+            pass
+
+    elapsed = time.monotonic() - start
+    if timed_out:
+        logger.info(f"Каталог не стабилизировался за {hard_cap:.0f}с, карточек: {count}")
+    return ReadinessResult(count, elapsed, timed_out)
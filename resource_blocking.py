@@ -0,0 +1,150 @@
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Network.setBlockedURLs работает только по шаблонам URL, поэтому типы ресурсов
+# задаются через характерные расширения файлов
+RESOURCE_TYPE_PATTERNS = {
+    "image": ['*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*'],
+    "font": ['*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*'],
+    "media": ['*.mp4*', '*.webm*', '*.m3u8*', '*.mp3*', '*.ogg*'],
+    "stylesheet": ['*.css*'],
+}
+
+TRACKER_PATTERNS = [
+    '*mc.yandex.ru*',
+    '*an.yandex.ru*',
+    '*yandex.ru/clck*',
+    '*adfox.ru*',
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*top-fwz1.mail.ru*',
+    '*vk.com/rtrg*',
+    '*criteo.com*',
+    '*mediator.media*',
+]
+
+# Стили по умолчанию не блокируем: без них ленивые карточки могут не подгружаться
+DEFAULT_BLOCKLISTS = {
+    "yandex": {"types": ["image", "font", "media"], "patterns": TRACKER_PATTERNS},
+    "wildberries": {"types": ["image", "font", "media"], "patterns": TRACKER_PATTERNS},
+    "ozon": {"types": ["image", "font", "media"], "patterns": TRACKER_PATTERNS},
+}
+
+# Средний размер ресурса по типу, пока нет собственных замеров (байты)
+DEFAULT_RESOURCE_SIZES = {
+    "Image": 30000,
+    "Font": 40000,
+    "Media": 500000,
+    "Stylesheet": 50000,
+    "Script": 40000,
+}
+DEFAULT_OTHER_SIZE = 5000
+
+
+class ResourceBlocker:
+    # Журнал производительности у браузера общий на все вкладки, поэтому отчёт -
+    # за сессию браузера целиком (все страницы обхода), а не за отдельную страницу
+
+    def __init__(self, blocklists=None):
+        self.blocklists = blocklists or DEFAULT_BLOCKLISTS
+        self.average_sizes = dict(DEFAULT_RESOURCE_SIZES)
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        if not path:
+            return cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                blocklists = dict(DEFAULT_BLOCKLISTS, **json.load(f))
+            logger.info(f"Списки блокировки загружены из {path}")
+            return cls(blocklists)
+        except FileNotFoundError:
+            return cls()
+        except Exception as e:
+            logger.error(f"Ошибка загрузки списков блокировки из {path}: {e}")
+            return cls()
+
+    def patterns_for(self, marketplace):
+        blocklist = self.blocklists.get(marketplace, {})
+        patterns = []
+        for resource_type in blocklist.get("types", []):
+            patterns.extend(RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+        patterns.extend(blocklist.get("patterns", []))
+        return patterns
+
+    def apply(self, driver, marketplace):
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns_for(marketplace)})
+        except Exception as e:
+            logger.warning(f"Не удалось включить блокировку ресурсов для {marketplace}: {e}")
+
+    def reset(self, driver):
+        # Начало сессии: остатки журнала от прошлой, оборванной без отчёта, сюда не относятся
+        try:
+            driver.get_log('performance')
+        except Exception as e:
+            logger.debug(f"Журнал производительности недоступен: {e}")
+
+    def report(self, driver, marketplace, pages=1):
+        # Разбираем журнал производительности за сессию: что заблокировано и сколько загружено
+        try:
+            entries = driver.get_log('performance')
+        except Exception as e:
+            logger.debug(f"Журнал производительности недоступен: {e}")
+            return None
+
+        types = {}
+        blocked = {}
+        loaded_bytes = 0
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.requestWillBeSent':
+                types[params.get('requestId')] = params.get('type', 'Other')
+            elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+                resource_type = params.get('type') or types.get(params.get('requestId'), 'Other')
+                blocked[resource_type] = blocked.get(resource_type, 0) + 1
+            elif method == 'Network.loadingFinished':
+                size = params.get('encodedDataLength', 0)
+                loaded_bytes += size
+                resource_type = types.get(params.get('requestId'))
+                if resource_type and size:
+                    self.learn_size(resource_type, size)
+
+        saved_bytes = int(sum(
+            count * self.average_sizes.get(resource_type, DEFAULT_OTHER_SIZE)
+            for resource_type, count in blocked.items()
+        ))
+        blocked_count = sum(blocked.values())
+
+        with self._lock:
+            stats = self.stats.setdefault(marketplace, {
+                'pages': 0, 'blocked': 0, 'saved_bytes': 0, 'loaded_bytes': 0,
+            })
+            stats['pages'] += pages
+            stats['blocked'] += blocked_count
+            stats['saved_bytes'] += saved_bytes
+            stats['loaded_bytes'] += loaded_bytes
+
+        logger.info(
+            f"{marketplace}: за {pages} стр. заблокировано запросов {blocked_count} {blocked}, "
+            f"сэкономлено ~{saved_bytes / 1024:.0f} КБ, загружено {loaded_bytes / 1024:.0f} КБ"
+        )
+        return blocked_count, saved_bytes
+
+    def learn_size(self, resource_type, size):
+        # Скользящее среднее по незаблокированным ресурсам того же типа
+        with self._lock:
+            previous = self.average_sizes.get(resource_type, DEFAULT_OTHER_SIZE)
+            self.average_sizes[resource_type] = previous * 0.9 + size * 0.1
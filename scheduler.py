@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RunSkipped(Exception):
+    # Прогон не запускался (например, открыт предохранитель сайта): это не неудача,
+    # задержка не растёт, следующий запуск - через retry_after секунд
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class MarketplaceSchedule:
+    def __init__(self, key, base_interval, min_interval, max_interval):
+        self.key = key
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self.interval = base_interval
+        self.failures = 0
+        self.next_run = None
+        self.last_run = None
+        self.last_duration = None
+        self.last_success = None
+
+    def update(self, success, changed, jitter):
+        if not success:
+            # Экспоненциальная задержка с разбросом, чтобы не долбить сбоящий сайт
+            self.failures += 1
+            interval = self.base_interval * (2 ** self.failures)
+            interval *= random.uniform(1 - jitter, 1 + jitter)
+            self.interval = min(self.max_interval, interval)
+        elif changed:
+            # Пока идут изменения - проверяем чаще, но не чаще минимального интервала
+            self.failures = 0
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            # Тишина - плавно возвращаемся к базовому интервалу
+            self.failures = 0
+            if self.interval < self.base_interval:
+                self.interval = min(self.base_interval, self.interval * 1.5)
+            else:
+                self.interval = self.base_interval
+        return self.interval
+
+
+class AdaptiveScheduler:
+    # Свой цикл на каждый маркетплейс: следующий запуск планируется только после
+    # завершения текущего, поэтому два прогона одного сайта не пересекаются
+
+    def __init__(self, runner, intervals, min_interval=30, max_interval=1800, jitter=0.2):
+        self.runner = runner
+        self.jitter = jitter
+        self.schedules = {
+            key: MarketplaceSchedule(key, interval, min(min_interval, interval), max(max_interval, interval))
+            for key, interval in intervals.items()
+        }
+        self.tasks = []
+
+    def start(self, first=10):
+        for index, schedule in enumerate(self.schedules.values()):
+            # Небольшой сдвиг старта, чтобы браузеры не поднимались одновременно
+            delay = first + index * 5
+            self.tasks.append(asyncio.create_task(self.run_loop(schedule, delay)))
+        logger.info("Планировщик запущен: " + ", ".join(
+            f"{s.key} каждые {s.base_interval}с" for s in self.schedules.values()
+        ))
+
+    async def run_loop(self, schedule, delay):
+        while True:
+            schedule.next_run = time.time() + delay
+            await asyncio.sleep(delay)
+
+            run_start = time.time()
+            try:
+                success, changed = await self.runner(schedule.key)
+            except asyncio.CancelledError:
+                raise
+            except RunSkipped as e:
+                delay = max(schedule.min_interval, e.retry_after)
+                logger.info(f"{schedule.key}: пропущен ({e}), следующий запуск через {delay:.0f}с")
+                continue
+            except Exception as e:
+                logger.error(f"Ошибка в задаче {schedule.key}: {e}")
+                success, changed = False, False
+            schedule.last_run = run_start
+            schedule.last_duration = time.time() - run_start
+            schedule.last_success = success
+
+            # Интервал отсчитывается от начала прогона; если прогон был дольше - стартуем сразу
+            delay = schedule.update(success, changed, self.jitter)
+            delay = max(0.0, delay - schedule.last_duration)
+            logger.info(
+                f"{schedule.key}: {'OK' if success else 'FAILED'} за {schedule.last_duration:.1f}с, "
+                f"интервал {schedule.interval:.0f}с"
+            )
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
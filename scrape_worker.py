@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+
+import config
+from job_queue import JobQueue
+from main import MarketplaceParser
+from readiness import BlockedPageError
+from targets import TargetRegistry
+
+logger = logging.getLogger(__name__)
+
+# Воркер распределённого режима (координатор - main.py с RUN_MODE=coordinator):
+#   python scrape_worker.py
+#   WORKER_NAME=chrome-2 WORKER_CONCURRENCY=2 JOB_QUEUE_PATH=/var/lib/mts/jobs.db python scrape_worker.py
+# Только на той же машине, что и координатор: очередь - локальный файл SQLite (см. config.RUN_MODE).
+# Состояния не хранит: берёт задание из очереди, собирает страницы цели и возвращает
+# товары по страницам с отпечатком. Новые/пропавшие товары считает координатор
+
+
+class ScrapeWorker:
+    def __init__(self, registry, jobs, name, concurrency):
+        self.parser = MarketplaceParser(registry, worker=True)
+        self.jobs = jobs
+        self.name = name
+        self.concurrency = concurrency
+
+    async def run(self):
+        await asyncio.to_thread(self.jobs.register_worker, self.name)
+        logger.info(f"Воркер {self.name} запущен: очередь {self.jobs.path}, заданий одновременно {self.concurrency}")
+        try:
+            await asyncio.gather(*[self.loop() for _ in range(self.concurrency)])
+        finally:
+            await self.parser.close()
+
+    async def loop(self):
+        while True:
+            job = await asyncio.to_thread(self.jobs.lease, self.name)
+            if job is None:
+                await asyncio.sleep(config.JOB_POLL_INTERVAL)
+                continue
+            await self.process(*job)
+
+    async def process(self, job_id, target_id, payload):
+        start = time.monotonic()
+        target = self.parser.registry.get(target_id)
+        if target is None:
+            # Координатор и воркер читают разные файлы целей - повтор не поможет
+            logger.error(f"Задание {job_id}: цель {target_id} не найдена в {config.TARGETS_FILE}")
+            await asyncio.to_thread(self.jobs.fail, job_id, self.name, f"неизвестная цель {target_id}", 0, False)
+            return
+
+        logger.info(f"Задание {job_id}: {target.name}")
+        heartbeat = asyncio.create_task(self.keep_lease(job_id, target))
+        try:
+            fetched = await self.parser.fetch_products(target)
+        except BlockedPageError as e:
+            # Не ошибка воркера: решение о паузе сайта принимает предохранитель координатора
+            result = {'status': 'blocked', 'error': str(e)}
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.jobs.fail, job_id, self.name, "воркер остановлен", time.monotonic() - start)
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка задания {job_id} ({target.name}): {e}")
+            await asyncio.to_thread(self.jobs.fail, job_id, self.name, e, time.monotonic() - start)
+            return
+        else:
+            if fetched is None:
+                result = {'status': 'empty'}
+            else:
+                pages, page_fingerprint, crawl = fetched
+                result = {'status': 'ok', 'pages': pages, 'fingerprint': page_fingerprint, 'crawl': crawl}
+        finally:
+            heartbeat.cancel()
+
+        products = sum(len(page) for page in result.get('pages', []))
+        crawl = result.get('crawl') or {}
+        elapsed = time.monotonic() - start
+        await asyncio.to_thread(
+            self.jobs.complete, job_id, self.name, result, elapsed, crawl.get('pages', 0), products
+        )
+        logger.info(f"Задание {job_id}: {target.name} - {result['status']}, товаров {products} за {elapsed:.1f}с")
+
+    async def keep_lease(self, job_id, target):
+        # Аренда продлевается втрое чаще, чем истекает: пропущенное продление не страшно
+        while True:
+            await asyncio.sleep(self.jobs.lease_seconds / 3)
+            try:
+                if not await asyncio.to_thread(self.jobs.heartbeat, job_id, self.name):
+                    logger.warning(f"Задание {job_id} ({target.name}): аренда потеряна, результат не будет принят")
+                    return
+            except Exception as e:
+                logger.error(f"Ошибка продления аренды задания {job_id}: {e}")
+
+
+def main():
+    registry = TargetRegistry.load(config.TARGETS_FILE)
+    jobs = JobQueue(config.JOB_QUEUE_PATH, lease=config.JOB_LEASE_SECONDS, max_attempts=config.JOB_MAX_ATTEMPTS)
+    name = config.WORKER_NAME or f"{socket.gethostname()}-{os.getpid()}"
+    worker = ScrapeWorker(registry, jobs, name, config.WORKER_CONCURRENCY)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        logger.info(f"Воркер {name} остановлен")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    marketplace TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    appearances INTEGER NOT NULL DEFAULT 0,
+    active INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (marketplace, product_id)
+);
+CREATE INDEX IF NOT EXISTS idx_products_active ON products (marketplace, active, first_seen);
+CREATE INDEX IF NOT EXISTS idx_products_last_seen ON products (marketplace, last_seen);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    marketplace TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    name TEXT,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_marketplace_ts ON events (marketplace, ts);
+"""
+
+
+class SqliteProductStorage:
+    # История товаров: одна строка на (маркетплейс, товар) с first_seen/last_seen
+    # и числом появлений, плюс таблица событий добавления/исчезновения
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.active = {}
+
+    def load(self, marketplace):
+        rows = self.conn.execute(
+            'SELECT product_id, name FROM products WHERE marketplace = ? AND active = 1',
+            (marketplace,)
+        ).fetchall()
+        self.active[marketplace] = dict(rows)
+        return dict(rows)
+
+    def apply(self, marketplace, changed, removed, seen=()):
+        # changed - новые товары и новые названия, removed - id пропавших,
+        # seen - id, встреченные в этом прогоне: только им растут last_seen и appearances
+        previous = self.active.get(marketplace)
+        if previous is None:
+            previous = self.load(marketplace)
+
+        changed = [(pid, name) for pid, name in changed.items() if previous.get(pid) != name]
+        removed = [pid for pid in removed if pid in previous]
+        added = [pid for pid, _ in changed if pid not in previous]
+        names = dict(changed)
+        now = time.time()
+
+        # Весь дифф цикла - одной транзакцией
+        with self.conn:
+            if removed:
+                self.conn.executemany(
+                    'UPDATE products SET active = 0 WHERE marketplace = ? AND product_id = ?',
+                    [(marketplace, pid) for pid in removed]
+                )
+            if changed:
+                self.conn.executemany(
+                    'INSERT INTO products (marketplace, product_id, name, first_seen, last_seen, appearances, active) '
+                    'VALUES (?, ?, ?, ?, ?, 0, 1) '
+                    'ON CONFLICT (marketplace, product_id) DO UPDATE SET name = excluded.name, active = 1',
+                    [(marketplace, pid, name, now, now) for pid, name in changed]
+                )
+            self.mark_seen(marketplace, seen, now)
+            events = [(marketplace, pid, 'added', names[pid], now) for pid in added]
+            events += [(marketplace, pid, 'removed', previous[pid], now) for pid in removed]
+            if events:
+                self.conn.executemany(
+                    'INSERT INTO events (marketplace, product_id, event, name, ts) VALUES (?, ?, ?, ?, ?)',
+                    events
+                )
+
+        for pid in removed:
+            del previous[pid]
+        previous.update(names)
+        return bool(changed or removed)
+
+    def touch(self, marketplace, seen):
+        # Прогон без изменений (например, пропущенный по отпечатку страницы)
+        with self.conn:
+            self.mark_seen(marketplace, seen, time.time())
+
+    def mark_seen(self, marketplace, seen, now):
+        self.conn.executemany(
+            'UPDATE products SET last_seen = ?, appearances = appearances + 1 '
+            'WHERE marketplace = ? AND product_id = ? AND active = 1',
+            [(now, marketplace, pid) for pid in seen]
+        )
+
+    def count(self, marketplace):
+        row = self.conn.execute(
+            'SELECT COUNT(*) FROM products WHERE marketplace = ? AND active = 1',
+            (marketplace,)
+        ).fetchone()
+        return row[0]
+
+    def page(self, marketplace, offset=0, limit=20):
+        return self.conn.execute(
+            'SELECT product_id, name FROM products WHERE marketplace = ? AND active = 1 '
+            'ORDER BY first_seen, product_id LIMIT ? OFFSET ?',
+            (marketplace, limit, offset)
+        ).fetchall()
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception as e:
+            logger.error(f"Ошибка закрытия базы {self.path}: {e}")
@@ -0,0 +1,161 @@
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+
+from sqlite_store import SqliteProductStorage
+
+logger = logging.getLogger(__name__)
+
+# mkstemp создаёт файлы с правами 0600; новым файлам даём обычные права по umask,
+# как у open(). Узнать umask можно только установив его, поэтому - один раз при импорте
+umask = os.umask(0)
+os.umask(umask)
+NEW_FILE_MODE = 0o666 & ~umask
+
+
+def atomic_write_json(filename, data):
+    # Пишем во временный файл рядом и переименовываем: файл либо старый, либо новый целиком
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = os.stat(filename).st_mode & 0o777
+        except FileNotFoundError:
+            mode = NEW_FILE_MODE
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonProductStore:
+    # Снимок {product_id: name} + журнал изменений (JSON Lines: added/removed за цикл).
+    # Без изменений на диск ничего не пишется, снимок переписывается только при компактизации
+
+    def __init__(self, filename, compact_every=50):
+        self.filename = filename
+        self.journal_filename = filename + '.journal'
+        self.compact_every = compact_every
+
+        self.state = {}
+        self.journal_entries = 0
+
+    def load(self):
+        self.state = self.read_snapshot()
+        self.journal_entries = self.replay_journal(self.state)
+        if self.journal_entries:
+            self.compact()
+        return dict(self.state)
+
+    def read_snapshot(self):
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                content = f.read()
+            if not content.strip():
+                return {}
+            data = json.loads(content)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.error(f"Повреждён файл {self.filename}: {e}")
+            return {}
+
+    def replay_journal(self, state):
+        applied = 0
+        try:
+            with open(self.journal_filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Недописанная строка после падения - просто пропускаем
+                        continue
+                    for product_id in entry.get('removed', []):
+                        state.pop(product_id, None)
+                    state.update(entry.get('added', {}))
+                    applied += 1
+        except FileNotFoundError:
+            pass
+        return applied
+
+    def apply(self, added, removed):
+        # Дифф уже посчитан вызывающим: в журнал уходит только он
+        added = {pid: name for pid, name in added.items() if self.state.get(pid) != name}
+        removed = [pid for pid in removed if pid in self.state]
+        if not added and not removed:
+            return False
+
+        entry = {'ts': int(time.time()), 'added': added, 'removed': removed}
+        with open(self.journal_filename, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        for pid in removed:
+            del self.state[pid]
+        self.state.update(added)
+        self.journal_entries += 1
+
+        if self.journal_entries >= self.compact_every:
+            self.compact()
+        return True
+
+    def compact(self):
+        try:
+            atomic_write_json(self.filename, self.state)
+            if os.path.exists(self.journal_filename):
+                os.remove(self.journal_filename)
+            self.journal_entries = 0
+        except Exception as e:
+            logger.error(f"Ошибка компактизации {self.filename}: {e}")
+
+
+class JsonProductStorage:
+    # Хранилище по умолчанию: отдельный JSON-файл с журналом на каждый маркетплейс
+
+    def __init__(self, files, compact_every=50):
+        self.stores = {
+            marketplace: JsonProductStore(filename, compact_every=compact_every)
+            for marketplace, filename in files.items()
+        }
+
+    def load(self, marketplace):
+        return self.stores[marketplace].load()
+
+    def apply(self, marketplace, added, removed, seen=()):
+        # seen нужен только истории в SQLite: JSON хранит лишь текущий список
+        return self.stores[marketplace].apply(added, removed)
+
+    def touch(self, marketplace, seen):
+        pass
+
+    def count(self, marketplace):
+        return len(self.stores[marketplace].state)
+
+    def page(self, marketplace, offset=0, limit=20):
+        items = self.stores[marketplace].state.items()
+        return list(itertools.islice(items, offset, offset + limit))
+
+    def close(self):
+        # Снимок переписывается, только если с прошлой компактизации есть журнал
+        for store in self.stores.values():
+            if store.journal_entries:
+                store.compact()
+
+
+def create_storage(backend, files, sqlite_path, compact_every=50):
+    if backend == 'sqlite':
+        return SqliteProductStorage(sqlite_path)
+    return JsonProductStorage(files, compact_every=compact_every)
@@ -0,0 +1,145 @@
+import json
+import logging
+import re
+from collections import OrderedDict
+
+import config
+from classifier import KeywordClassifier
+
+logger = logging.getLogger(__name__)
+
+MARKETPLACE_NAMES = {
+    "yandex": "Яндекс Маркет",
+    "wildberries": "Wildberries",
+    "ozon": "Ozon",
+}
+
+# Цели по умолчанию - магазины МТС. id совпадают с прежними ключами маркетплейсов,
+# поэтому сохранённые yandex_products.json и т.п. подхватываются как есть
+DEFAULT_TARGETS = [
+    {
+        "id": "yandex",
+        "marketplace": "yandex",
+        "url": "https://market.yandex.ru/business--pao-mts/5336359",
+        "title": "магазин МТС",
+    },
+    {
+        "id": "wildberries",
+        "marketplace": "wildberries",
+        "url": "https://www.wildberries.ru/seller/2980#c494811627",
+        "title": "продавец 2980",
+    },
+    {
+        "id": "ozon",
+        "marketplace": "ozon",
+        "url": "https://www.ozon.ru/seller/mts-55913/products/",
+        "title": "продавец 55913",
+    },
+]
+
+DEFAULT_PROFILE = "default"
+
+# id попадает в callback_data кнопок и имена файлов
+TARGET_ID_RE = re.compile(r'^[a-z0-9_\-]{1,40}$')
+
+
+class Target:
+    def __init__(self, id, marketplace, url=None, urls=None, name=None, title=None,
+                 keywords=DEFAULT_PROFILE, interval=None, chat_id=None, products_file=None):
+        self.id = id
+        self.marketplace = marketplace
+        self.urls = list(urls or [url])
+        self.url = self.urls[0]
+        if name:
+            self.name = name
+        elif id == marketplace:
+            self.name = MARKETPLACE_NAMES[marketplace]
+        else:
+            self.name = f"{MARKETPLACE_NAMES[marketplace]} · {id}"
+        self.title = title or self.url
+        self.keywords = keywords
+        self.interval = interval or config.MARKETPLACE_INTERVALS[marketplace]
+        self.chat_id = chat_id
+        self.products_file = products_file or f"{id}_products.json"
+
+
+class TargetRegistry:
+    # Что и куда отслеживаем: цели, профили ключевых слов, токен бота и чат по умолчанию.
+    # Файл (config.TARGETS_FILE):
+    #   {"bot_token": "...", "chat_id": "...",
+    #    "keyword_profiles": {"mts": {...как keywords.json...}},
+    #    "targets": [{"id": "ozon-mts", "marketplace": "ozon", "url": "...",
+    #                 "keywords": "mts", "interval": 120, "chat_id": "..."}]}
+
+    def __init__(self, targets, profiles=None, bot_token=None, chat_id=None):
+        self.bot_token = bot_token or config.BOT_TOKEN
+        self.chat_id = chat_id or config.CHAT_ID
+
+        self.classifiers = {DEFAULT_PROFILE: KeywordClassifier.from_file(config.KEYWORDS_FILE)}
+        for profile, keywords in (profiles or {}).items():
+            self.classifiers[profile] = KeywordClassifier(keywords)
+
+        self.targets = OrderedDict()
+        for entry in targets:
+            target = self.build_target(entry)
+            if target:
+                self.targets[target.id] = target
+
+    def build_target(self, entry):
+        target_id = str(entry.get("id", ""))
+        marketplace = entry.get("marketplace")
+        if not TARGET_ID_RE.match(target_id):
+            logger.error(f"Цель пропущена: некорректный id {target_id!r}")
+            return None
+        if target_id in self.targets:
+            logger.error(f"Цель пропущена: id {target_id} уже есть")
+            return None
+        if marketplace not in MARKETPLACE_NAMES:
+            logger.error(f"Цель {target_id} пропущена: неизвестный маркетплейс {marketplace!r}")
+            return None
+        if not entry.get("url") and not entry.get("urls"):
+            logger.error(f"Цель {target_id} пропущена: не указан url")
+            return None
+        if entry.get("keywords", DEFAULT_PROFILE) not in self.classifiers:
+            logger.error(f"Цель {target_id}: профиль ключевых слов {entry['keywords']!r} не найден, используется default")
+            entry = dict(entry, keywords=DEFAULT_PROFILE)
+        fields = ("url", "urls", "name", "title", "keywords", "interval", "chat_id", "products_file")
+        return Target(target_id, marketplace, **{key: entry[key] for key in fields if key in entry})
+
+    @classmethod
+    def load(cls, path):
+        data = {}
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                logger.info(f"Цели загружены из {path}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Ошибка загрузки целей из {path}: {e}")
+        registry = cls(
+            data.get("targets") or DEFAULT_TARGETS,
+            profiles=data.get("keyword_profiles"),
+            bot_token=data.get("bot_token"),
+            chat_id=data.get("chat_id")
+        )
+        if not registry.targets:
+            logger.error("Ни одной корректной цели, используются цели по умолчанию")
+            registry = cls(DEFAULT_TARGETS, bot_token=registry.bot_token, chat_id=registry.chat_id)
+        return registry
+
+    def __iter__(self):
+        return iter(self.targets.values())
+
+    def __len__(self):
+        return len(self.targets)
+
+    def get(self, target_id):
+        return self.targets.get(target_id)
+
+    def classifier_for(self, target):
+        return self.classifiers[target.keywords]
+
+    def chat_for(self, target):
+        return target.chat_id or self.chat_id
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Модули бота лежат в корне репозитория, без пакета
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def read_data(name):
+    with open(os.path.join(DATA_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
@@ -0,0 +1,148 @@
+import re
+
+import lxml.html
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import read_data
+from extraction import MARKETPLACE_SPECS, element_text, get_extractor
+
+# Прежние парсеры на BeautifulSoup из main.py: те же селекторы и поиск по тексту,
+# в том же порядке. Извлечение по спецификации должно давать ровно эти кандидаты
+
+YANDEX_CLASS_SELECTORS = ['._6yVOX', '.XqR4A', '.cia-cs', '.cia-vs']
+YANDEX_TEXT_RE = re.compile(r'мтс|mts|сим|sim|тариф|плюс|plus', re.I)
+
+WILDBERRIES_SELECTORS = [
+    '.product-card__name',
+    '.goods-name',
+    '.card-product__name',
+    '.product-card .product-card__name',
+]
+
+OZON_SELECTORS = [
+    '.tile-root .tsBody500',
+    '.tile-root .tsHeadline500',
+    '.tile-root .tsBodyL',
+    '.tile-root .tsHeadlineL',
+    '[data-widget="searchResultsV2"] .tsBody500',
+    '[data-widget="searchResultsV2"] .tsHeadline500',
+    '.x2h .tsBody500',
+    '.x2h .tsHeadline500',
+    '.i9x6 .tsBody500',
+    '.i9x6 .tsHeadline500',
+    '.product-card .title',
+    '.product-card .name',
+]
+OZON_KEYWORDS = ['сим-карта мтс', 'sim-карта мтс', 'мтс тариф', 'мтс баланс']
+
+
+def text_nodes(soup, pattern):
+    return [
+        element.strip()
+        for element in soup.find_all(string=pattern)
+        if element.parent and element.parent.name not in ['script', 'style']
+    ]
+
+
+def soup_yandex(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    texts = []
+    for product in soup.select('[data-autotest-id="product-snippet"]'):
+        name_element = product.select_one('[data-autotest-id="product-title"]')
+        if name_element:
+            texts.append(name_element.get_text(strip=True))
+    for selector in YANDEX_CLASS_SELECTORS:
+        texts.extend(element.get_text(strip=True) for element in soup.select(selector))
+    texts.extend(text_nodes(soup, YANDEX_TEXT_RE))
+    return texts
+
+
+def soup_wildberries(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    texts = []
+    for selector in WILDBERRIES_SELECTORS:
+        texts.extend(element.get_text(strip=True) for element in soup.select(selector))
+    return texts
+
+
+def soup_ozon(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    texts = []
+    for selector in OZON_SELECTORS:
+        texts.extend(element.get_text(strip=True) for element in soup.select(selector))
+    for keyword in OZON_KEYWORDS:
+        texts.extend(text_nodes(soup, re.compile(re.escape(keyword), re.I)))
+    return texts
+
+
+SOUP_PARSERS = {
+    "yandex": soup_yandex,
+    "wildberries": soup_wildberries,
+    "ozon": soup_ozon,
+}
+
+
+@pytest.mark.parametrize("marketplace", sorted(SOUP_PARSERS))
+def test_candidates_match_soup_parsers(marketplace):
+    html = read_data(f"{marketplace}_catalog.html")
+    expected = SOUP_PARSERS[marketplace](html)
+    assert expected
+    assert get_extractor(marketplace).extract(html) == expected
+
+
+NESTED_SNIPPETS = """
+<div data-autotest-id="product-snippet">
+  <div data-autotest-id="product-snippet">
+    <h3 data-autotest-id="product-title">Роутер МТС 81330FT</h3>
+    <div data-autotest-id="product-snippet"><span>без названия</span></div>
+  </div>
+  <h3 data-autotest-id="product-title">Модем МТС 8810FT</h3>
+  <div data-autotest-id="product-snippet">
+    <h3 data-autotest-id="product-title">Сим-карта МТС</h3>
+  </div>
+</div>
+<div data-autotest-id="product-snippet">
+  <h3 data-autotest-id="product-title">Смартфон МТС Smart Race</h3>
+</div>
+"""
+
+
+def test_nested_containers_match_select_one():
+    # select_one по каждому контейнеру: внешний и вложенный дают один и тот же заголовок
+    expected = soup_yandex(NESTED_SNIPPETS)
+    assert expected[:4] == ['Роутер МТС 81330FT', 'Роутер МТС 81330FT', 'Сим-карта МТС', 'Смартфон МТС Smart Race']
+    assert get_extractor("yandex").extract(NESTED_SNIPPETS) == expected
+
+
+@pytest.mark.parametrize("marketplace", sorted(SOUP_PARSERS))
+def test_spec_keeps_soup_selectors(marketplace):
+    # Спецификация не должна разойтись со списками селекторов прежних парсеров
+    selectors = [
+        entry if isinstance(entry, str) else entry["selector"]
+        for entry in MARKETPLACE_SPECS[marketplace]["selectors"]
+    ]
+    if marketplace == "yandex":
+        assert selectors[1:] == YANDEX_CLASS_SELECTORS
+    elif marketplace == "wildberries":
+        assert selectors == WILDBERRIES_SELECTORS
+    else:
+        assert selectors == OZON_SELECTORS
+
+
+@pytest.mark.parametrize("html", [
+    "<div>  Смартфон <b> МТС </b>\n 32 ГБ </div>",
+    "<div>МТС<script>var x = 1;</script><style>.a{}</style> Роутер</div>",
+    "<div>Сим<!-- комментарий -->карта <i>MTS</i><br>Plus</div>",
+    "<div><p></p>   </div>",
+])
+def test_element_text_matches_get_text(html):
+    expected = BeautifulSoup(html, 'html.parser').div.get_text(strip=True)
+    element = lxml.html.fragment_fromstring(html)
+    assert element_text(element) == expected
+
+
+@pytest.mark.parametrize("marketplace", sorted(SOUP_PARSERS))
+def test_empty_page(marketplace):
+    assert get_extractor(marketplace).extract("") == []
+    assert get_extractor(marketplace).extract("<html><body></body></html>") == []
@@ -0,0 +1,128 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from conftest import read_data
+from fetch_backends import HttpSession, OzonHttpBackend, WildberriesHttpBackend, YandexHttpBackend
+
+# Локальная подмена маркетплейсов: базовый адрес бэкенда указывает на тестовый сервер,
+# который отдаёт записанные ответы из tests/data
+
+CAPTCHA_HTML = '<html><body><form action="/showcaptcha?retpath=x"></form></body></html>'
+
+
+def make_app(requests):
+    async def yandex_shop(request):
+        requests.append(('yandex', dict(request.query)))
+        page = request.query.get('page')
+        if page is None:
+            return web.Response(text=read_data('yandex_catalog.html'), content_type='text/html')
+        if page == '2':
+            return web.Response(text=read_data('yandex_page2.html'), content_type='text/html')
+        return web.Response(text=CAPTCHA_HTML, content_type='text/html')
+
+    async def wildberries_catalog(request):
+        requests.append(('wildberries', dict(request.query)))
+        if request.query.get('supplier') != '12345':
+            return web.json_response({'data': {'products': []}})
+        if request.query.get('page') != '1':
+            return web.json_response({'data': {'products': []}})
+        return web.Response(text=read_data('wildberries_catalog.json'), content_type='application/json')
+
+    async def ozon_entrypoint(request):
+        requests.append(('ozon', dict(request.query)))
+        pages = {
+            '/seller/mts-1/': 'ozon_page1.json',
+            '/seller/mts-1/?page=2': 'ozon_page2.json',
+        }
+        name = pages.get(request.query.get('url'))
+        if name is None:
+            return web.json_response({'widgetStates': {}})
+        return web.Response(text=read_data(name), content_type='application/json')
+
+    app = web.Application()
+    app.router.add_get('/business--mts/1', yandex_shop)
+    app.router.add_get('/sellers/v2/catalog', wildberries_catalog)
+    app.router.add_get('/api/entrypoint-api.bff/page/json/v2', ozon_entrypoint)
+    return app
+
+
+def run_backend(create_backend):
+    # (результат fetch, запросы к серверу)
+    async def run():
+        requests = []
+        server = TestServer(make_app(requests))
+        await server.start_server()
+        http = HttpSession('test-agent', timeout=5)
+        try:
+            backend = create_backend(http, str(server.make_url('/')))
+            return await backend.fetch(), requests
+        finally:
+            await http.close()
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def test_yandex_backend_follows_pagination():
+    result, requests = run_backend(lambda http, base: YandexHttpBackend(http, base, '/business--mts/1'))
+
+    # Страница 3 отдала капчу - она не попадает в результат и считается незагруженной
+    assert [url.split('/', 3)[3] for url, _ in result.pages] == ['business--mts/1', 'business--mts/1?page=2']
+    assert result.failed == 1
+    assert result.page_count == 2
+    assert not result.truncated
+    assert 'Планшет МТС Tab 10 64 ГБ' in result.pages[1][1]
+    assert sorted(query.get('page', '1') for _, query in requests) == ['1', '2', '3']
+
+
+def test_yandex_backend_respects_max_pages():
+    result, requests = run_backend(lambda http, base: YandexHttpBackend(http, base, '/business--mts/1', max_pages=2))
+    assert len(result.pages) == 2
+    assert result.failed == 0
+    # Третья страница есть, но не прочитана - пропажи по такому обходу не считаются
+    assert result.truncated
+    assert len(requests) == 2
+
+
+def test_yandex_backend_returns_nothing_on_captcha():
+    result, _ = run_backend(lambda http, base: YandexHttpBackend(http, base, '/business--mts/1?page=3'))
+    assert not result
+
+
+def test_wildberries_backend_reads_catalog_api():
+    result, requests = run_backend(lambda http, base: WildberriesHttpBackend(http, base, '12345'))
+
+    assert result.texts == [
+        'Смартфон МТС Smart Race 5G 64 ГБ',
+        'Роутер МТС 81330FT Wi-Fi',
+        'Сим-карта МТС с балансом 300 ₽',
+    ]
+    assert result.page_count == 1
+    assert not result.truncated
+    # Меньше 100 товаров на странице - следующую не запрашиваем
+    assert len(requests) == 1
+    assert requests[0][1]['supplier'] == '12345'
+
+
+def test_ozon_backend_collects_names_across_pages():
+    result, requests = run_backend(lambda http, base: OzonHttpBackend(http, base, '/seller/mts-1/'))
+
+    assert result.texts == [
+        'Смартфон МТС Smart Start 4 32 ГБ черный',
+        'Роутер MTS 8213FT-V 4G Wi-Fi',
+        'Модем МТС 8810FT USB 4G, белый',
+        'Сим-карта МТС тариф «Для своих»',
+    ]
+    assert result.page_count == 2
+    assert not result.truncated
+    # nextPage второй страницы указывает на неё же - повторно не запрашивается
+    assert [query['url'] for _, query in requests] == ['/seller/mts-1/', '/seller/mts-1/?page=2']
+
+
+def test_ozon_backend_reports_truncation():
+    result, requests = run_backend(lambda http, base: OzonHttpBackend(http, base, '/seller/mts-1/', max_pages=1))
+    assert result.page_count == 1
+    assert result.truncated
+    assert len(requests) == 1
@@ -0,0 +1,103 @@
+import pytest
+
+import job_queue
+from job_queue import JobQueue
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_queue.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    jobs = JobQueue(str(tmp_path / 'jobs.db'), lease=60, max_attempts=2)
+    jobs.register_worker('w1')
+    jobs.register_worker('w2')
+    return jobs
+
+
+def workers(queue):
+    return {worker['name']: worker for worker in queue.worker_stats()}
+
+
+def test_lease_and_complete(queue):
+    job_id = queue.enqueue('ozon', {'target': 'ozon'})
+    assert queue.lease('w1') == (job_id, 'ozon', {'target': 'ozon'})
+    assert queue.lease('w2') is None
+
+    assert queue.complete(job_id, 'w1', {'status': 'ok'}, 2.5, pages=3, products=10)
+    assert queue.result(job_id) == ('done', {'status': 'ok'}, None)
+    stats = workers(queue)['w1']
+    assert (stats['done'], stats['active'], stats['pages'], stats['products']) == (1, 0, 3, 10)
+
+
+def test_heartbeat_keeps_lease(queue, clock):
+    job_id = queue.enqueue('ozon', {})
+    queue.lease('w1')
+    clock.now += 50
+    assert queue.heartbeat(job_id, 'w1')
+    clock.now += 50
+    # Аренда продлена до 1110 - другому воркеру задание не достаётся
+    assert queue.lease('w2') is None
+
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    job_id = queue.enqueue('ozon', {})
+    queue.lease('w1')
+    clock.now += 61
+
+    assert queue.lease('w2') == (job_id, 'ozon', {})
+    # Прежний воркер потерял задание: продление и поздний результат не принимаются
+    assert not queue.heartbeat(job_id, 'w1')
+    assert not queue.complete(job_id, 'w1', {'status': 'ok'}, 1.0)
+    assert queue.complete(job_id, 'w2', {'status': 'ok'}, 1.0)
+
+    stats = workers(queue)
+    assert stats['w1']['lost'] == 1
+    assert stats['w1']['active'] == 0
+    assert stats['w2']['done'] == 1
+
+
+def test_expired_lease_fails_after_max_attempts(queue, clock):
+    job_id = queue.enqueue('ozon', {})
+    queue.lease('w1')
+    clock.now += 61
+    queue.lease('w2')
+    clock.now += 61
+
+    assert queue.lease('w1') is None
+    status, result, error = queue.result(job_id)
+    assert status == 'failed'
+    assert 'аренда истекла' in error
+    assert queue.depth() == {'failed': 1}
+
+
+def test_result_reclaims_without_workers(queue, clock):
+    # Координатор сам возвращает просроченное задание в очередь, даже если воркеров нет
+    job_id = queue.enqueue('ozon', {})
+    queue.lease('w1')
+    clock.now += 61
+    assert queue.result(job_id)[0] == 'pending'
+
+
+def test_fail_retries_until_max_attempts(queue):
+    job_id = queue.enqueue('ozon', {})
+    queue.lease('w1')
+    queue.fail(job_id, 'w1', 'таймаут', 1.0)
+    assert queue.result(job_id)[0] == 'pending'
+
+    queue.lease('w2')
+    queue.fail(job_id, 'w2', 'таймаут', 1.0)
+    assert queue.result(job_id) == ('failed', None, 'таймаут')
+    assert workers(queue)['w2']['failed'] == 1
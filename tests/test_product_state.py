@@ -0,0 +1,106 @@
+from identity import IdentityIndex
+from product_state import ProductState
+
+HOUR = 3600
+
+
+def make_state(ttl=None, max_size=None):
+    return ProductState(ttl=ttl, max_size=max_size, identity=IdentityIndex(threshold=0.8))
+
+
+def test_diff_added_updated_removed():
+    state = make_state()
+    diff = state.apply({'a': 'Роутер МТС', 'b': 'Модем МТС'}, now=0)
+    assert diff.added == {'a': 'Роутер МТС', 'b': 'Модем МТС'}
+
+    diff = state.apply({'a': 'Роутер МТС 4G', 'c': 'Сим-карта МТС'}, now=10)
+    assert diff.added == {'c': 'Сим-карта МТС'}
+    assert diff.updated == {'a': 'Роутер МТС 4G'}
+    assert diff.removed == {'b': 'Модем МТС'}
+    assert sorted(diff.upserts()) == ['a', 'c']
+    assert diff.deletions() == ['b']
+    assert dict(state.items()) == {'a': 'Роутер МТС 4G', 'c': 'Сим-карта МТС'}
+
+
+def test_unseen_kept_until_ttl():
+    state = make_state(ttl=72 * HOUR)
+    state.apply({'a': 'Роутер МТС', 'b': 'Модем МТС'}, now=0)
+
+    diff = state.apply({'a': 'Роутер МТС'}, drop_unseen=False, now=10 * HOUR)
+    assert not diff
+    assert 'b' in state
+
+    diff = state.apply({'a': 'Роутер МТС'}, drop_unseen=False, now=73 * HOUR)
+    assert diff.removed == {'b': 'Модем МТС'}
+    assert state.stats['expired'] == 1
+
+
+def test_touch_postpones_expiry():
+    state = make_state(ttl=72 * HOUR)
+    state.apply({'a': 'Роутер МТС', 'b': 'Модем МТС'}, now=0)
+    state.touch(['b'], now=50 * HOUR)
+
+    diff = state.apply({'a': 'Роутер МТС'}, drop_unseen=False, now=73 * HOUR)
+    assert not diff.removed
+    assert 'b' in state
+
+
+def test_max_size_evicts_oldest_unseen():
+    state = make_state(max_size=2)
+    state.apply({'a': 'Роутер МТС', 'b': 'Модем МТС'}, now=0)
+    diff = state.apply({'b': 'Модем МТС', 'c': 'Сим-карта МТС'}, drop_unseen=False, now=10)
+    assert diff.evicted == {'a': 'Роутер МТС'}
+    assert len(state) == 2
+
+
+def test_rename_in_same_run():
+    state = make_state()
+    state.apply({'a': 'Смартфон МТС Smart Race 5G 64 ГБ', 'b': 'Модем МТС'}, now=0)
+    diff = state.apply({'a2': 'Смартфон МТС Smart Race 5G 64 ГБ черный', 'b': 'Модем МТС'}, now=10)
+
+    assert diff.renamed == {'a2': ('a', 'Смартфон МТС Smart Race 5G 64 ГБ', 'Смартфон МТС Smart Race 5G 64 ГБ черный')}
+    assert not diff.added
+    assert not diff.removed
+    assert diff.deletions() == ['a']
+    assert state.stats['renamed'] == 1
+
+
+def test_partial_run_does_not_rename_unseen():
+    # Не встреченный при неполном обходе товар остаётся в каталоге, похожий новый - отдельный товар
+    state = make_state(ttl=72 * HOUR)
+    state.apply({'a': 'Смартфон МТС Smart Race 5G 64 ГБ'}, now=0)
+    diff = state.apply({'a2': 'Смартфон МТС Smart Race 5G 64 ГБ черный'}, drop_unseen=False, now=10)
+
+    assert diff.added == {'a2': 'Смартфон МТС Smart Race 5G 64 ГБ черный'}
+    assert not diff.renamed
+    assert 'a' in state
+
+
+def test_expired_matches_recent_addition():
+    # Накопление (Ozon): новое название пришло раньше, прежнее истекает по ttl -
+    # это переименование, а не пропажа
+    state = make_state(ttl=72 * HOUR)
+    state.apply({'a': 'Смартфон МТС Smart Race 5G 64 ГБ', 'b': 'Модем МТС'}, now=0)
+    diff = state.apply({'a2': 'Смартфон МТС Smart Race 5G 64 ГБ черный', 'b': 'Модем МТС'}, drop_unseen=False, now=HOUR)
+    assert list(diff.added) == ['a2']
+
+    diff = state.apply({'a2': 'Смартфон МТС Smart Race 5G 64 ГБ черный', 'b': 'Модем МТС'}, drop_unseen=False, now=74 * HOUR)
+    assert diff.renamed == {'a2': ('a', 'Смартфон МТС Smart Race 5G 64 ГБ', 'Смартфон МТС Smart Race 5G 64 ГБ черный')}
+    assert not diff.removed
+    assert diff.deletions() == ['a']
+    assert 'a' not in state and 'a2' in state
+
+
+def test_expired_ignores_additions_before_last_seen():
+    # Похожий товар, появившийся, пока прежний ещё встречался, - не его новое название
+    state = make_state(ttl=72 * HOUR)
+    state.apply({'a': 'Смартфон МТС Smart Race 5G 64 ГБ'}, now=0)
+    state.apply({
+        'a': 'Смартфон МТС Smart Race 5G 64 ГБ',
+        'a2': 'Смартфон МТС Smart Race 5G 64 ГБ черный',
+    }, drop_unseen=False, now=HOUR)
+    state.apply({'a2': 'Смартфон МТС Smart Race 5G 64 ГБ черный'}, drop_unseen=False, now=2 * HOUR)
+
+    diff = state.apply({'a2': 'Смартфон МТС Smart Race 5G 64 ГБ черный'}, drop_unseen=False, now=75 * HOUR)
+    assert diff.removed == {'a': 'Смартфон МТС Smart Race 5G 64 ГБ'}
+    assert not diff.renamed
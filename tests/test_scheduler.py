@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+import scheduler
+from scheduler import AdaptiveScheduler, RunSkipped
+
+
+def run_schedule(outcomes, monkeypatch):
+    # Прогоняет цикл планировщика по списку исходов; возвращает (паузы между запусками, расписание)
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+        if not outcomes:
+            raise asyncio.CancelledError
+
+    async def runner(key):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(scheduler.asyncio, 'sleep', fake_sleep)
+    monkeypatch.setattr(scheduler.random, 'uniform', lambda a, b: 1.0)
+    sched = AdaptiveScheduler(runner, {'wb': 100}, min_interval=30, max_interval=1800)
+    schedule = sched.schedules['wb']
+
+    async def run():
+        try:
+            await sched.run_loop(schedule, 0)
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    return delays[1:], schedule
+
+
+def test_failure_backs_off(monkeypatch):
+    delays, schedule = run_schedule([(False, False), (False, False)], monkeypatch)
+    assert schedule.failures == 2
+    assert delays == pytest.approx([200, 400], abs=0.1)
+
+
+def test_skip_is_not_a_failure(monkeypatch):
+    delays, schedule = run_schedule([RunSkipped("предохранитель открыт", 120), (True, False)], monkeypatch)
+    # Пропуск ждёт остаток паузы предохранителя и не трогает счётчик неудач
+    assert delays == pytest.approx([120, 100], abs=0.1)
+    assert schedule.failures == 0
+    assert schedule.last_success is True
+
+
+def test_skip_waits_at_least_min_interval(monkeypatch):
+    delays, schedule = run_schedule([RunSkipped("проверка уже идёт", 0)], monkeypatch)
+    assert delays == [30]
+    assert schedule.last_run is None
@@ -0,0 +1,95 @@
+import json
+import os
+import stat
+
+import storage
+from storage import JsonProductStorage, JsonProductStore, atomic_write_json
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def file_mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_apply_appends_to_journal(tmp_path):
+    path = str(tmp_path / 'ozon.json')
+    store = JsonProductStore(path)
+    store.load()
+
+    assert store.apply({'a': 'Роутер МТС', 'b': 'Модем МТС'}, [])
+    assert store.apply({'c': 'Сим-карта МТС'}, ['a'])
+    # Повтор того же - не изменение, журнал не растёт
+    assert not store.apply({'c': 'Сим-карта МТС'}, ['a'])
+
+    assert not os.path.exists(path)
+    with open(path + '.journal', 'r', encoding='utf-8') as f:
+        assert len(f.readlines()) == 2
+    assert store.journal_entries == 2
+
+
+def test_load_replays_journal_and_compacts(tmp_path):
+    path = str(tmp_path / 'ozon.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'a': 'Роутер МТС', 'b': 'Модем МТС'}, f)
+    with open(path + '.journal', 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'ts': 1, 'added': {'c': 'Сим-карта МТС'}, 'removed': ['a']}) + '\n')
+        f.write(json.dumps({'ts': 2, 'added': {'b': 'Модем МТС 4G'}, 'removed': []}) + '\n')
+        # Недописанная строка после падения
+        f.write('{"ts": 3, "added": {"d"')
+
+    store = JsonProductStore(path)
+    expected = {'b': 'Модем МТС 4G', 'c': 'Сим-карта МТС'}
+    assert store.load() == expected
+    assert read_json(path) == expected
+    assert not os.path.exists(path + '.journal')
+    assert store.journal_entries == 0
+
+
+def test_compacts_every_n_entries(tmp_path):
+    path = str(tmp_path / 'ozon.json')
+    store = JsonProductStore(path, compact_every=2)
+    store.load()
+    store.apply({'a': 'Роутер МТС'}, [])
+    assert not os.path.exists(path)
+    store.apply({'b': 'Модем МТС'}, [])
+    assert read_json(path) == {'a': 'Роутер МТС', 'b': 'Модем МТС'}
+    assert not os.path.exists(path + '.journal')
+
+
+def test_close_compacts_only_with_journal(tmp_path):
+    changed = str(tmp_path / 'ozon.json')
+    untouched = str(tmp_path / 'wildberries.json')
+    atomic_write_json(untouched, {'x': 'Роутер МТС'})
+    mtime = os.stat(untouched).st_mtime_ns
+
+    products = JsonProductStorage({'ozon': changed, 'wildberries': untouched})
+    products.load('ozon')
+    products.load('wildberries')
+    products.apply('ozon', {'a': 'Роутер МТС'}, [])
+    products.close()
+
+    assert read_json(changed) == {'a': 'Роутер МТС'}
+    assert not os.path.exists(changed + '.journal')
+    assert os.stat(untouched).st_mtime_ns == mtime
+
+
+def test_atomic_write_keeps_file_mode(tmp_path):
+    path = str(tmp_path / 'ozon.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{}')
+    os.chmod(path, 0o640)
+
+    atomic_write_json(path, {'a': 'Роутер МТС'})
+    assert file_mode(path) == 0o640
+    assert read_json(path) == {'a': 'Роутер МТС'}
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.tmp-')]
+
+
+def test_atomic_write_new_file_follows_umask(tmp_path):
+    path = str(tmp_path / 'ozon.json')
+    atomic_write_json(path, {})
+    assert file_mode(path) == storage.NEW_FILE_MODE
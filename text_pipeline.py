@@ -0,0 +1,87 @@
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Правила очистки названий по маркетплейсам: (шаблон, замена), выполняются по порядку.
+# После них всегда схлопываются пробелы.
+CLEANING_RULES = {
+    "wildberries": [
+        (re.compile(r'^[^A-Za-zА-Яа-я/]*'), ''),
+        (re.compile(r'−\d+%\s*\d+\s*₽\s*\d+\s*₽\s*−\d+%'), ''),
+        (re.compile(r'\d+\s*оценок?\s*\d*\s*После$'), ''),
+    ],
+    "ozon": [
+        (re.compile(r'^мтс сим карта\s*-\s*купить на\s*', re.IGNORECASE), ''),
+        (re.compile(r'^мтс тариф\s*-\s*купить на\s*', re.IGNORECASE), ''),
+        (re.compile(r'\s*-\s*купить на$', re.IGNORECASE), ''),
+        (re.compile(r'^купить на\s*', re.IGNORECASE), ''),
+    ],
+}
+
+WHITESPACE_RE = re.compile(r'\s+')
+NON_WORD_RE = re.compile(r'[^\w\sа-яё]')
+
+
+def clean_text(text, marketplace):
+    if not text:
+        return ""
+    for pattern, replacement in CLEANING_RULES.get(marketplace, ()):
+        text = pattern.sub(replacement, text)
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def normalize_name(text):
+    if not text:
+        return ""
+    text = WHITESPACE_RE.sub(' ', text.lower()).strip()
+    text = NON_WORD_RE.sub('', text)
+    return WHITESPACE_RE.sub(' ', text)
+
+
+def clean_and_normalize(text, marketplace):
+    clean = clean_text(text, marketplace)
+    return clean, normalize_name(clean)
+
+
+def product_id_for(normalized):
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class TextPipeline:
+    # Сырой текст -> (очищенный текст, нормализованный ключ, id товара) за один вызов.
+    # Названия повторяются каждый цикл, поэтому результат кэшируется (LRU)
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def process(self, text, marketplace):
+        key = (marketplace, text)
+        result = self.cache.get(key)
+        if result is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return result
+
+        self.misses += 1
+        clean, normalized = clean_and_normalize(text, marketplace)
+        result = (clean, normalized, product_id_for(normalized))
+
+        self.cache[key] = result
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
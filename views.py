@@ -0,0 +1,203 @@
+import html
+import logging
+import time
+from collections import OrderedDict
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+logger = logging.getLogger(__name__)
+
+MARKETPLACE_ICONS = {
+    "ozon": "🛒",
+    "wildberries": "📦",
+    "yandex": "🛍",
+}
+
+# Короткие подписи вкладок для целей по умолчанию; у остальных - id цели
+TAB_LABELS = {
+    "ozon": "Ozon",
+    "wildberries": "WB",
+    "yandex": "Маркет",
+}
+
+# Порядок вкладок: сначала Ozon, как в прежнем /sp
+TAB_ORDER = ("ozon", "wildberries", "yandex")
+MAX_TABS = 9
+MAX_LISTED_TARGETS = 30
+
+MARKETPLACE_ALIASES = {
+    "ozon": "ozon",
+    "озон": "ozon",
+    "wb": "wildberries",
+    "wildberries": "wildberries",
+    "вб": "wildberries",
+    "yandex": "yandex",
+    "market": "yandex",
+    "ym": "yandex",
+    "маркет": "yandex",
+}
+
+CALLBACK_PREFIX = "sp"
+
+
+class RenderCache:
+    # Готовые ответы команд по ключу; запись действительна, пока не сменилась
+    # версия состояния, из которого она построена
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, render):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = render()
+        self.entries[key] = (version, value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, marketplace):
+        for key in [key for key in self.entries if key[1] == marketplace]:
+            del self.entries[key]
+
+
+def ordered_targets(registry):
+    return sorted(registry, key=lambda t: TAB_ORDER.index(t.marketplace) if t.marketplace in TAB_ORDER else len(TAB_ORDER))
+
+
+def resolve_target(registry, args):
+    # /sp <id цели> или /sp <маркетплейс>: цель с id маркетплейса либо первая цель этого типа
+    targets = ordered_targets(registry)
+    if not args:
+        return targets[0].id if targets else None
+    name = args[0].lower()
+    if registry.get(name):
+        return name
+    marketplace = MARKETPLACE_ALIASES.get(name)
+    if registry.get(marketplace):
+        return marketplace
+    for target in targets:
+        if target.marketplace == marketplace:
+            return target.id
+    return None
+
+
+def callback_data(target_id, page):
+    return f"{CALLBACK_PREFIX}:{target_id}:{page}"
+
+
+def parse_callback(registry, data):
+    # "sp:ozon:3" -> ("ozon", 3); None для служебных кнопок
+    parts = data.split(":")
+    if len(parts) != 3 or not registry.get(parts[1]):
+        return None
+    try:
+        return parts[1], max(0, int(parts[2]))
+    except ValueError:
+        return None
+
+
+def render_product_page(storage, registry, target_id, page, page_size):
+    target = registry.get(target_id)
+    total = storage.count(target_id)
+    pages = max(1, (total + page_size - 1) // page_size)
+    page = min(page, pages - 1)
+    offset = page * page_size
+
+    message = f"{MARKETPLACE_ICONS[target.marketplace]} <b>{html.escape(target.name)} - список товаров:</b>\n\n"
+    if total:
+        for i, (product_id, product_name) in enumerate(storage.page(target_id, offset, page_size), offset + 1):
+            message += f"{i}. {html.escape(product_name)}\n"
+        message += f"\nВсего: {total}"
+    else:
+        message += "Товаров не найдено"
+
+    # Вкладки - первые цели по порядку; текущая показывается всегда
+    tab_targets = ordered_targets(registry)[:MAX_TABS]
+    if target not in tab_targets:
+        tab_targets[-1] = target
+    tabs = [
+        InlineKeyboardButton(
+            f"• {TAB_LABELS.get(t.id, t.id)} •" if t.id == target_id else TAB_LABELS.get(t.id, t.id),
+            callback_data=callback_data(t.id, 0)
+        )
+        for t in tab_targets
+    ]
+    keyboard = [tabs[i:i + 3] for i in range(0, len(tabs), 3)]
+    if pages > 1:
+        keyboard.append([
+            InlineKeyboardButton("◀️", callback_data=callback_data(target_id, (page - 1) % pages)),
+            InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=f"{CALLBACK_PREFIX}:noop"),
+            InlineKeyboardButton("▶️", callback_data=callback_data(target_id, (page + 1) % pages)),
+        ])
+    return message, InlineKeyboardMarkup(keyboard)
+
+
+def render_targets(registry):
+    message = "🔧 <b>Отслеживаемые магазины:</b>\n"
+    targets = list(registry)
+    for target in targets[:MAX_LISTED_TARGETS]:
+        message += f"• {html.escape(target.name)}: {html.escape(target.title)}\n"
+    if len(targets) > MAX_LISTED_TARGETS:
+        message += f"… и ещё {len(targets) - MAX_LISTED_TARGETS}\n"
+    return message + "\n"
+
+
+def render_product_counts(storage, registry):
+    message = "📦 <b>Статистика товаров:</b>\n"
+    targets = list(registry)
+    for target in targets[:MAX_LISTED_TARGETS]:
+        message += f"• {html.escape(target.name)}: {storage.count(target.id)} товаров\n"
+    if len(targets) > MAX_LISTED_TARGETS:
+        total = sum(storage.count(target.id) for target in targets)
+        message += f"… и ещё {len(targets) - MAX_LISTED_TARGETS} целей, всего {total} товаров\n"
+    return message + "\n"
+
+
+def render_breakers(breakers):
+    message = "🔌 <b>Доступность сайтов:</b>\n"
+    for breaker in sorted(breakers.values(), key=lambda b: b.name):
+        name = html.escape(breaker.name)
+        if breaker.state == "closed":
+            failures = f", неудач подряд: {breaker.failures}" if breaker.failures else ""
+            empty = f", пустых ответов: {breaker.empty}" if breaker.empty else ""
+            message += f"• ✅ {name}: работает{failures}{empty}\n"
+            continue
+        if breaker.state == "open":
+            message += f"• ⛔ {name}: пауза, ещё {breaker.remaining() / 60:.0f} мин"
+        else:
+            message += f"• 🟡 {name}: пробная проверка"
+        if breaker.last_error:
+            message += f" ({html.escape(str(breaker.last_error)[:100])})"
+        message += "\n"
+    return message + "\n"
+
+
+def render_workers(workers, depth, lease_seconds):
+    # Воркеры распределённого режима: пропускная способность и потерянные задания
+    pending = depth.get('pending', 0)
+    leased = depth.get('leased', 0)
+    message = f"🖥 <b>Воркеры:</b> заданий в очереди {pending}, в работе {leased}\n"
+    if not workers:
+        message += "• ни один воркер не подключался\n"
+    now = time.time()
+    for worker in workers[:MAX_LISTED_TARGETS]:
+        name = html.escape(worker['name'])
+        idle = now - worker['last_seen']
+        icon = "✅" if idle < lease_seconds else "💤"
+        hours = max(now - worker['started'], 1) / 3600
+        finished = worker['done'] + worker['failed']
+        average = f", в среднем {worker['busy_seconds'] / finished:.1f}с" if finished else ""
+        message += f"• {icon} {name}: {worker['done']} заданий ({worker['done'] / hours:.1f}/ч{average}), " \
+                   f"ошибок {worker['failed']}, потеряно {worker['lost']}, был {idle:.0f}с назад\n"
+    if len(workers) > MAX_LISTED_TARGETS:
+        message += f"… и ещё {len(workers) - MAX_LISTED_TARGETS}\n"
+    return message + "\n"
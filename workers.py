@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class FairWorkQueue:
+    # Фиксированное число воркеров на все цели. Задания копятся в очередях по группам
+    # (маркетплейсам), воркеры берут их по кругу: сотня целей на одном сайте
+    # не задерживает проверку остальных, а пропускная способность растёт с числом воркеров
+
+    def __init__(self, workers):
+        self.size = workers
+        self.groups = OrderedDict()
+        self.jobs = asyncio.Semaphore(0)
+        self.tasks = []
+        self.active = 0
+        self.completed = 0
+
+    def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.size)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def submit(self, group, job):
+        # job - корутинная функция без аргументов; ждём её результат
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self.groups.setdefault(group, deque()).append((job, future))
+        self.jobs.release()
+        return await future
+
+    def next_job(self):
+        group, queue = next(iter(self.groups.items()))
+        item = queue.popleft()
+        if queue:
+            self.groups.move_to_end(group)
+        else:
+            del self.groups[group]
+        return item
+
+    async def worker(self):
+        while True:
+            await self.jobs.acquire()
+            job, future = self.next_job()
+            if future.cancelled():
+                continue
+            self.active += 1
+            try:
+                result = await job()
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.active -= 1
+                self.completed += 1
+
+    def pending(self):
+        return {group: len(queue) for group, queue in self.groups.items()}